@@ -1,4 +1,7 @@
-﻿import { loadCompensationData as loadCompensationDataset } from "./data-loader.js";
+﻿import {
+  loadCompensationData as loadCompensationDataset,
+  loadCompensationPrefecture,
+} from "./data-loader.js";
 const TOP_BAR_PARTY_COUNT = 10;
 const TOP_TREND_PARTY_COUNT = 10;
 const TABLE_LIMIT = 20;
@@ -47,98 +50,72 @@ function formatInteger(value) {
   if (!Number.isFinite(value)) return "-";
   return String(Math.round(value));
 }
-function aggregateMunicipalRows(rows) {
-  const map = new Map();
-  for (const row of rows) {
-    const key = `${row.prefecture}::${row.municipality}::${row.party}::${row.year}`;
-    const existing = map.get(key);
-    if (!existing) {
-      map.set(key, { ...row });
-      continue;
-    }
-    existing.total_compensation += row.total_compensation ?? 0;
-    existing.annual_compensation += row.annual_compensation ?? 0;
-    existing.bonus_compensation =
-      (existing.bonus_compensation ?? 0) + (row.bonus_compensation ?? 0);
-    existing.months_in_term = (existing.months_in_term ?? 0) + (row.months_in_term ?? 0);
-    existing.bonus_count_march =
-      (existing.bonus_count_march ?? 0) + (row.bonus_count_march ?? 0);
-    existing.bonus_count_june =
-      (existing.bonus_count_june ?? 0) + (row.bonus_count_june ?? 0);
-    existing.bonus_count_december =
-      (existing.bonus_count_december ?? 0) + (row.bonus_count_december ?? 0);
-    existing.seat_count = Math.max(existing.seat_count ?? 0, row.seat_count ?? 0);
-    const incomingElectionYear = row.election_year ?? row.year ?? -Infinity;
-    const existingElectionYear = existing.election_year ?? existing.year ?? -Infinity;
-    if (incomingElectionYear > existingElectionYear) {
-      existing.monthly_compensation = row.monthly_compensation;
-      existing.bonus_amount_march = row.bonus_amount_march;
-      existing.bonus_amount_june = row.bonus_amount_june;
-      existing.bonus_amount_december = row.bonus_amount_december;
-      existing.term_start = row.term_start;
-      existing.term_end = row.term_end;
-      existing.election_date = row.election_date;
-      existing.election_year = row.election_year ?? row.year;
-    }
-  }
-  return Array.from(map.values());
+function isWithinYears(year, fromYear, toYear) {
+  const value = Number(year);
+  return (
+    Number.isFinite(value) &&
+    (fromYear === null || value >= fromYear) &&
+    (toYear === null || value <= toYear)
+  );
 }
-function buildPartyYearRowsFromMunicipalRows(rows) {
-  const map = new Map();
-  for (const row of rows) {
-    if (row.year === undefined || row.year === null) continue;
-    const year = Number(row.year);
-    if (!Number.isFinite(year)) continue;
-    const key = `${row.party}::${year}`;
-    let entry = map.get(key);
-    if (!entry) {
-      entry = {
-        party: row.party,
-        year,
-        seat_count: 0,
-        total_compensation: 0,
-        municipalities: new Set(),
-      };
-      map.set(key, entry);
-    }
-    entry.seat_count += row.seat_count ?? 0;
-    entry.total_compensation += row.total_compensation ?? 0;
-    entry.municipalities.add(`${row.prefecture}-${row.municipality}`);
-  }
-  return Array.from(map.values())
-    .map((entry) => ({
-      party: entry.party,
-      year: entry.year,
-      seat_count: entry.seat_count,
-      municipality_count: entry.municipalities.size,
-      total_compensation: entry.total_compensation,
+function buildPartyYearRows(partyYears, fromYear, toYear) {
+  return partyYears
+    .filter((row) => isWithinYears(row.year, fromYear, toYear))
+    .map((row) => ({
+      party: row.party,
+      year: Number(row.year),
+      seat_count: row.seat_count ?? 0,
+      municipality_count: row.municipality_count ?? 0,
+      total_compensation: row.total_compensation ?? 0,
     }))
     .sort((a, b) => a.year - b.year || a.party.localeCompare(b.party, "ja-JP"));
 }
-function buildPartySummaryFromMunicipalRows(rows) {
+function countMunicipalities(spans, fromYear, toYear) {
+  const byParty = new Map();
+  const all = new Set();
+  for (const span of spans) {
+    if (fromYear !== null && span.year_to < fromYear) continue;
+    if (toYear !== null && span.year_from > toYear) continue;
+    let ids = byParty.get(span.party);
+    if (!ids) {
+      ids = new Set();
+      byParty.set(span.party, ids);
+    }
+    ids.add(span.municipality_id);
+    all.add(span.municipality_id);
+  }
+  return { byParty, total: all.size };
+}
+function buildPartySummary(partyYearRows, municipalityCounts) {
   const map = new Map();
-  for (const row of rows) {
-    const key = row.party;
-    let entry = map.get(key);
+  for (const row of partyYearRows) {
+    let entry = map.get(row.party);
     if (!entry) {
       entry = {
         party: row.party,
         seat_count: 0,
         total_compensation: 0,
-        municipalities: new Set(),
+        municipality_count: municipalityCounts.byParty.get(row.party)?.size ?? 0,
       };
-      map.set(key, entry);
+      map.set(row.party, entry);
     }
-    entry.seat_count += row.seat_count ?? 0;
-    entry.total_compensation += row.total_compensation ?? 0;
-    entry.municipalities.add(`${row.prefecture}-${row.municipality}`);
+    entry.seat_count += row.seat_count;
+    entry.total_compensation += row.total_compensation;
   }
-  return Array.from(map.values()).map((entry) => ({
-    party: entry.party,
-    seat_count: entry.seat_count,
-    total_compensation: entry.total_compensation,
-    municipality_count: entry.municipalities.size,
-  }));
+  return Array.from(map.values());
+}
+function summariseYears(rawData, fromYear, toYear) {
+  const rows = buildPartyYearRows(rawData.party_years ?? [], fromYear, toYear);
+  const municipalityCounts = countMunicipalities(
+    rawData.party_municipality_spans ?? [],
+    fromYear,
+    toYear,
+  );
+  return {
+    rows,
+    partySummary: buildPartySummary(rows, municipalityCounts),
+    municipalityCount: municipalityCounts.total,
+  };
 }
 function getYearBounds(rows) {
   let minYear = Number.POSITIVE_INFINITY;
@@ -160,28 +137,14 @@ function getYearBounds(rows) {
 }
 function deriveCompensationView(rawData, spanYears) {
   const currentYear = new Date().getFullYear();
-  const sourceRows = Array.isArray(rawData.municipality_breakdown)
-    ? rawData.municipality_breakdown.slice()
-    : [];
-  const sourceTerms = Array.isArray(rawData.municipality_terms)
-    ? rawData.municipality_terms.slice()
-    : [];
-  const municipalRowsWithinCurrentYear = sourceRows.filter((row) => {
+  const sourceYears = Array.isArray(rawData.year_totals) ? rawData.year_totals : [];
+  const yearsWithinCurrentYear = sourceYears.filter((row) => {
     const value = Number(row.year);
     return Number.isFinite(value) && value <= currentYear;
   });
-  const termRowsWithinCurrentYear = sourceTerms.filter((term) => {
-    const value = Number(
-      term.election_year ??
-        (typeof term.term_start === "string" ? Number(term.term_start.slice(0, 4)) : NaN),
-    );
-    return Number.isFinite(value) && value <= currentYear;
-  });
-  const rowsForProcessing =
-    municipalRowsWithinCurrentYear.length > 0 ? municipalRowsWithinCurrentYear : sourceRows;
-  const termsForProcessing =
-    termRowsWithinCurrentYear.length > 0 ? termRowsWithinCurrentYear : sourceTerms;
-  const { minYear, maxYear, availableSpan } = getYearBounds(rowsForProcessing);
+  const yearsForProcessing =
+    yearsWithinCurrentYear.length > 0 ? yearsWithinCurrentYear : sourceYears;
+  const { minYear, maxYear, availableSpan } = getYearBounds(yearsForProcessing);
   const effectiveMaxYear =
     maxYear !== null && Number.isFinite(maxYear) ? Math.min(maxYear, currentYear) : maxYear;
   const effectiveSpan =
@@ -199,39 +162,11 @@ function deriveCompensationView(rawData, spanYears) {
     requestedSpan > 0 && Number.isFinite(effectiveMaxYear)
       ? effectiveMaxYear - requestedSpan + 1
       : null;
-  const filteredMunicipalityRows =
-    cutoffYear !== null
-      ? rowsForProcessing.filter(
-          (row) => Number(row.year) >= cutoffYear && Number(row.year) <= effectiveMaxYear,
-        )
-      : rowsForProcessing.filter((row) => Number(row.year) <= effectiveMaxYear);
-  const filteredTerms =
-    cutoffYear !== null
-      ? termsForProcessing.filter((term) => {
-          const electionYear = Number(
-            term.election_year ??
-              (typeof term.term_start === "string" ? term.term_start.slice(0, 4) : NaN),
-          );
-          return (
-            Number.isFinite(electionYear) &&
-            electionYear >= cutoffYear &&
-            electionYear <= effectiveMaxYear
-          );
-        })
-      : termsForProcessing.filter((term) => {
-          const electionYear = Number(
-            term.election_year ??
-              (typeof term.term_start === "string" ? term.term_start.slice(0, 4) : NaN),
-          );
-          return Number.isFinite(electionYear) && electionYear <= effectiveMaxYear;
-        });
-  const aggregatedMunicipality = aggregateMunicipalRows(filteredMunicipalityRows);
-  const partyYearRows = buildPartyYearRowsFromMunicipalRows(aggregatedMunicipality);
-  const partySummary = buildPartySummaryFromMunicipalRows(aggregatedMunicipality);
+  const selected = summariseYears(rawData, cutoffYear, effectiveMaxYear);
   let trendCutoffYear = null;
   let trendSpanYears = null;
-  let trendPartyYearRows = partyYearRows;
-  let trendSummary = partySummary;
+  let trendPartyYearRows = selected.rows;
+  let trendSummary = selected.partySummary;
   if (Number.isFinite(effectiveMaxYear)) {
     const baseMinYear = Number.isFinite(minYear) ? minYear : effectiveMaxYear;
     const candidateCutoff = effectiveMaxYear - TREND_DEFAULT_SPAN_YEARS + 1;
@@ -240,28 +175,19 @@ function deriveCompensationView(rawData, spanYears) {
       : baseMinYear;
     if (Number.isFinite(resolvedCutoff)) {
       trendCutoffYear = resolvedCutoff;
-      const trendMunicipalityRows = rowsForProcessing.filter((row) => {
-        const year = Number(row.year);
-        return (
-          Number.isFinite(year) &&
-          year <= effectiveMaxYear &&
-          (trendCutoffYear === null || year >= trendCutoffYear)
-        );
-      });
-      if (trendMunicipalityRows.length > 0) {
-        const aggregatedTrend = aggregateMunicipalRows(trendMunicipalityRows);
-        trendPartyYearRows = buildPartyYearRowsFromMunicipalRows(aggregatedTrend);
-        trendSummary = buildPartySummaryFromMunicipalRows(aggregatedTrend);
+      const trend = summariseYears(rawData, trendCutoffYear, effectiveMaxYear);
+      if (trend.rows.length > 0) {
+        trendPartyYearRows = trend.rows;
+        trendSummary = trend.partySummary;
       }
       trendSpanYears = effectiveMaxYear - trendCutoffYear + 1;
     }
   }
   return {
     source_compensation_year: rawData.source_compensation_year,
-    party_summary: partySummary,
-    rows: partyYearRows,
-    municipality_breakdown: aggregatedMunicipality,
-    municipality_terms: filteredTerms,
+    party_summary: selected.partySummary,
+    rows: selected.rows,
+    municipality_count: selected.municipalityCount,
     trend_rows: trendPartyYearRows,
     trend_summary: trendSummary,
     trend_cutoff_year: trendCutoffYear,
@@ -535,19 +461,145 @@ function updateSpanHelpText(element, viewData) {
     element.textContent = "0を指定すると全期間が対象になります。";
   }
 }
+function buildPrefectureRows(rawData, fromYear, toYear) {
+  const municipalities = rawData.municipalities ?? [];
+  const distinct = new Map();
+  for (const span of rawData.party_municipality_spans ?? []) {
+    if (fromYear !== null && span.year_to < fromYear) continue;
+    if (toYear !== null && span.year_from > toYear) continue;
+    const prefecture = municipalities[span.municipality_id]?.prefecture;
+    if (!prefecture) continue;
+    let entry = distinct.get(prefecture);
+    if (!entry) {
+      entry = { municipalities: new Set(), parties: new Set() };
+      distinct.set(prefecture, entry);
+    }
+    entry.municipalities.add(span.municipality_id);
+    entry.parties.add(span.party);
+  }
+  const map = new Map();
+  for (const row of rawData.prefecture_years ?? []) {
+    if (!isWithinYears(row.year, fromYear, toYear)) continue;
+    let entry = map.get(row.prefecture);
+    if (!entry) {
+      entry = {
+        prefecture: row.prefecture,
+        seat_count: 0,
+        municipality_count: distinct.get(row.prefecture)?.municipalities.size ?? 0,
+        party_count: distinct.get(row.prefecture)?.parties.size ?? 0,
+        total_compensation: 0,
+      };
+      map.set(row.prefecture, entry);
+    }
+    entry.seat_count += row.seat_count ?? 0;
+    entry.total_compensation += row.total_compensation ?? 0;
+  }
+  return Array.from(map.values()).sort((a, b) => b.total_compensation - a.total_compensation);
+}
+// Shard rows are per term and year; a term ending and the next starting in one year count their seats once,
+// as in the pipeline rollups.
+function buildMunicipalityRows(records, fromYear, toYear) {
+  const map = new Map();
+  for (const record of records) {
+    if (!isWithinYears(record.year, fromYear, toYear)) continue;
+    let entry = map.get(record.municipality);
+    if (!entry) {
+      entry = { municipality: record.municipality, seats: new Map(), total_compensation: 0 };
+      map.set(record.municipality, entry);
+    }
+    const key = `${record.party}\u0000${record.year}`;
+    entry.seats.set(key, Math.max(entry.seats.get(key) ?? 0, record.seat_count ?? 0));
+    entry.total_compensation += record.total_compensation ?? 0;
+  }
+  return Array.from(map.values(), (entry) => {
+    let seatCount = 0;
+    for (const seats of entry.seats.values()) seatCount += seats;
+    const parties = new Set(Array.from(entry.seats.keys(), (key) => key.split("\u0000")[0]));
+    return {
+      municipality: entry.municipality,
+      seat_count: seatCount,
+      party_count: parties.size,
+      total_compensation: entry.total_compensation,
+    };
+  }).sort((a, b) => b.total_compensation - a.total_compensation);
+}
+function appendCells(tr, values) {
+  values.forEach((value, index) => {
+    const cell = document.createElement("td");
+    if (index > 0) cell.className = "numeric";
+    cell.textContent = value;
+    tr.appendChild(cell);
+  });
+}
+function renderPrefectureTable(rows, selected, onSelect) {
+  const tbody = document.getElementById("compensation-prefecture-body");
+  if (!tbody) return;
+  tbody.innerHTML = "";
+  for (const row of rows) {
+    const tr = document.createElement("tr");
+    tr.classList.add("compensation-prefecture-row");
+    tr.classList.toggle("is-active", row.prefecture === selected);
+    appendCells(tr, [
+      row.prefecture,
+      formatInteger(row.seat_count),
+      formatInteger(row.municipality_count),
+      formatInteger(row.party_count),
+      formatYenShort(row.total_compensation),
+    ]);
+    tr.addEventListener("click", () => onSelect(row.prefecture));
+    tbody.appendChild(tr);
+  }
+}
+// ``rows`` is null while the shard loads.
+function renderMunicipalityTable(
+  prefecture,
+  rows,
+  viewData,
+  emptyMessage = "この期間の自治体別データはありません。",
+) {
+  const detail = document.getElementById("compensation-municipality-detail");
+  const tbody = document.getElementById("compensation-municipality-body");
+  if (!detail || !tbody) return;
+  detail.hidden = false;
+  const title = document.getElementById("compensation-municipality-title");
+  if (title) {
+    const fromYear = viewData?.cutoff_year ?? viewData?.earliest_year;
+    const range = Number.isFinite(fromYear) ? `（${fromYear}年〜${viewData.latest_year}年）` : "";
+    title.textContent = `${prefecture}の自治体別内訳${range}`;
+  }
+  tbody.innerHTML = "";
+  const message =
+    rows === null ? "読み込み中…" : rows.length === 0 ? emptyMessage : null;
+  if (message) {
+    const tr = document.createElement("tr");
+    const cell = document.createElement("td");
+    cell.colSpan = 4;
+    cell.textContent = message;
+    tr.appendChild(cell);
+    tbody.appendChild(tr);
+    return;
+  }
+  for (const row of rows) {
+    const tr = document.createElement("tr");
+    appendCells(tr, [
+      row.municipality,
+      formatInteger(row.seat_count),
+      formatInteger(row.party_count),
+      formatYenShort(row.total_compensation),
+    ]);
+    tbody.appendChild(tr);
+  }
+}
 function computeSummary(data) {
   const totalCompensation = data.party_summary.reduce(
     (sum, item) => sum + item.total_compensation,
     0,
   );
   const totalSeats = data.party_summary.reduce((sum, item) => sum + item.seat_count, 0);
-  const municipalities = new Set(
-    data.municipality_breakdown.map((item) => `${item.prefecture}-${item.municipality}`),
-  );
   return {
     totalCompensation,
     totalSeats,
-    totalMunicipalities: municipalities.size,
+    totalMunicipalities: data.municipality_count ?? 0,
     partyCount: data.party_summary.length,
   };
 }
@@ -562,7 +614,7 @@ export async function initCompensationDashboard() {
   const mobileDevice = isMobileDevice();
   try {
     const rawData = await loadCompensationDataset();
-    const bounds = getYearBounds(Array.isArray(rawData.municipality_breakdown) ? rawData.municipality_breakdown : []);
+    const bounds = getYearBounds(Array.isArray(rawData.year_totals) ? rawData.year_totals : []);
     const availableSpan = bounds.availableSpan;
     const defaultCandidate = mobileDevice ? MOBILE_YEAR_SPAN_DEFAULT : DESKTOP_YEAR_SPAN_DEFAULT;
     const defaultSpan =
@@ -576,6 +628,7 @@ export async function initCompensationDashboard() {
       rawData,
       currentSpan: defaultSpan,
       viewData: null,
+      prefecture: null,
     };
     const parseSpanInput = () => {
       if (!spanInput) return state.currentSpan ?? 0;
@@ -596,6 +649,39 @@ export async function initCompensationDashboard() {
         message.textContent = "";
       }
       renderCompensationView(viewData);
+      renderPrefectures();
+    };
+    // The municipality rows of a prefecture live in its detail shard, fetched on first selection.
+    const renderPrefectureDetail = async () => {
+      const { prefecture, viewData } = state;
+      if (!prefecture) return;
+      renderMunicipalityTable(prefecture, null, viewData);
+      try {
+        const records = await loadCompensationPrefecture(prefecture);
+        if (state.prefecture !== prefecture || state.viewData !== viewData) return;
+        const fromYear = viewData.cutoff_year ?? null;
+        const toYear = Number.isFinite(viewData.latest_year) ? viewData.latest_year : null;
+        renderMunicipalityTable(prefecture, buildMunicipalityRows(records, fromYear, toYear), viewData);
+      } catch (error) {
+        console.error(error);
+        if (state.prefecture === prefecture) {
+          renderMunicipalityTable(prefecture, [], viewData, "自治体別データの読み込みに失敗しました。");
+        }
+      }
+    };
+    const renderPrefectures = () => {
+      const { viewData } = state;
+      const toYear = Number.isFinite(viewData.latest_year) ? viewData.latest_year : null;
+      renderPrefectureTable(
+        buildPrefectureRows(rawData, viewData.cutoff_year ?? null, toYear),
+        state.prefecture,
+        (prefecture) => selectPrefecture(prefecture),
+      );
+      renderPrefectureDetail();
+    };
+    const selectPrefecture = (prefecture) => {
+      state.prefecture = prefecture;
+      renderPrefectures();
     };
     applySpan(defaultSpan);
     applyButton?.addEventListener("click", () => {
@@ -1,5 +1,5 @@
 import { DATA_PATH } from "../constants.js";
-import { fetchGzipJson } from "../utils.js";
+import { fetchDatasetJson, fetchGzipJson, readTableRows } from "../utils.js";
 
 function resolvePath() {
   if (DATA_PATH && typeof DATA_PATH.compensation === "string") {
@@ -8,8 +8,15 @@ function resolvePath() {
   return "data/compensation.json.gz";
 }
 
+function resolveIndexPath() {
+  if (DATA_PATH && typeof DATA_PATH.compensationIndex === "string") {
+    return DATA_PATH.compensationIndex;
+  }
+  return "data/compensation_index.json.gz";
+}
+
 export async function loadCompensationData() {
-  const payload = await fetchGzipJson(resolvePath());
+  const payload = await fetchDatasetJson(resolvePath());
   if (!payload || typeof payload !== "object") {
     throw new Error("compensation.json.gz の取得に失敗しました");
   }
@@ -19,10 +26,39 @@ export async function loadCompensationData() {
     currency: payload.currency ?? "JPY",
     formula: payload.formula ?? "",
     source_compensation_year: payload.source_compensation_year ?? null,
-    party_summary: Array.isArray(payload.party_summary) ? payload.party_summary : [],
-    rows: Array.isArray(payload.rows) ? payload.rows : [],
-    municipality_breakdown: Array.isArray(payload.municipality_breakdown)
-      ? payload.municipality_breakdown
-      : [],
+    party_summary: readTableRows(payload.party_summary),
+    rows: readTableRows(payload.rows),
+    year_totals: readTableRows(payload.year_totals),
+    party_years: readTableRows(payload.party_years),
+    prefecture_years: readTableRows(payload.prefecture_years),
+    municipalities: readTableRows(payload.municipalities),
+    party_municipality_spans: readTableRows(payload.party_municipality_spans),
   };
 }
+
+let compensationIndexPromise = null;
+const prefectureShardPromises = new Map();
+
+// Municipality rows of one prefecture, fetched from its detail shard on first use.
+export async function loadCompensationPrefecture(prefecture) {
+  if (!compensationIndexPromise) {
+    compensationIndexPromise = fetchDatasetJson(resolveIndexPath()).catch((error) => {
+      compensationIndexPromise = null;
+      throw error;
+    });
+  }
+  const index = await compensationIndexPromise;
+  const shard = Array.isArray(index?.shards)
+    ? index.shards.find((entry) => entry.prefecture === prefecture || entry.key === prefecture)
+    : null;
+  if (!shard) return [];
+  if (!prefectureShardPromises.has(shard.file)) {
+    const indexPath = resolveIndexPath();
+    const base = indexPath.slice(0, indexPath.lastIndexOf("/") + 1);
+    const promise = fetchGzipJson(base + shard.file, { cache: "force-cache" });
+    promise.catch(() => prefectureShardPromises.delete(shard.file));
+    prefectureShardPromises.set(shard.file, promise);
+  }
+  const payload = await prefectureShardPromises.get(shard.file);
+  return readTableRows(payload?.records);
+}
@@ -1,12 +1,22 @@
 ﻿export const DATA_PATH = {
   top: "data/top_dashboard.json.gz",
+  topSeries: "data/top_dashboard_series.bin.gz",
   elections: "data/election_summary.json.gz",
+  electionFacts: "data/election_facts.json.gz",
   candidates: "data/candidate_details.json.gz",
   compensation: "data/compensation.json.gz",
+  compensationIndex: "data/compensation_index.json.gz",
   winRate: "data/win_rate.json.gz",
+  winRateSeries: "data/win_rate_series.bin.gz",
   optimization: "data/vote_optimization.json.gz",
+  searchIndex: "data/candidate_search_index.json.gz",
+  mapMunicipalities: "data/map_municipalities.json.gz",
+  candidateLinks: "data/candidate_links_index.json.gz",
 };
 
+// Maps dataset names to content-hashed copies of the files above.
+export const DATA_MANIFEST_PATH = "data/manifest.json";
+
 export const WINNING_KEYWORDS = [
   "当選",
   "補欠当選",
@@ -1,9 +1,12 @@
 import { DATA_PATH } from "./constants.js";
 import {
   ensurePartyName,
+  fetchDatasetJson,
+  fetchDatasetTypedSeries,
   fetchGzipJson,
   normaliseString,
   parseYYYYMMDD,
+  readTableRows,
 } from "./utils.js";
 
 const toNumber = (value) => {
@@ -16,14 +19,31 @@ const toInteger = (value) => {
   return num === null ? null : Math.round(num);
 };
 
+// Typed series lists arrive as typed arrays (or arrays with null for gaps), JSON ones as plain arrays.
+const isSeriesValues = (values) => Array.isArray(values) || ArrayBuffer.isView(values);
+
+// Prefers the typed-array copy of a dataset (built with --typed-series) and falls back to its JSON file.
+async function fetchSeriesDataset(seriesPath, jsonPath) {
+  try {
+    const payload = await fetchDatasetTypedSeries(seriesPath);
+    if (payload) {
+      return payload;
+    }
+  } catch (error) {
+    console.warn(`${seriesPath} を読み込めなかったため JSON を使用します`, error);
+  }
+  return fetchDatasetJson(jsonPath);
+}
+
 export async function loadTopDashboardData() {
-  const payload = await fetchGzipJson(DATA_PATH.top);
+  const payload = await fetchSeriesDataset(DATA_PATH.topSeries, DATA_PATH.top);
   const summary = payload?.summary ?? {};
   const timelinePayload = payload?.timeline ?? {};
 
+  // ECharts reads a typed array as packed [x, y] pairs, so chart values are copied into plain arrays.
   const normaliseValues = (values) =>
-    Array.isArray(values)
-      ? values.map((value) => {
+    isSeriesValues(values)
+      ? Array.from(values, (value) => {
           if (value === null || value === undefined) return null;
           const num = Number(value);
           return Number.isFinite(num) ? num : null;
@@ -76,7 +96,7 @@ export async function loadTopDashboardData() {
 }
 
 export async function loadElectionSummary() {
-  const payload = await fetchGzipJson(DATA_PATH.elections);
+  const payload = await fetchDatasetJson(DATA_PATH.elections);
   const records = Array.isArray(payload?.records) ? payload.records : [];
 
   return records
@@ -97,6 +117,38 @@ export async function loadElectionSummary() {
     );
 }
 
+// One row per election with the summary figures already joined to the candidate results.
+export async function loadElectionFacts() {
+  const payload = await fetchDatasetJson(DATA_PATH.electionFacts);
+  return readTableRows(payload?.records)
+    .map((row) => {
+      const electionKey = normaliseString(row.election_key);
+      const dateText = normaliseString(row.election_date);
+      return {
+        election_key: electionKey,
+        election_date: dateText ? new Date(dateText) : null,
+        source_key: `${electionKey}_${dateText.replaceAll("-", "")}`,
+        seats: toInteger(row.seats),
+        candidate_count: toInteger(row.candidate_count),
+        registered_voters: toInteger(row.registered_voters),
+        candidates_listed: toInteger(row.candidates_listed) ?? 0,
+        winner_count: toInteger(row.winner_count) ?? 0,
+        total_votes: toInteger(row.total_votes),
+        turnout: toNumber(row.turnout),
+        competition_ratio: toNumber(row.competition_ratio),
+        min_winning_vote: toInteger(row.min_winning_vote),
+        max_losing_vote: toInteger(row.max_losing_vote),
+        legal_threshold: toNumber(row.legal_threshold),
+      };
+    })
+    .filter(
+      (row) =>
+        row.election_key &&
+        row.election_date instanceof Date &&
+        !Number.isNaN(row.election_date.getTime()),
+    );
+}
+
 export function buildSummaryIndex(elections) {
   const index = new Map();
   for (const election of elections) {
@@ -136,41 +188,73 @@ function resolveElectionDate(row, electionKey, summaryIndex) {
   return null;
 }
 
+function toCandidateRecord(row, index) {
+  const rawSource = normaliseString(row.source_file);
+  const fallbackKey = rawSource.replace(/\.html$/i, "");
+  const electionKey = normaliseString(row.source_key || fallbackKey);
+  const electionDate = resolveElectionDate(row, electionKey, index);
+  const ageValue = toNumber(row.age);
+  const votesValue = toNumber(row.votes);
+
+  return {
+    candidate_id: normaliseString(row.candidate_id),
+    name: normaliseString(row.name),
+    kana: normaliseString(row.kana),
+    age: ageValue,
+    gender: normaliseString(row.gender),
+    incumbent_status: normaliseString(row.incumbent_status),
+    profession: normaliseString(row.profession),
+    party: ensurePartyName(row.party),
+    votes: votesValue,
+    outcome: normaliseString(row.outcome),
+    image_file: normaliseString(row.image_file),
+    source_file: rawSource,
+    source_key: electionKey,
+    source_date_code: row.source_date_code ?? null,
+    election_date: electionDate,
+  };
+}
+
 export async function loadCandidateDetails(summaryIndex) {
-  const payload = await fetchGzipJson(DATA_PATH.candidates);
-  const records = Array.isArray(payload?.records) ? payload.records : [];
+  const payload = await fetchDatasetJson(DATA_PATH.candidates);
+  const records = readTableRows(payload?.records);
   const index = summaryIndex instanceof Map ? summaryIndex : new Map();
+  return records.map((row) => toCandidateRecord(row, index));
+}
 
-  return records.map((row) => {
-    const rawSource = normaliseString(row.source_file);
-    const fallbackKey = rawSource.replace(/\.html$/i, "");
-    const electionKey = normaliseString(row.source_key || fallbackKey);
-    const electionDate = resolveElectionDate(row, electionKey, index);
-    const ageValue = toNumber(row.age);
-    const votesValue = toNumber(row.votes);
+let candidateLinkIndexPromise = null;
+const candidateLinkShardPromises = new Map();
 
-    return {
-      candidate_id: normaliseString(row.candidate_id),
-      name: normaliseString(row.name),
-      kana: normaliseString(row.kana),
-      age: ageValue,
-      gender: normaliseString(row.gender),
-      incumbent_status: normaliseString(row.incumbent_status),
-      profession: normaliseString(row.profession),
-      party: ensurePartyName(row.party),
-      votes: votesValue,
-      outcome: normaliseString(row.outcome),
-      image_file: normaliseString(row.image_file),
-      source_file: rawSource,
-      source_key: electionKey,
-      source_date_code: row.source_date_code ?? null,
-      election_date: electionDate,
-    };
-  });
+// Links live in shards of consecutive candidate ids, fetched the first time a
+// candidate in that range is opened.
+export async function loadCandidateLinks(candidateId) {
+  const id = Number.parseInt(candidateId, 10);
+  if (!Number.isFinite(id)) return [];
+  if (!candidateLinkIndexPromise) {
+    candidateLinkIndexPromise = fetchDatasetJson(DATA_PATH.candidateLinks).catch((error) => {
+      candidateLinkIndexPromise = null;
+      throw error;
+    });
+  }
+  const index = await candidateLinkIndexPromise;
+  const shardSize = Number(index?.shard_size) || 0;
+  if (shardSize <= 0 || !Array.isArray(index?.shards)) return [];
+  const key = String(Math.floor(id / shardSize)).padStart(4, "0");
+  const shard = index.shards.find((entry) => entry.key === key);
+  if (!shard || id < shard.id_from || id > shard.id_to) return [];
+  if (!candidateLinkShardPromises.has(shard.file)) {
+    const base = DATA_PATH.candidateLinks.slice(0, DATA_PATH.candidateLinks.lastIndexOf("/") + 1);
+    const promise = fetchGzipJson(base + shard.file, { cache: "force-cache" });
+    promise.catch(() => candidateLinkShardPromises.delete(shard.file));
+    candidateLinkShardPromises.set(shard.file, promise);
+  }
+  const payload = await candidateLinkShardPromises.get(shard.file);
+  const links = payload?.links?.[String(id)];
+  return Array.isArray(links) ? links : [];
 }
 
 export async function loadWinRateDataset() {
-  const payload = await fetchGzipJson(DATA_PATH.winRate);
+  const payload = await fetchSeriesDataset(DATA_PATH.winRateSeries, DATA_PATH.winRate);
   const summaryParties = Array.isArray(payload?.summary?.parties) ? payload.summary.parties : [];
   const summaryTotals = payload?.summary?.totals ?? {};
   const summary = summaryParties
@@ -187,29 +271,24 @@ export async function loadWinRateDataset() {
     ? payload.timeline.series
         .map((series) => ({
           party: normaliseString(series.party),
-          ratios: Array.isArray(series.ratios) ? series.ratios.map((value) => toNumber(value)) : [],
-          winners: Array.isArray(series.winners)
-            ? series.winners.map((value) => toInteger(value))
-            : [],
-          candidates: Array.isArray(series.candidates)
-            ? series.candidates.map((value) => toInteger(value))
-            : [],
+          // Kept as decoded: typed arrays are indexed in place rather than copied.
+          ratios: isSeriesValues(series.ratios) ? series.ratios : [],
+          winners: isSeriesValues(series.winners) ? series.winners : [],
+          candidates: isSeriesValues(series.candidates) ? series.candidates : [],
         }))
         .filter((series) => series.party)
     : [];
 
-  const events = Array.isArray(payload?.events)
-    ? payload.events
-        .map((entry) => ({
-          party: normaliseString(entry.party),
-          electionKey: normaliseString(entry.election_key),
-          date: entry.date ? new Date(entry.date) : null,
-          candidates: toInteger(entry.candidates) ?? 0,
-          winners: toInteger(entry.winners) ?? 0,
-          ratio: toNumber(entry.ratio),
-        }))
-        .filter((entry) => entry.party && entry.date instanceof Date && !Number.isNaN(entry.date.getTime()))
-    : [];
+  const events = readTableRows(payload?.events)
+    .map((entry) => ({
+      party: normaliseString(entry.party),
+      electionKey: normaliseString(entry.election_key),
+      date: entry.date ? new Date(entry.date) : null,
+      candidates: toInteger(entry.candidates) ?? 0,
+      winners: toInteger(entry.winners) ?? 0,
+      ratio: toNumber(entry.ratio),
+    }))
+    .filter((entry) => entry.party && entry.date instanceof Date && !Number.isNaN(entry.date.getTime()));
 
   return {
     summary: {
@@ -229,7 +308,7 @@ export async function loadWinRateDataset() {
 }
 
 export async function loadVoteOptimizationDataset() {
-  const payload = await fetchGzipJson(DATA_PATH.optimization);
+  const payload = await fetchDatasetJson(DATA_PATH.optimization);
   const summary = payload?.summary ?? {};
 
   const parseDate = (value) => {
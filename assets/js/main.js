@@ -1,6 +1,7 @@
 import {
   buildSummaryIndex,
   loadCandidateDetails,
+  loadElectionFacts,
   loadElectionSummary,
   loadTopDashboardData,
 } from "./data-loaders.js";
@@ -10,6 +11,7 @@ import {
   renderSummary,
 } from "./renderers.js";
 import { DATA_PATH } from "./constants.js";
+import { datasetPrefetchUrls, resolveDataUrl } from "./utils.js";
 
 // Bump to invalidate cached modules when map logic changes (e.g., tie color for top-party metric).
 const ASSET_VERSION = "?v=20241124";
@@ -36,8 +38,7 @@ function prefetchResource(href, { rel = "prefetch", as } = {}) {
 }
 
 const moduleUrl = (specifier) => new URL(`${specifier}${ASSET_VERSION}`, import.meta.url).href;
-const MAP_PREFECTURE_TOPO_PATH = "assets/data/japan.topojson.gz";
-const MAP_MUNICIPAL_TOPO_PATH = "assets/data/municipal.topojson.gz";
+const MAP_TOPO_PATH = "assets/data/map.coarse.topojson.gz";
 
 function setupViewSwitching(activations = {}) {
   const tabs = document.querySelectorAll(".dashboard-tab");
@@ -164,11 +165,8 @@ async function main() {
   let searchInitPromise;
   const ensureSearchReady = () => {
     if (!searchInitPromise) {
-      searchInitPromise = Promise.all([
-        loadSearchModule(),
-        ensureCandidateBundle(),
-      ]).then(([module, { elections, candidates }]) =>
-        module.initElectionSearchDashboard({ elections, candidates }),
+      searchInitPromise = Promise.all([loadSearchModule(), loadElectionFacts()]).then(
+        ([module, elections]) => module.initElectionSearchDashboard({ elections }),
       );
     }
     return searchInitPromise;
@@ -246,13 +244,26 @@ async function main() {
   });
 
   scheduleIdleTask(() => {
-    prefetchResource(DATA_PATH.elections, { as: "fetch" });
-    prefetchResource(DATA_PATH.candidates, { as: "fetch" });
-    prefetchResource(DATA_PATH.compensation, { as: "fetch" });
-    prefetchResource(DATA_PATH.winRate, { as: "fetch" });
-    prefetchResource(DATA_PATH.optimization, { as: "fetch" });
-    prefetchResource(MAP_PREFECTURE_TOPO_PATH, { as: "fetch" });
-    prefetchResource(MAP_MUNICIPAL_TOPO_PATH, { as: "fetch" });
+    [
+      DATA_PATH.elections,
+      DATA_PATH.electionFacts,
+      DATA_PATH.candidates,
+      DATA_PATH.searchIndex,
+      DATA_PATH.compensation,
+      DATA_PATH.winRate,
+      DATA_PATH.optimization,
+    ].forEach(async (path) => {
+      try {
+        // The win-rate page reads the typed series instead when the manifest lists one.
+        const series = path === DATA_PATH.winRate ? await resolveDataUrl(DATA_PATH.winRateSeries) : null;
+        // Patchable datasets prefetch only the patch files; they are applied when the dataset is opened.
+        const urls = series?.immutable ? [series.url] : await datasetPrefetchUrls(path);
+        urls.forEach((url) => prefetchResource(url, { as: "fetch" }));
+      } catch (error) {
+        console.error(error);
+      }
+    });
+    prefetchResource(MAP_TOPO_PATH, { as: "fetch" });
     prefetchResource(moduleUrl("./compensation/dashboard.js"), { rel: "modulepreload" });
     prefetchResource(moduleUrl("./map/dashboard.js"), { rel: "modulepreload" });
     prefetchResource(moduleUrl("./search/dashboard.js"), { rel: "modulepreload" });
@@ -1,8 +1,21 @@
-import { PREFECTURES, PREFECTURE_NAME_BY_CODE, TERM_YEARS } from "../constants.js";
-import { fetchGzipJson, isWinningOutcome, normaliseString } from "../utils.js";
-const PREFECTURE_TOPO_PATH = "assets/data/japan.topojson.gz";
-const MUNICIPAL_TOPO_PATH = "assets/data/municipal.topojson.gz";
-const SHIZUOKA_LEGACY_TOPO_PATH = "assets/data/shizuoka.topojson.gz";
+import { DATA_PATH, PREFECTURES, PREFECTURE_NAME_BY_CODE, TERM_YEARS } from "../constants.js";
+import {
+  fetchDatasetJson,
+  fetchGzipJson,
+  isWinningOutcome,
+  normaliseString,
+  readTableRows,
+} from "../utils.js";
+// Built by data_pipeline/map_geometry.py, ordered from coarsest to finest.
+const MAP_TOPO_PATHS = {
+  coarse: "assets/data/map.coarse.topojson.gz",
+  medium: "assets/data/map.medium.topojson.gz",
+  fine: "assets/data/map.fine.topojson.gz",
+};
+const MAP_LEVELS = Object.keys(MAP_TOPO_PATHS);
+const INITIAL_MAP_LEVEL = "coarse";
+const DETAILED_MAP_LEVEL = "medium";
+const FINE_MAP_MIN_ZOOM = 7;
 // Hamamatsu (Shizuoka) wards changed in 2024, but the 2023 election term lasts through 2027.
 // Keep using legacy municipal geometry until the 2027 data horizon to avoid missing seats.
 const MUNICIPAL_LEGACY_THRESHOLD_YEAR = 2028;
@@ -690,7 +703,11 @@ async function preparePrefectureFeatures(rawTopoJson, preferredObjectName = null
   const features = [];
   geometriesByPref.forEach((geometries, prefCode) => {
     if (!Array.isArray(geometries) || geometries.length === 0) return;
-    const mergedGeometry = topojson.merge(rawTopoJson, geometries);
+    // Prebuilt map topologies already hold one outline per prefecture.
+    const mergedGeometry =
+      geometries.length === 1
+        ? topojson.feature(rawTopoJson, geometries[0]).geometry
+        : topojson.merge(rawTopoJson, geometries);
     if (!mergedGeometry) return;
     const representativeProps = geometries[0]?.properties ?? {};
     const regionName =
@@ -754,36 +771,126 @@ function resolveMunicipalityCode(prefectureCode, municipalityKey, index) {
   return bestMatch?.code ?? null;
 }
 
-async function loadMunicipalResources() {
-  const rawTopo = await fetchGzipJson(MUNICIPAL_TOPO_PATH);
-  return prepareMunicipalityFeatures(rawTopo);
+const mapTopologyPromises = new Map();
+function loadMapTopology(level) {
+  if (!mapTopologyPromises.has(level)) {
+    const promise = fetchGzipJson(MAP_TOPO_PATHS[level]);
+    promise.catch(() => mapTopologyPromises.delete(level));
+    mapTopologyPromises.set(level, promise);
+  }
+  return mapTopologyPromises.get(level);
 }
 
-async function loadMunicipalResourceSets() {
-  const baseResources = await loadMunicipalResources();
-  const latest = baseResources ? { ...baseResources, key: "latest" } : null;
+async function loadMunicipalResourceSets(level = INITIAL_MAP_LEVEL) {
+  const rawTopo = await loadMapTopology(level);
+  const baseResources = await prepareMunicipalityFeatures(rawTopo, "municipalities");
+  const latest = baseResources ? { ...baseResources, key: `latest@${level}` } : null;
   if (!latest) {
     return { latest: null, legacy: null };
   }
   let legacy = null;
   try {
-    const rawShizuoka = await fetchGzipJson(SHIZUOKA_LEGACY_TOPO_PATH);
-    const shizuokaLegacy = await prepareMunicipalityFeatures(rawShizuoka);
-    legacy =
-      buildLegacyMunicipalResource(latest, shizuokaLegacy, SHIZUOKA_PREF_CODE, "legacy-shizuoka") ??
-      null;
+    const legacyObject = rawTopo.objects?.municipalities_legacy;
+    if (legacyObject) {
+      const legacyResources = await prepareMunicipalityFeatures(rawTopo, "municipalities_legacy");
+      legacy =
+        buildLegacyMunicipalResource(
+          latest,
+          legacyResources,
+          legacyObject.replaces_pref_code ?? SHIZUOKA_PREF_CODE,
+          `legacy@${level}`,
+        ) ?? null;
+    }
   } catch (error) {
     console.warn("Failed to load legacy municipal geometry for Shizuoka:", error);
   }
   return {
     latest,
     legacy,
+    level,
   };
 }
 
-async function loadPrefectureResources() {
-  const rawTopo = await fetchGzipJson(PREFECTURE_TOPO_PATH);
-  return preparePrefectureFeatures(rawTopo);
+async function loadPrefectureResources(level = INITIAL_MAP_LEVEL) {
+  const rawTopo = await loadMapTopology(level);
+  return { ...(await preparePrefectureFeatures(rawTopo, "prefectures")), level };
+}
+
+// Council results precomputed per geometry id by data_pipeline/map_results.py.
+async function loadMunicipalResults() {
+  const payload = await fetchDatasetJson(DATA_PATH.mapMunicipalities);
+  const results = readTableRows(payload?.results);
+  if (results.length === 0) return null;
+  const partiesByResult = results.map(() => new Map());
+  for (const row of readTableRows(payload?.composition)) {
+    partiesByResult[row.result]?.set(row.party, Number(row.seats) || 0);
+  }
+  const electionsByRegion = new Map();
+  results.forEach((row, position) => {
+    const date = new Date(row.election_date);
+    if (Number.isNaN(date.getTime())) return;
+    const regionId = normaliseString(row.region_id);
+    const elections = electionsByRegion.get(regionId) ?? [];
+    elections.push({
+      date,
+      year: date.getFullYear(),
+      total: Number(row.winners) || 0,
+      parties: partiesByResult[position],
+    });
+    electionsByRegion.set(regionId, elections);
+  });
+  electionsByRegion.forEach((elections) => elections.sort((a, b) => a.date - b.date));
+  return { electionsByRegion, termYears: Number(payload.term_years) || TERM_YEARS };
+}
+
+// Same shape as the name-matched candidate aggregation: each region shows its
+// latest general election up to ``year``, flagged as expired once the term ends.
+function buildMunicipalYearDataFromResults({ electionsByRegion, termYears }, featureMap, year) {
+  const cutoff = new Date(year + 1, 0, 1).getTime();
+  const totals = new Map();
+  const partySeats = new Map();
+  const statusByRegion = new Map();
+  const snapshot = new Map();
+  electionsByRegion.forEach((elections, regionId) => {
+    if (!featureMap.has(regionId)) return;
+    let current = null;
+    for (const election of elections) {
+      if (election.year > year) break;
+      current = election;
+    }
+    if (!current || current.total <= 0) return;
+    const expiresAt = new Date(
+      current.date.getFullYear() + termYears,
+      current.date.getMonth(),
+      current.date.getDate(),
+    );
+    if (expiresAt.getTime() < cutoff) {
+      statusByRegion.set(regionId, {
+        status: DATA_STATUS.EXPIRED,
+        startDate: current.date,
+        endDate: expiresAt,
+      });
+    }
+    totals.set(regionId, current.total);
+    current.parties.forEach((seats, party) => {
+      let seatMap = partySeats.get(party);
+      if (!seatMap) {
+        seatMap = new Map();
+        partySeats.set(party, seatMap);
+      }
+      seatMap.set(regionId, seats);
+    });
+    snapshot.set(regionId, { total: current.total, parties: current.parties });
+  });
+  return {
+    totals,
+    partySeats,
+    statusByRegion,
+    topPartyByRegion: buildTopPartyFromMunicipalSnapshot(snapshot),
+    topPartyByRegionWithoutInd: buildTopPartyFromMunicipalSnapshot(snapshot, {
+      excludeIndependents: true,
+    }),
+  };
 }
 
 function aggregatePartySeatsByYear(candidates, { termYears = TERM_YEARS } = {}) {
@@ -1625,7 +1732,12 @@ export async function initPartyMapDashboard({ candidates }) {
     console.error(error);
     return null;
   });
+  const municipalResultsPromise = loadMunicipalResults().catch((error) => {
+    console.warn("Falling back to name-matched municipal results:", error);
+    return null;
+  });
   const municipalContainer = aggregation.byCouncilType?.[COUNCIL_TYPES.MUNICIPAL];
+  let municipalResults = null;
   const municipalYearCache = new Map();
   const municipalGeometryCache = new Map();
   let prefectureResources = null;
@@ -1658,6 +1770,11 @@ export async function initPartyMapDashboard({ candidates }) {
       municipalYearCache.set(cacheKey, emptyResult);
       return emptyResult;
     }
+    if (municipalResults && resource.featureMap instanceof Map) {
+      const result = buildMunicipalYearDataFromResults(municipalResults, resource.featureMap, year);
+      municipalYearCache.set(cacheKey, result);
+      return result;
+    }
     const rawYear = municipalContainer.municipalitiesByYear?.get?.(year);
     if (!(rawYear instanceof Map)) {
       municipalYearCache.set(cacheKey, emptyResult);
@@ -1912,6 +2029,7 @@ export async function initPartyMapDashboard({ candidates }) {
   if (!municipalResourceSets) {
     municipalResourceSets = { latest: null, legacy: null };
   }
+  municipalResults = await municipalResultsPromise;
   municipalResourceResolver = (year) => {
     if (!municipalResourceSets) return null;
     const numericYear = Number(year);
@@ -1923,30 +2041,24 @@ export async function initPartyMapDashboard({ candidates }) {
     return municipalResourceSets.latest ?? municipalResourceSets.legacy ?? null;
   };
 
-  const prefectureFeatures = prefectureResources.features;
-  const prefectureFeatureMap =
-    prefectureResources.featureMap instanceof Map
-      ? prefectureResources.featureMap
-      : new Map(prefectureFeatures.map((feature) => [feature.properties.region_id, feature]));
-  const prefectureNameResolver =
-    typeof prefectureResources.nameResolver === "function"
-      ? prefectureResources.nameResolver
-      : (code) =>
-          prefectureFeatureMap.get(code)?.properties?.region_name ??
-          PREFECTURE_NAME_BY_CODE[code] ??
-          code;
+  const buildPrefectureGeometry = (resources) => {
+    const features = resources.features;
+    const featureMap =
+      resources.featureMap instanceof Map
+        ? resources.featureMap
+        : new Map(features.map((feature) => [feature.properties.region_id, feature]));
+    const nameResolver =
+      typeof resources.nameResolver === "function"
+        ? resources.nameResolver
+        : (code) =>
+            featureMap.get(code)?.properties?.region_name ?? PREFECTURE_NAME_BY_CODE[code] ?? code;
+    return { features, featureMap, nameResolver };
+  };
 
+  const prefectureGeometry = buildPrefectureGeometry(prefectureResources);
   const geometryByMode = {
-    [COUNCIL_TYPES.COMBINED]: {
-      features: prefectureFeatures,
-      featureMap: prefectureFeatureMap,
-      nameResolver: prefectureNameResolver,
-    },
-    [COUNCIL_TYPES.PREFECTURE]: {
-      features: prefectureFeatures,
-      featureMap: prefectureFeatureMap,
-      nameResolver: prefectureNameResolver,
-    },
+    [COUNCIL_TYPES.COMBINED]: prefectureGeometry,
+    [COUNCIL_TYPES.PREFECTURE]: prefectureGeometry,
   };
 
   const defaultMunicipalGeometry = getMunicipalGeometry(sliderDefaultYear);
@@ -2293,6 +2405,36 @@ export async function initPartyMapDashboard({ candidates }) {
     }
   };
 
+  let geometryLevel = municipalResourceSets.level ?? prefectureResources.level ?? INITIAL_MAP_LEVEL;
+  // Swap in a finer topology once it has loaded. Resource keys carry the level,
+  // so entries cached for the coarser geometry are only dropped to free memory.
+  const upgradeGeometry = async (level) => {
+    if (MAP_LEVELS.indexOf(level) <= MAP_LEVELS.indexOf(geometryLevel)) return;
+    const [nextPrefectures, nextMunicipal] = await Promise.all([
+      loadPrefectureResources(level),
+      loadMunicipalResourceSets(level),
+    ]);
+    if (MAP_LEVELS.indexOf(level) <= MAP_LEVELS.indexOf(geometryLevel)) return;
+    if (!nextPrefectures?.features?.length || !nextMunicipal?.latest) return;
+    geometryLevel = level;
+    const nextPrefectureGeometry = buildPrefectureGeometry(nextPrefectures);
+    geometryByMode[COUNCIL_TYPES.COMBINED] = nextPrefectureGeometry;
+    geometryByMode[COUNCIL_TYPES.PREFECTURE] = nextPrefectureGeometry;
+    municipalResourceSets = nextMunicipal;
+    municipalGeometryCache.clear();
+    municipalYearCache.clear();
+    map.getSource("prefecture-boundaries")?.setData({
+      type: "FeatureCollection",
+      features: nextPrefectureGeometry.features,
+    });
+    updateMapForSelection(state.year, state.party, state.mode, state.metric);
+  };
+  const requestGeometryUpgrade = (level) => {
+    upgradeGeometry(level).catch((error) => {
+      console.warn(`Failed to load ${level} map geometry:`, error);
+    });
+  };
+
   map.on("load", () => {
     map.addSource("regions", {
       type: "geojson",
@@ -2338,13 +2480,13 @@ export async function initPartyMapDashboard({ candidates }) {
         ],
       },
     });
-    const prefectureGeometry = geometryByMode[COUNCIL_TYPES.PREFECTURE]?.features ?? [];
-    if (prefectureGeometry.length > 0) {
+    const prefectureOutlines = geometryByMode[COUNCIL_TYPES.PREFECTURE]?.features ?? [];
+    if (prefectureOutlines.length > 0) {
       map.addSource("prefecture-boundaries", {
         type: "geojson",
         data: {
           type: "FeatureCollection",
-          features: prefectureGeometry,
+          features: prefectureOutlines,
         },
       });
       map.addLayer(
@@ -2370,6 +2512,13 @@ export async function initPartyMapDashboard({ candidates }) {
       }
     }
 
+    requestGeometryUpgrade(DETAILED_MAP_LEVEL);
+    map.on("zoomend", () => {
+      if (map.getZoom() >= FINE_MAP_MIN_ZOOM) {
+        requestGeometryUpgrade("fine");
+      }
+    });
+
     map.on("mousemove", "region-fill", (event) => {
       const feature = event.features?.[0];
       if (!feature) return;
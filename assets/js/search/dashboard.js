@@ -1,4 +1,11 @@
+import { loadCandidateLinks } from "../data-loaders.js";
 import { formatDate, normaliseString } from "../utils.js";
+import {
+  loadCandidateSearchIndex,
+  lookupCandidateIds,
+  normaliseSearchText,
+  readIndexedCandidates,
+} from "./search-index.js";
 
 const WINNING_LABELS = new Set([
   "\u5f53\u9078",
@@ -23,27 +30,11 @@ const TEXT = {
   noResults: "\u8a72\u5f53\u3059\u308b\u5019\u88dc\u8005\u30c7\u30fc\u30bf\u306f\u3042\u308a\u307e\u305b\u3093",
   resultsPrefix: "\u4ef6\u8868\u793a\u4e2d\uff08\u6700\u5927 ",
   resultsSuffix: " \u4ef6\u307e\u3067\u8868\u793a\uff09",
+  linksLoading: "\u30ea\u30f3\u30af\u3092\u8aad\u307f\u8fbc\u307f\u4e2d\u2026",
+  noLinks: "\u767b\u9332\u3055\u308c\u305f\u30ea\u30f3\u30af\u306f\u3042\u308a\u307e\u305b\u3093",
+  linksUnavailable: "\u30ea\u30f3\u30af\u3092\u8aad\u307f\u8fbc\u3081\u307e\u305b\u3093\u3067\u3057\u305f",
 };
 
-function toDateKey(date) {
-  if (!(date instanceof Date) || Number.isNaN(date.getTime())) return "";
-  const y = date.getFullYear();
-  const m = String(date.getMonth() + 1).padStart(2, "0");
-  const d = String(date.getDate()).padStart(2, "0");
-  return `${y}${m}${d}`;
-}
-
-function buildElectionsForSearch(elections) {
-  return elections.map((item) => {
-    const sourceKey = `${item.election_name}_${toDateKey(item.election_day)}`;
-    return {
-      ...item,
-      source_key: sourceKey,
-      election_day_key: item.election_day ? formatDate(item.election_day) : null,
-    };
-  });
-}
-
 function unique(values) {
   const set = new Set();
   for (const value of values) {
@@ -55,8 +46,7 @@ function unique(values) {
 
 function computeStats(elections, candidates) {
   const competitionRatios = elections
-    .filter((item) => item.candidate_count && item.seats)
-    .map((item) => item.candidate_count / item.seats)
+    .map((item) => item.competition_ratio)
     .filter((value) => Number.isFinite(value) && value > 0);
 
   const averageCompetition =
@@ -95,8 +85,8 @@ function renderSummary(stats) {
 function buildTimelineOption(elections) {
   const yearly = new Map();
   for (const election of elections) {
-    if (!(election.election_day instanceof Date)) continue;
-    const year = election.election_day.getFullYear();
+    if (!(election.election_date instanceof Date)) continue;
+    const year = election.election_date.getFullYear();
     yearly.set(year, (yearly.get(year) ?? 0) + 1);
   }
   const years = Array.from(yearly.entries()).sort((a, b) => a[0] - b[0]);
@@ -286,6 +276,40 @@ function formatPartyLabel(value) {
   return text || TEXT.unaffiliated;
 }
 
+function toggleCandidateLinks(row, candidate) {
+  const next = row.nextElementSibling;
+  if (next?.classList.contains("candidate-links-row")) {
+    next.remove();
+    return;
+  }
+  const detail = document.createElement("tr");
+  detail.className = "candidate-links-row";
+  const cell = document.createElement("td");
+  cell.colSpan = 6;
+  cell.textContent = TEXT.linksLoading;
+  detail.appendChild(cell);
+  row.after(detail);
+
+  loadCandidateLinks(candidate.candidate_id)
+    .then((links) => {
+      const urls = links.filter((url) => /^https?:\/\//i.test(url));
+      cell.textContent = urls.length === 0 ? TEXT.noLinks : "";
+      for (const url of urls) {
+        const anchor = document.createElement("a");
+        anchor.href = url;
+        anchor.textContent = url;
+        anchor.target = "_blank";
+        anchor.rel = "noopener noreferrer";
+        anchor.style.display = "block";
+        cell.appendChild(anchor);
+      }
+    })
+    .catch((error) => {
+      console.warn("candidate links unavailable", error);
+      cell.textContent = TEXT.linksUnavailable;
+    });
+}
+
 function renderTable(candidates, filters) {
   const resultsBody = document.getElementById("results-body");
   resultsBody.textContent = "";
@@ -301,13 +325,15 @@ function renderTable(candidates, filters) {
 
     const tr = document.createElement("tr");
     tr.innerHTML = `
-      <td style="min-width:220px">${election?.election_name ?? "-"}</td>
-      <td>${formatDate(election?.election_day ?? null)}</td>
+      <td style="min-width:220px">${election?.election_key ?? "-"}</td>
+      <td>${formatDate(election?.election_date ?? null)}</td>
       <td>${election?.seats ?? "-"}</td>
       <td>${election?.candidate_count ?? "-"}</td>
       <td><span class="pill">${partyLabel}</span></td>
       <td><span class="badge${isWinner ? " winner" : ""}">${outcome}</span></td>
     `;
+    tr.style.cursor = "pointer";
+    tr.addEventListener("click", () => toggleCandidateLinks(tr, candidate));
     fragment.appendChild(tr);
   }
 
@@ -329,7 +355,7 @@ function buildFilters(elections) {
   const indexByKey = new Map();
 
   for (const election of elections) {
-    indexByName.set(election.election_name, election);
+    indexByName.set(election.election_key, election);
     indexByKey.set(election.source_key, election);
   }
 
@@ -341,12 +367,20 @@ function buildFilters(elections) {
     selectedKeys: null,
     indexByName,
     indexByKey,
+    dateKeys: null,
+    textMatches: null,
     matchesElection(candidate) {
       const source = candidate.source_file
         ? candidate.source_file.replace(/\.html$/i, "")
         : candidate.source_key;
       return this.selectedKeys ? this.selectedKeys.has(source) : true;
     },
+    matchesDate(candidate) {
+      const source = candidate.source_file
+        ? candidate.source_file.replace(/\.html$/i, "")
+        : candidate.source_key;
+      return this.dateKeys ? this.dateKeys.has(source) : true;
+    },
     findElection(candidate) {
       const source = candidate.source_file
         ? candidate.source_file.replace(/\.html$/i, "")
@@ -363,35 +397,55 @@ function filterElections(elections, filters) {
   return elections.filter((election) => {
     const matchesText =
       text.length === 0 ||
-      normaliseString(election.election_name).toLowerCase().includes(text);
+      normaliseString(election.election_key).toLowerCase().includes(text);
 
     const matchesStart =
       !filters.start ||
-      (election.election_day instanceof Date &&
-        election.election_day >= filters.start);
+      (election.election_date instanceof Date &&
+        election.election_date >= filters.start);
 
     const matchesEnd =
       !filters.end ||
-      (election.election_day instanceof Date && election.election_day <= filters.end);
+      (election.election_date instanceof Date && election.election_date <= filters.end);
 
     return matchesText && matchesStart && matchesEnd;
   });
 }
 
+const SEARCH_FIELDS = ["name", "kana", "party", "source_key"];
+
+function findTextMatches(candidates, searchIndex, text) {
+  if (!text) return null;
+  const query = normaliseSearchText(text);
+  const matches = new Set();
+  for (const id of lookupCandidateIds(searchIndex, query)) {
+    const candidate = candidates[id];
+    if (candidate && SEARCH_FIELDS.some((field) => normaliseSearchText(candidate[field]).includes(query))) {
+      matches.add(id);
+    }
+  }
+  return matches;
+}
+
 function filterCandidates(candidates, filters) {
-  return candidates.filter((candidate) => {
+  return candidates.filter((candidate, index) => {
     if (filters.party && candidate.party !== filters.party) return false;
-    if (!filters.matchesElection(candidate)) return false;
-    return true;
+    if (filters.matchesElection(candidate)) return true;
+    return Boolean(filters.textMatches?.has(index)) && filters.matchesDate(candidate);
   });
 }
 
-export function initElectionSearchDashboard({ elections, candidates }) {
-  const preparedElections = buildElectionsForSearch(elections);
-  const filters = buildFilters(preparedElections);
-  filters.selectedKeys = new Set(preparedElections.map((item) => item.source_key));
+// Everything the page shows comes from the search index and the election facts; candidate_details is never loaded.
+export async function initElectionSearchDashboard({ elections }) {
+  const searchIndex = await loadCandidateSearchIndex();
+  if (!searchIndex) {
+    throw new Error("candidate search index is unavailable");
+  }
+  const candidates = readIndexedCandidates(searchIndex);
+  const filters = buildFilters(elections);
+  filters.selectedKeys = new Set(elections.map((item) => item.source_key));
 
-  renderSummary(computeStats(preparedElections, candidates));
+  renderSummary(computeStats(elections, candidates));
 
   const partySelect = document.getElementById("party-select");
   const parties = unique(candidates.map((candidate) => candidate.party))
@@ -403,7 +457,7 @@ export function initElectionSearchDashboard({ elections, candidates }) {
     partySelect.appendChild(option);
   }
 
-  const timelineChart = renderTimelineChart("timeline-chart", preparedElections);
+  const timelineChart = renderTimelineChart("timeline-chart", elections);
   const partyChart = renderPartyChart("party-chart", candidates);
   const demographicsChart = renderDemographicsChart("demographics-chart", candidates);
 
@@ -414,8 +468,12 @@ export function initElectionSearchDashboard({ elections, candidates }) {
   };
 
   const update = () => {
-    const selectedElections = filterElections(preparedElections, filters);
+    const selectedElections = filterElections(elections, filters);
     filters.selectedKeys = new Set(selectedElections.map((item) => item.source_key));
+    filters.dateKeys = filters.text
+      ? new Set(filterElections(elections, { ...filters, text: "" }).map((item) => item.source_key))
+      : null;
+    filters.textMatches = findTextMatches(candidates, searchIndex, filters.text);
 
     const filteredCandidates = filterCandidates(candidates, filters);
     renderTable(filteredCandidates, filters);
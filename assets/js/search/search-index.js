@@ -0,0 +1,112 @@
+import { DATA_PATH } from "../constants.js";
+import { ensurePartyName, fetchDatasetJson, normaliseString, readTableRows } from "../utils.js";
+
+// Mirrors normalise_search_text in data_pipeline/common.py.
+export function normaliseSearchText(value) {
+  return (value ?? "")
+    .toString()
+    .normalize("NFKC")
+    .toLowerCase()
+    .replace(/\s+/g, "")
+    .replace(/[\u30a1-\u30f6]/g, (char) => String.fromCharCode(char.charCodeAt(0) - 0x60));
+}
+
+function lowerBound(terms, target) {
+  let low = 0;
+  let high = terms.length;
+  while (low < high) {
+    const middle = (low + high) >>> 1;
+    if (terms[middle] < target) {
+      low = middle + 1;
+    } else {
+      high = middle;
+    }
+  }
+  return low;
+}
+
+function readPostings(index, termIndex) {
+  const start = index.offsets[termIndex];
+  const end = index.offsets[termIndex + 1];
+  const ids = new Array(end - start);
+  let previous = 0;
+  for (let position = start; position < end; position += 1) {
+    previous += index.postings[position];
+    ids[position - start] = previous;
+  }
+  return ids;
+}
+
+function intersectSorted(left, right) {
+  const result = [];
+  let i = 0;
+  let j = 0;
+  while (i < left.length && j < right.length) {
+    if (left[i] === right[j]) {
+      result.push(left[i]);
+      i += 1;
+      j += 1;
+    } else if (left[i] < right[j]) {
+      i += 1;
+    } else {
+      j += 1;
+    }
+  }
+  return result;
+}
+
+export async function loadCandidateSearchIndex() {
+  const payload = await fetchDatasetJson(DATA_PATH.searchIndex);
+  if (!Array.isArray(payload?.terms) || !Array.isArray(payload?.offsets) || !Array.isArray(payload?.postings)) {
+    return null;
+  }
+  return payload;
+}
+
+// The candidates the index's row ids point at, with only the fields the search page shows.
+export function readIndexedCandidates(index) {
+  return readTableRows(index?.candidates).map((row) => {
+    const age = Number(row.age);
+    return {
+      candidate_id: normaliseString(row.candidate_id),
+      name: normaliseString(row.name),
+      kana: normaliseString(row.kana),
+      age: row.age === null || row.age === undefined || !Number.isFinite(age) ? null : age,
+      gender: normaliseString(row.gender),
+      party: ensurePartyName(row.party),
+      outcome: normaliseString(row.outcome),
+      source_key: normaliseString(row.source_key),
+      source_file: normaliseString(row.source_file),
+    };
+  });
+}
+
+// Returns ascending row ids whose indexed fields may contain the query.
+// Multi-character queries match every bigram, so callers wanting exact substring
+// matches should confirm against the rows they display.
+export function lookupCandidateIds(index, query) {
+  const text = normaliseSearchText(query);
+  if (!index || !text) return [];
+  const { terms } = index;
+
+  if (text.length === 1) {
+    const ids = new Set();
+    for (let termIndex = lowerBound(terms, text); termIndex < terms.length; termIndex += 1) {
+      if (!terms[termIndex].startsWith(text)) break;
+      for (const id of readPostings(index, termIndex)) ids.add(id);
+    }
+    return Array.from(ids).sort((a, b) => a - b);
+  }
+
+  const size = index.ngram || 2;
+  let result = null;
+  for (let start = 0; start + size <= text.length; start += 1) {
+    const gram = text.slice(start, start + size);
+    const termIndex = lowerBound(terms, gram);
+    if (terms[termIndex] !== gram) return [];
+    const ids = readPostings(index, termIndex);
+    result = result === null ? ids : intersectSorted(result, ids);
+    if (result.length === 0) return result;
+  }
+  return result ?? [];
+}
@@ -1,6 +1,7 @@
-import { WINNING_KEYWORDS } from "./constants.js";
+import { DATA_MANIFEST_PATH, WINNING_KEYWORDS } from "./constants.js";
 
 const UTF8_DECODER = typeof TextDecoder === "function" ? new TextDecoder("utf-8") : null;
+let dataManifestPromise = null;
 
 export function normaliseString(value) {
   return (value ?? "").toString().trim();
@@ -55,6 +56,37 @@ export function formatYmd(date) {
   return `${y}${m}${d}`;
 }
 
+export function decodeColumnarTable(table) {
+  const columns = Array.isArray(table?.columns) ? table.columns : [];
+  const dictionaries = table?.dictionaries ?? {};
+  const values = columns.map((name, index) => {
+    const column = table.values?.[index] ?? [];
+    const dictionary = dictionaries[name];
+    return Array.isArray(dictionary) ? Array.from(column, (code) => dictionary[code]) : column;
+  });
+  const length = Number(table?.length) || 0;
+  const rows = new Array(length);
+  for (let rowIndex = 0; rowIndex < length; rowIndex += 1) {
+    const row = {};
+    for (let columnIndex = 0; columnIndex < columns.length; columnIndex += 1) {
+      row[columns[columnIndex]] = values[columnIndex][rowIndex] ?? null;
+    }
+    rows[rowIndex] = row;
+  }
+  return rows;
+}
+
+// Accepts either a plain record array (schema_version 1) or a columnar table (schema_version 2).
+export function readTableRows(value) {
+  if (Array.isArray(value)) {
+    return value;
+  }
+  if (value && value.encoding === "columnar") {
+    return decodeColumnarTable(value);
+  }
+  return [];
+}
+
 async function decodeGzipStream(stream) {
   const buffer = await new Response(stream).arrayBuffer();
   return new Uint8Array(buffer);
@@ -69,20 +101,26 @@ async function decompressFromArrayBuffer(buffer) {
   return module.gunzipSync(new Uint8Array(buffer));
 }
 
-export async function fetchGzipText(url, options = {}) {
+export async function fetchGzipBytes(url, options = {}) {
   const init = { cache: "no-cache", ...options };
   const response = await fetch(url, init);
   if (!response.ok) {
     throw new Error(`${url} の取得に失敗しました (${response.status})`);
   }
+  // Servers that send Content-Encoding (data_pipeline/serve.py) have had the body inflated by the browser already.
+  if (/\b(gzip|br|zstd)\b/i.test(response.headers.get("Content-Encoding") ?? "")) {
+    return new Uint8Array(await response.arrayBuffer());
+  }
   if (typeof DecompressionStream === "function" && response.body) {
     const stream = response.body.pipeThrough(new DecompressionStream("gzip"));
-    const bytes = await decodeGzipStream(stream);
-    const decoder = UTF8_DECODER ?? new TextDecoder("utf-8");
-    return decoder.decode(bytes);
+    return decodeGzipStream(stream);
   }
   const buffer = await response.arrayBuffer();
-  const bytes = await decompressFromArrayBuffer(buffer);
+  return decompressFromArrayBuffer(buffer);
+}
+
+export async function fetchGzipText(url, options = {}) {
+  const bytes = await fetchGzipBytes(url, options);
   const decoder = UTF8_DECODER ?? new TextDecoder("utf-8");
   return decoder.decode(bytes);
 }
@@ -91,3 +129,266 @@ export async function fetchGzipJson(url, options = {}) {
   const text = await fetchGzipText(url, options);
   return JSON.parse(text);
 }
+
+function loadDataManifest() {
+  if (!dataManifestPromise) {
+    dataManifestPromise = fetch(DATA_MANIFEST_PATH, { cache: "no-cache" })
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return dataManifestPromise;
+}
+
+export async function resolveDataUrl(path) {
+  const manifest = await loadDataManifest();
+  const fileName = path.split("/").pop();
+  const name = fileName.split(".")[0];
+  const entry = manifest?.datasets?.[name];
+  if (!entry?.file) {
+    return { url: path, immutable: false, name, entry: null };
+  }
+  return { url: path.slice(0, path.length - fileName.length) + entry.file, immutable: true, name, entry };
+}
+
+// Datasets with a ``patches`` list in the manifest (data_pipeline/delta_patches.py) keep their last release
+// here. A later release is then reached by applying the manifest's patch chain instead of fetching the file.
+const RELEASE_CACHE_NAME = "election-dashboard-releases";
+const RELEASE_VERSION_HEADER = "X-Release-Version";
+const RELEASE_SHA256_HEADER = "X-Release-SHA256";
+const PATCH_KEY_SEPARATOR = "\u001f";
+
+function openReleaseCache() {
+  if (typeof caches === "undefined") return Promise.resolve(null);
+  return caches.open(RELEASE_CACHE_NAME).catch(() => null);
+}
+
+async function readStoredRelease(name) {
+  const cache = await openReleaseCache();
+  const response = await cache?.match(`release/${name}`);
+  return response ? response.json() : null;
+}
+
+// The stored release's version and hash, read from its headers without parsing the payload.
+async function readStoredReleaseStamp(name) {
+  const cache = await openReleaseCache();
+  const response = await cache?.match(`release/${name}`);
+  if (!response?.headers.has(RELEASE_VERSION_HEADER)) return null;
+  return {
+    version: Number(response.headers.get(RELEASE_VERSION_HEADER)),
+    sha256: response.headers.get(RELEASE_SHA256_HEADER),
+  };
+}
+
+async function storeRelease(name, release) {
+  // Serialised before the first await, so callers may go on to modify the payload.
+  const body = JSON.stringify(release);
+  const headers = {
+    "Content-Type": "application/json",
+    [RELEASE_VERSION_HEADER]: String(release.version),
+    [RELEASE_SHA256_HEADER]: release.sha256,
+  };
+  const cache = await openReleaseCache();
+  await cache?.put(`release/${name}`, new Response(body, { headers }));
+}
+
+// Same keys as delta_patches.record_keys; the key fields of every patched collection are strings.
+function patchRecordKeys(records, fields) {
+  const seen = new Map();
+  return records.map((record) => {
+    const key = fields
+      .map((field) => (record[field] === null || record[field] === undefined ? "" : String(record[field])))
+      .join(PATCH_KEY_SEPARATOR);
+    const occurrence = seen.get(key) ?? 0;
+    seen.set(key, occurrence + 1);
+    return occurrence ? `${key}${PATCH_KEY_SEPARATOR}${occurrence}` : key;
+  });
+}
+
+function applyCollectionDiff(records, diff) {
+  const keys = patchRecordKeys(records, diff.key);
+  const removed = new Set(diff.remove ?? []);
+  const upserts = new Map((diff.upsert ?? []).map(([index, key, record]) => [key, [index, record]]));
+  const result = [];
+  records.forEach((record, position) => {
+    const key = keys[position];
+    if (removed.has(key)) return;
+    if (upserts.has(key)) {
+      result.push([key, upserts.get(key)[1]]);
+      upserts.delete(key);
+    } else {
+      result.push([key, record]);
+    }
+  });
+  for (const [key, [index, record]] of Array.from(upserts).sort((a, b) => a[1][0] - b[1][0])) {
+    result.splice(index, 0, [key, record]);
+  }
+  if (!Array.isArray(diff.order)) {
+    return result.map(([, record]) => record);
+  }
+  const byKey = new Map(result);
+  return diff.order.map((key) => {
+    if (!byKey.has(key)) throw new Error(`patch: unknown record ${key}`);
+    return byKey.get(key);
+  });
+}
+
+function resolvePatchParent(payload, path) {
+  const names = path.split(".");
+  const leaf = names.pop();
+  let parent = payload;
+  for (const name of names) {
+    parent = parent?.[name];
+  }
+  if (!parent || typeof parent !== "object") throw new Error(`patch: missing ${path}`);
+  return [parent, leaf];
+}
+
+// delta_patches.apply_patch, modifying ``payload``. Columnar tables come back as plain record arrays,
+// which readTableRows accepts as well.
+export function applyDatasetPatch(payload, patch) {
+  for (const path of patch.unset ?? []) {
+    const [parent, leaf] = resolvePatchParent(payload, path);
+    delete parent[leaf];
+  }
+  for (const [path, value] of Object.entries(patch.set ?? {})) {
+    const [parent, leaf] = resolvePatchParent(payload, path);
+    parent[leaf] = value;
+  }
+  for (const [path, diff] of Object.entries(patch.collections ?? {})) {
+    const [parent, leaf] = resolvePatchParent(payload, path);
+    const table = parent[leaf];
+    if (!Array.isArray(table) && table?.encoding !== "columnar") throw new Error(`patch: ${path} is not a table`);
+    parent[leaf] = applyCollectionDiff(readTableRows(table), diff);
+  }
+  return payload;
+}
+
+// The patches from ``version`` to the manifest entry, or null when the chain does not reach it or is not smaller.
+function patchSteps(version, entry) {
+  const steps = [];
+  for (const step of entry.patches) {
+    if (step.from === version) {
+      steps.push(step);
+      version = step.to;
+    }
+  }
+  if (version !== entry.version) return null;
+  if (steps.reduce((total, step) => total + (step.bytes ?? 0), 0) >= entry.bytes) return null;
+  return steps;
+}
+
+// The current release rebuilt from the stored one, or null when no patch chain applies.
+async function fetchPatchedRelease(name, entry, base) {
+  const stored = await readStoredRelease(name);
+  if (!stored) return null;
+  if (stored.sha256 === entry.sha256) return stored.payload;
+  const steps = patchSteps(stored.version, entry);
+  if (!steps) return null;
+  let { payload, sha256 } = stored;
+  for (const step of steps) {
+    const patch = await fetchGzipJson(base + step.file, { cache: "force-cache" });
+    if (patch.from_sha256 !== sha256) return null;
+    payload = applyDatasetPatch(payload, patch);
+    sha256 = patch.to_sha256;
+  }
+  if (sha256 !== entry.sha256) return null;
+  await storeRelease(name, { version: entry.version, sha256, payload });
+  return payload;
+}
+
+export async function fetchDatasetJson(path, options = {}) {
+  const { url, immutable, name, entry } = await resolveDataUrl(path);
+  const patchable = Array.isArray(entry?.patches);
+  if (patchable) {
+    try {
+      const current = await fetchPatchedRelease(name, entry, url.slice(0, url.length - entry.file.length));
+      if (current) return current;
+    } catch (error) {
+      console.warn(`${name} の差分を適用できなかったため全体を取得します`, error);
+    }
+  }
+  // Hashed files never change, so the HTTP cache may serve them without revalidation.
+  const payload = await fetchGzipJson(url, immutable ? { cache: "force-cache", ...options } : options);
+  if (patchable) {
+    storeRelease(name, { version: entry.version, sha256: entry.sha256, payload }).catch((error) =>
+      console.warn(error),
+    );
+  }
+  return payload;
+}
+
+// The files fetchDatasetJson(path) will request: none when the stored release is current, the patch chain
+// when it applies, otherwise the dataset itself. Nothing is fetched or parsed here, so it suits prefetching.
+export async function datasetPrefetchUrls(path) {
+  const { url, name, entry } = await resolveDataUrl(path);
+  if (!Array.isArray(entry?.patches)) return [url];
+  const stamp = await readStoredReleaseStamp(name);
+  if (stamp?.sha256 === entry.sha256) return [];
+  const steps = stamp ? patchSteps(stamp.version, entry) : null;
+  if (!steps) return [url];
+  const base = url.slice(0, url.length - entry.file.length);
+  return steps.map((step) => base + step.file);
+}
+
+const TYPED_SERIES_MAGIC = "EDTS";
+const LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+
+const TYPED_BUFFER_TYPES = {
+  int32: [Int32Array, "getInt32"],
+  float32: [Float32Array, "getFloat32"],
+  float64: [Float64Array, "getFloat64"],
+};
+
+function readTypedBuffer(bytes, offset, { type, length, nulls }) {
+  const [Type, getter] = TYPED_BUFFER_TYPES[type];
+  let values;
+  if (LITTLE_ENDIAN) {
+    values = new Type(bytes.buffer, bytes.byteOffset + offset, length);
+  } else {
+    const size = Type.BYTES_PER_ELEMENT;
+    const view = new DataView(bytes.buffer, bytes.byteOffset + offset, length * size);
+    values = Type.from({ length }, (_, index) => view[getter](index * size, true));
+  }
+  if (nulls === null || nulls === undefined) {
+    return values;
+  }
+  const present = bytes.subarray(nulls, nulls + Math.ceil(length / 8));
+  return Array.from(values, (value, index) => (present[index >> 3] & (1 << (index & 7)) ? value : null));
+}
+
+// Typed series files (data_pipeline/output_writer.encode_typed_series): "EDTS", a little-endian
+// uint32 header length, a JSON header padded to 8 bytes, then 8-byte aligned Int32/Float32/Float64 buffers.
+// Lists without gaps come back as typed arrays over the fetched bytes; lists with gaps as arrays with null.
+export function decodeTypedSeries(input) {
+  const bytes = input.byteOffset % 8 === 0 ? input : input.slice();
+  if (String.fromCharCode(...bytes.subarray(0, 4)) !== TYPED_SERIES_MAGIC) {
+    throw new Error("typed series: unexpected file signature");
+  }
+  const headerLength = new DataView(bytes.buffer, bytes.byteOffset, 8).getUint32(4, true);
+  const decoder = UTF8_DECODER ?? new TextDecoder("utf-8");
+  const header = JSON.parse(decoder.decode(bytes.subarray(8, 8 + headerLength)));
+  const body = bytes.subarray(8 + headerLength);
+  const arrays = (header.buffers ?? []).map((buffer) => readTypedBuffer(body, buffer.offset, buffer));
+  const restore = (value) => {
+    if (Array.isArray(value)) {
+      return value.map(restore);
+    }
+    if (value && typeof value === "object") {
+      if (typeof value.$typed === "number" && Object.keys(value).length === 1) {
+        return arrays[value.$typed];
+      }
+      return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, restore(item)]));
+    }
+    return value;
+  };
+  return restore(header.payload);
+}
+
+// Resolves to null without fetching anything when the build did not list ``path`` in the manifest.
+export async function fetchDatasetTypedSeries(path, options = {}) {
+  const { url, immutable } = await resolveDataUrl(path);
+  if (!immutable) {
+    return null;
+  }
+  return decodeTypedSeries(await fetchGzipBytes(url, { cache: "force-cache", ...options }));
+}
@@ -1,36 +1,55 @@
-import gzip
-import inspect
-import json
+import argparse
+import importlib
 import math
+import os
 import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Set
-
-import pandas as pd
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 if __package__ in {None, ""}:
     import sys
 
     CURRENT_DIR = Path(__file__).resolve().parent
     sys.path.insert(0, str(CURRENT_DIR))
-    from generate_compensation_data import (  # type: ignore
-        TERM_YEARS,
+    # Run as a script (or as a spawned worker's main module), the stages that import build_dashboard_data
+    # get this module rather than a second copy.
+    sys.modules.setdefault("build_dashboard_data", sys.modules[__name__])
+    from common import (  # type: ignore
         WINNING_KEYWORDS,
         add_generated_at,
-        add_years_safe,
-        build_party_compensation,
-        to_iso_date,
+    )
+    from delta_patches import record_release  # type: ignore
+    from output_writer import (  # type: ignore
+        COLUMNAR_SCHEMA_VERSION,
+        COMPRESSION_PROFILES,
+        columnar_payload,
+        encode_typed_series,
+        load_manifest,
+        publish_bytes,
+        publish_json,
+        save_manifest,
+        set_compression_profile,
     )
 else:
-    from .generate_compensation_data import (
-        TERM_YEARS,
+    from .common import (
         WINNING_KEYWORDS,
         add_generated_at,
-        add_years_safe,
-        build_party_compensation,
-        to_iso_date,
+    )
+    from .delta_patches import record_release
+    from .output_writer import (
+        COLUMNAR_SCHEMA_VERSION,
+        COMPRESSION_PROFILES,
+        columnar_payload,
+        encode_typed_series,
+        load_manifest,
+        publish_bytes,
+        publish_json,
+        save_manifest,
+        set_compression_profile,
     )
 
 ROOT = Path(__file__).resolve().parent.parent
@@ -46,6 +65,12 @@ COMPENSATION_OUTPUT_PATH = DATA_DIR / "compensation.json.gz"
 TOP_DASHBOARD_OUTPUT_PATH = DATA_DIR / "top_dashboard.json.gz"
 WIN_RATE_OUTPUT_PATH = DATA_DIR / "win_rate.json.gz"
 VOTE_OPTIMIZATION_OUTPUT_PATH = DATA_DIR / "vote_optimization.json.gz"
+SEARCH_INDEX_OUTPUT_PATH = DATA_DIR / "candidate_search_index.json.gz"
+MAP_MUNICIPALITIES_OUTPUT_PATH = DATA_DIR / "map_municipalities.json.gz"
+CANDIDATE_IDENTITY_OUTPUT_PATH = DATA_DIR / "candidate_identities.json.gz"
+ELECTION_FACTS_OUTPUT_PATH = DATA_DIR / "election_facts.json.gz"
+TOP_DASHBOARD_SERIES_PATH = DATA_DIR / "top_dashboard_series.bin.gz"
+WIN_RATE_SERIES_PATH = DATA_DIR / "win_rate_series.bin.gz"
 
 PARTY_FOUNDATION_DATES = {
     "自由民主党": datetime(1955, 11, 15),
@@ -90,6 +115,8 @@ def parse_date(value: Any) -> Optional[date]:
     text = normalise_string(value)
     if not text:
         return None
+    import pandas as pd
+
     parsed = pd.to_datetime(text, errors="coerce", utc=False)
     if pd.isna(parsed):
         return None
@@ -115,6 +142,8 @@ def parse_yyyymmdd(value: Optional[str]) -> Optional[date]:
 def load_election_summary() -> List[Dict[str, Any]]:
     if not ELECTION_SUMMARY_PATH.exists():
         raise FileNotFoundError(f"{ELECTION_SUMMARY_PATH} was not found")
+    import pandas as pd
+
     df = pd.read_csv(ELECTION_SUMMARY_PATH, dtype=object)
     records: List[Dict[str, Any]] = []
     for row in df.to_dict(orient="records"):
@@ -171,22 +200,39 @@ def clean_numeric(value: Any) -> Optional[int]:
     return int(number)
 
 
+def split_source_file(raw_source: str) -> Tuple[str, Optional[str]]:
+    """Return the election key and ``YYYYMMDD`` code encoded in a scraped file name."""
+    cleaned_source = raw_source[:-5] if raw_source.lower().endswith(".html") else raw_source
+    match = SOURCE_PATTERN.match(cleaned_source)
+    if match:
+        return normalise_string(match.group(1)), match.group(2)
+    return cleaned_source, None
+
+
+def resolve_election_date(
+    election_key: str,
+    date_code: Optional[str],
+    summary_index: Dict[str, List[Dict[str, Any]]],
+) -> Optional[date]:
+    election_date = parse_yyyymmdd(date_code)
+    if election_date is None:
+        summary_list = summary_index.get(election_key)
+        if summary_list:
+            election_date = summary_list[0]["election_day"]
+    return election_date
+
+
 def load_candidate_details(summary_index: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
     if not CANDIDATE_DETAILS_PATH.exists():
         raise FileNotFoundError(f"{CANDIDATE_DETAILS_PATH} was not found")
+    import pandas as pd
+
     df = pd.read_csv(CANDIDATE_DETAILS_PATH, dtype=object)
     records: List[Dict[str, Any]] = []
     for row in df.to_dict(orient="records"):
         raw_source = normalise_string(row.get("source_file"))
-        cleaned_source = raw_source[:-5] if raw_source.lower().endswith(".html") else raw_source
-        match = SOURCE_PATTERN.match(cleaned_source)
-        election_key = normalise_string(match.group(1)) if match else cleaned_source
-        election_date_code = match.group(2) if match else None
-        election_date = parse_yyyymmdd(election_date_code)
-        if election_date is None:
-            summary_list = summary_index.get(election_key)
-            if summary_list:
-                election_date = summary_list[0]["election_day"]
+        election_key, election_date_code = split_source_file(raw_source)
+        election_date = resolve_election_date(election_key, election_date_code, summary_index)
 
         def as_number(value: Any) -> Optional[int]:
             number = clean_numeric(value)
@@ -229,11 +275,15 @@ def parse_iso_datetime(value: Optional[str]) -> Optional[datetime]:
         return None
 
 
-def build_election_events(candidates: List[Dict[str, Any]]):
+def build_election_events(
+    candidates: List[Dict[str, Any]],
+    indices: Optional[Iterable[int]] = None,
+):
     events_map: Dict[str, Dict[str, Any]] = {}
     municipality_set = set()
 
-    for candidate in candidates:
+    positions = range(len(candidates)) if indices is None else indices
+    for position, candidate in zip(positions, candidates):
         if not is_winning_outcome(candidate.get("outcome")):
             continue
         election_date = parse_iso_datetime(candidate.get("election_date"))
@@ -255,6 +305,7 @@ def build_election_events(candidates: List[Dict[str, Any]]):
                 "date": election_date,
                 "date_code": date_code,
                 "winners": defaultdict(int),
+                "first_seen": position,
             }
             events_map[event_key] = event
 
@@ -271,6 +322,7 @@ def build_election_events(candidates: List[Dict[str, Any]]):
                     "date": event["date"],
                     "date_code": event["date_code"],
                     "winners": dict(event["winners"]),
+                    "first_seen": event["first_seen"],
                 }
             )
 
@@ -278,59 +330,89 @@ def build_election_events(candidates: List[Dict[str, Any]]):
     return events, len(municipality_set)
 
 
-def build_party_timeline(events: List[Dict[str, Any]], top_n: int = 8, term_years: int = TERM_YEARS):
-    if not events:
-        return {
-            "date_labels": [],
-            "series": [],
-            "parties": [],
-            "totals": {},
-            "sparkline_values": {},
-            "total_seats": 0,
-            "min_date": None,
-            "max_date": None,
-        }
-
-    foundation_dates: Dict[str, datetime] = dict(PARTY_FOUNDATION_DATES)
-
-    events_by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
-    for event in events:
-        events_by_key[event["key"]].append(event)
-
-    timeline_events = []
-    for key, entries in events_by_key.items():
-        entries.sort(key=lambda item: item["date"])
+def build_timeline_changes(terms: Iterable[Dict[str, Any]]) -> List[tuple]:
+    """Return seat deltas of ``seat_terms`` rows as ``(order, date_code, date, party, delta)`` tuples.
+
+    Terms never span municipalities, so the sweep runs per ``source_key`` and
+    the resulting changes can be produced for any partition of the terms. The
+    ``order`` element reproduces the global event order of a single sweep.
+    """
+    elections_by_key: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+    for term in terms:
+        election = elections_by_key[term["source_key"]].get(term["term_start"])
+        if election is None:
+            election = {
+                "date": datetime.fromisoformat(term["term_start"]),
+                "term_end": datetime.fromisoformat(term["term_end"]),
+                "winners": {},
+                "first_seen": term["first_seen"],
+            }
+            elections_by_key[term["source_key"]][term["term_start"]] = election
+        election["winners"][term["party"]] = term["seats"]
+
+    changes: List[tuple] = []
+    for key, elections in elections_by_key.items():
+        entries = sorted(elections.values(), key=lambda item: item["date"])
+        key_rank = (entries[0]["date"], entries[0]["first_seen"])
+        timeline_events = []
         for index, event in enumerate(entries):
-            term_id = f"{event['key']}-{event['date'].strftime('%Y-%m-%d')}"
+            term_id = f"{key}-{event['date'].strftime('%Y-%m-%d')}"
             timeline_events.append({
                 "type": "election",
                 "date": event["date"],
-                "date_code": event["date_code"],
-                "key": event["key"],
+                "date_code": event["date"].strftime("%Y%m%d"),
                 "winners": event["winners"],
                 "term_id": term_id,
+                "position": index * 2,
             })
-
-            next_event = entries[index + 1] if index + 1 < len(entries) else None
-            if next_event:
-                expiration_dt = max(next_event["date"], event["date"])
-            else:
-                expiration_date = add_years_safe(event["date"].date(), term_years)
-                expiration_dt = datetime(expiration_date.year, expiration_date.month, expiration_date.day)
-
             timeline_events.append({
                 "type": "expiration",
-                "date": expiration_dt,
-                "date_code": expiration_dt.strftime("%Y%m%d"),
-                "key": event["key"],
+                "date": event["term_end"],
+                "date_code": event["term_end"].strftime("%Y%m%d"),
                 "winners": event["winners"],
                 "term_id": term_id,
+                "position": index * 2 + 1,
             })
 
-    timeline_events.sort(key=lambda item: (item["date"], 0 if item["type"] == "expiration" else 1))
+        timeline_events.sort(key=lambda item: (item["date"], 0 if item["type"] == "expiration" else 1))
+
+        active_term: Optional[Dict[str, Any]] = None
+        for event in timeline_events:
+            type_rank = 0 if event["type"] == "expiration" else 1
+            order = (event["date"], type_rank, key_rank, event["position"])
+            if event["type"] == "expiration":
+                if not active_term or active_term["term_id"] != event["term_id"]:
+                    continue
+                for party, count in active_term["seats"].items():
+                    changes.append((order, event["date_code"], event["date"], party, -count))
+                active_term = None
+                continue
+
+            if active_term:
+                for party, count in active_term["seats"].items():
+                    changes.append((order, event["date_code"], event["date"], party, -count))
+
+            seats_snapshot = {}
+            for party, count in event["winners"].items():
+                foundation = PARTY_FOUNDATION_DATES.get(party)
+                if foundation and event["date"] < foundation:
+                    continue
+                changes.append((order, event["date_code"], event["date"], party, count))
+                seats_snapshot[party] = count
+
+            active_term = {"term_id": event["term_id"], "seats": seats_snapshot} if seats_snapshot else None
+
+    return changes
+
+
+def build_party_timeline(terms: Iterable[Dict[str, Any]], top_n: int = 8):
+    return build_party_timeline_from_changes(build_timeline_changes(terms), top_n)
+
+
+def build_party_timeline_from_changes(changes: Iterable[tuple], top_n: int = 8):
+    foundation_dates: Dict[str, datetime] = dict(PARTY_FOUNDATION_DATES)
 
     change_map: Dict[str, Dict[str, Any]] = {}
-    active_terms: Dict[str, Dict[str, Any]] = {}
 
     def apply_change(date_code: str, dt: datetime, party: str, delta: float):
         foundation = foundation_dates.get(party)
@@ -349,33 +431,8 @@ def build_party_timeline(events: List[Dict[str, Any]], top_n: int = 8, term_year
         else:
             bucket["deltas"][party] = next_value
 
-    for event in timeline_events:
-        if event["type"] == "expiration":
-            current = active_terms.get(event["key"])
-            if not current or current["term_id"] != event["term_id"]:
-                continue
-            for party, count in current["seats"].items():
-                apply_change(event["date_code"], event["date"], party, -count)
-            active_terms.pop(event["key"], None)
-            continue
-
-        current = active_terms.get(event["key"])
-        if current:
-            for party, count in current["seats"].items():
-                apply_change(event["date_code"], event["date"], party, -count)
-
-        seats_snapshot = {}
-        for party, count in event["winners"].items():
-            foundation = foundation_dates.get(party)
-            if foundation and event["date"] < foundation:
-                continue
-            apply_change(event["date_code"], event["date"], party, count)
-            seats_snapshot[party] = count
-
-        if seats_snapshot:
-            active_terms[event["key"]] = {"term_id": event["term_id"], "seats": seats_snapshot}
-        else:
-            active_terms.pop(event["key"], None)
+    for _, date_code, dt, party, delta in sorted(changes, key=lambda change: change[0]):
+        apply_change(date_code, dt, party, delta)
 
     sorted_changes = [bucket for bucket in change_map.values() if bucket["deltas"]]
     sorted_changes.sort(key=lambda bucket: bucket["date"])
@@ -473,19 +530,32 @@ def build_party_timeline(events: List[Dict[str, Any]], top_n: int = 8, term_year
     }
 
 
-def build_win_rate_dataset(
+def _ordered_by_first_seen(entries: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return dict(sorted(entries.items(), key=lambda item: item[1]["first_seen"]))
+
+
+def _merge_counts(target: Dict[str, Dict[str, Any]], source: Dict[str, Dict[str, Any]], fields: Iterable[str]):
+    for key, entry in source.items():
+        current = target.get(key)
+        if current is None:
+            target[key] = dict(entry)
+            continue
+        for field in fields:
+            current[field] += entry[field]
+        if "first_seen" in entry:
+            current["first_seen"] = min(current["first_seen"], entry["first_seen"])
+
+
+def collect_win_rate_state(
     candidates: List[Dict[str, Any]],
-    party_order: Optional[Iterable[str]] = None,
-    max_parties: int = 12,
+    indices: Optional[Iterable[int]] = None,
 ) -> Dict[str, Any]:
-    summary_totals: Dict[str, Dict[str, int]] = defaultdict(lambda: {"candidates": 0, "winners": 0})
-    monthly_totals: Dict[str, Dict[str, Dict[str, int]]] = defaultdict(
-        lambda: defaultdict(lambda: {"candidates": 0, "winners": 0})
-    )
-    months_set: Set[str] = set()
+    summary_totals: Dict[str, Dict[str, int]] = {}
+    monthly_totals: Dict[str, Dict[str, Dict[str, int]]] = {}
     election_points: Dict[str, Dict[str, Any]] = {}
 
-    for candidate in candidates:
+    positions = range(len(candidates)) if indices is None else indices
+    for position, candidate in zip(positions, candidates):
         party = ensure_party_name(candidate.get("party"))
         if not party:
             continue
@@ -493,15 +563,19 @@ def build_win_rate_dataset(
         if not election_date:
             continue
         month_key = election_date.strftime("%Y-%m")
-        months_set.add(month_key)
         is_winner = is_winning_outcome(candidate.get("outcome"))
 
-        summary_entry = summary_totals[party]
+        summary_entry = summary_totals.get(party)
+        if summary_entry is None:
+            summary_entry = {"candidates": 0, "winners": 0, "first_seen": position}
+            summary_totals[party] = summary_entry
         summary_entry["candidates"] += 1
         if is_winner:
             summary_entry["winners"] += 1
 
-        month_bucket = monthly_totals[month_key][party]
+        month_bucket = monthly_totals.setdefault(month_key, {}).setdefault(
+            party, {"candidates": 0, "winners": 0}
+        )
         month_bucket["candidates"] += 1
         if is_winner:
             month_bucket["winners"] += 1
@@ -520,12 +594,54 @@ def build_win_rate_dataset(
                 "date": election_date.isoformat(),
                 "candidates": 0,
                 "winners": 0,
+                "first_seen": position,
             }
             election_points[event_key] = point
         point["candidates"] += 1
         if is_winner:
             point["winners"] += 1
 
+    return {
+        "summary_totals": summary_totals,
+        "monthly_totals": monthly_totals,
+        "election_points": election_points,
+    }
+
+
+def merge_win_rate_states(states: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    summary_totals: Dict[str, Dict[str, int]] = {}
+    monthly_totals: Dict[str, Dict[str, Dict[str, int]]] = {}
+    election_points: Dict[str, Dict[str, Any]] = {}
+    for state in states:
+        _merge_counts(summary_totals, state["summary_totals"], ("candidates", "winners"))
+        for month_key, parties in state["monthly_totals"].items():
+            _merge_counts(monthly_totals.setdefault(month_key, {}), parties, ("candidates", "winners"))
+        _merge_counts(election_points, state["election_points"], ("candidates", "winners"))
+    return {
+        "summary_totals": _ordered_by_first_seen(summary_totals),
+        "monthly_totals": monthly_totals,
+        "election_points": _ordered_by_first_seen(election_points),
+    }
+
+
+def build_win_rate_dataset(
+    candidates: List[Dict[str, Any]],
+    party_order: Optional[Iterable[str]] = None,
+    max_parties: int = 12,
+) -> Dict[str, Any]:
+    return build_win_rate_dataset_from_state(collect_win_rate_state(candidates), party_order, max_parties)
+
+
+def build_win_rate_dataset_from_state(
+    state: Dict[str, Any],
+    party_order: Optional[Iterable[str]] = None,
+    max_parties: int = 12,
+) -> Dict[str, Any]:
+    summary_totals = state["summary_totals"]
+    monthly_totals = state["monthly_totals"]
+    election_points = state["election_points"]
+    months_set: Set[str] = set(monthly_totals.keys())
+
     months = sorted(months_set)
 
     ordered_parties: List[str] = []
@@ -643,10 +759,15 @@ def build_win_rate_dataset(
     )
 
 
-def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+def collect_election_results_state(
+    candidates: List[Dict[str, Any]],
+    indices: Optional[Iterable[int]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Group candidates by election (``election_key|YYYY-MM-DD``) with vote and winner totals per party."""
     elections: Dict[str, Dict[str, Any]] = {}
 
-    for candidate in candidates:
+    positions = range(len(candidates)) if indices is None else indices
+    for position, candidate in zip(positions, candidates):
         election_key = normalise_string(candidate.get("source_key")) or normalise_string(
             candidate.get("source_file")
         )
@@ -664,11 +785,12 @@ def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[st
                 "total_candidates": 0,
                 "winner_count": 0,
                 "min_win_vote": None,
+                "max_lose_vote": None,
                 "missing_winner_votes": False,
                 "total_votes": 0,
-                "parties": defaultdict(
-                    lambda: {"total_votes": 0, "actual_winners": 0, "candidates": 0}
-                ),
+                "voted_candidates": 0,
+                "parties": {},
+                "first_seen": position,
             }
             elections[election_id] = entry
 
@@ -679,14 +801,18 @@ def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[st
         entry["total_candidates"] += 1
         if votes is not None and isinstance(votes, (int, float)):
             entry["total_votes"] += int(votes)
+            entry["voted_candidates"] += 1
 
-        party_bucket = entry["parties"][party]
+        party_bucket = entry["parties"].setdefault(
+            party, {"total_votes": 0, "actual_winners": 0, "winners": 0, "candidates": 0}
+        )
         party_bucket["candidates"] += 1
         if isinstance(votes, (int, float)):
             party_bucket["total_votes"] += int(votes)
 
         if is_winner:
             entry["winner_count"] += 1
+            party_bucket["winners"] += 1
             if not isinstance(votes, (int, float)):
                 entry["missing_winner_votes"] = True
             else:
@@ -694,7 +820,45 @@ def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[st
                 current_min = entry["min_win_vote"]
                 entry["min_win_vote"] = vote_value if current_min is None else min(current_min, vote_value)
                 party_bucket["actual_winners"] += 1
+        elif isinstance(votes, (int, float)):
+            current_max = entry["max_lose_vote"]
+            entry["max_lose_vote"] = int(votes) if current_max is None else max(current_max, int(votes))
+
+    return elections
+
+
+def _merge_extreme(current: Dict[str, Any], entry: Dict[str, Any], field: str, pick: Callable) -> None:
+    if entry[field] is not None:
+        current[field] = entry[field] if current[field] is None else pick(current[field], entry[field])
+
+
+def merge_election_results_states(states: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    elections: Dict[str, Dict[str, Any]] = {}
+    for state in states:
+        for election_id, entry in state.items():
+            current = elections.get(election_id)
+            if current is None:
+                elections[election_id] = dict(entry, parties={k: dict(v) for k, v in entry["parties"].items()})
+                continue
+            for field in ("total_candidates", "winner_count", "total_votes", "voted_candidates"):
+                current[field] += entry[field]
+            current["missing_winner_votes"] = current["missing_winner_votes"] or entry["missing_winner_votes"]
+            _merge_extreme(current, entry, "min_win_vote", min)
+            _merge_extreme(current, entry, "max_lose_vote", max)
+            current["first_seen"] = min(current["first_seen"], entry["first_seen"])
+            _merge_counts(
+                current["parties"], entry["parties"], ("total_votes", "actual_winners", "winners", "candidates")
+            )
+    return _ordered_by_first_seen(elections)
+
 
+def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    election_facts = import_pipeline_module("election_facts")
+    facts = election_facts.build_election_facts([], collect_election_results_state(candidates))
+    return build_vote_optimization_dataset_from_facts(facts)
+
+
+def build_vote_optimization_dataset_from_facts(facts: Dict[Tuple[str, str], Dict[str, Any]]) -> Dict[str, Any]:
     included_elections: List[Dict[str, Any]] = []
     excluded_reasons = {
         "executive_election": 0,
@@ -719,25 +883,28 @@ def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[st
     def is_executive_election(name: str) -> bool:
         return any(keyword in name for keyword in EXECUTIVE_KEYWORDS)
 
-    for entry in elections.values():
-        election_name = entry.get("election_key", "")
+    for fact in facts.values():
+        # Elections known only from election_summary have no candidate rows to analyse.
+        if not fact["candidates_listed"]:
+            continue
+        election_name = fact["election_key"]
         if election_name and is_executive_election(election_name):
             excluded_reasons["executive_election"] += 1
             continue
-        if entry["winner_count"] == 0:
+        if fact["winner_count"] == 0:
             excluded_reasons["no_winners"] += 1
             continue
-        if entry["missing_winner_votes"]:
+        if fact["missing_winner_votes"]:
             excluded_reasons["missing_winner_votes"] += 1
             continue
-        min_win_vote = entry["min_win_vote"]
+        min_win_vote = fact["min_winning_vote"]
         if not isinstance(min_win_vote, (int, float)) or min_win_vote <= 0:
             excluded_reasons["invalid_min_vote"] += 1
             continue
 
         party_results: List[Dict[str, Any]] = []
         total_gap = 0
-        for party, stats in entry["parties"].items():
+        for party, stats in fact["parties"].items():
             total_votes = int(stats["total_votes"])
             if total_votes <= 0:
                 continue
@@ -770,21 +937,22 @@ def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[st
         party_results.sort(key=lambda item: (item["gap"], item["potential_winners"]), reverse=True)
 
         election_payload = {
-            "election_key": entry["election_key"],
-            "election_date": entry["election_date"].date().isoformat(),
+            "election_key": fact["election_key"],
+            "election_date": fact["election_date"],
             "min_winning_vote": int(min_win_vote),
-            "total_candidates": int(entry["total_candidates"]),
-            "winner_count": int(entry["winner_count"]),
-            "total_votes": int(entry["total_votes"]),
+            "total_candidates": int(fact["candidates_listed"]),
+            "winner_count": int(fact["winner_count"]),
+            "total_votes": int(fact["total_votes"] or 0),
             "total_gap": int(total_gap),
             "party_results": party_results,
         }
         included_elections.append(election_payload)
 
-        if min_date is None or entry["election_date"] < min_date:
-            min_date = entry["election_date"]
-        if max_date is None or entry["election_date"] > max_date:
-            max_date = entry["election_date"]
+        election_date = datetime.fromisoformat(fact["election_date"])
+        if min_date is None or election_date < min_date:
+            min_date = election_date
+        if max_date is None or election_date > max_date:
+            max_date = election_date
 
     party_summary = [
         {
@@ -820,10 +988,26 @@ def build_vote_optimization_dataset(candidates: List[Dict[str, Any]]) -> Dict[st
     )
 
 
+def collect_timeline_state(terms: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    terms = list(terms)
+    return {
+        "municipalities": sorted({term["source_key"] for term in terms}),
+        "changes": build_timeline_changes(terms),
+    }
+
+
 def build_top_dashboard_payload(candidates: List[Dict[str, Any]]):
-    events, municipality_count = build_election_events(candidates)
-    timeline = build_party_timeline(events)
+    events, _ = build_election_events(candidates)
+    terms = import_pipeline_module("seat_terms").build_seat_terms(events)
+    return build_top_dashboard_payload_from_state(collect_timeline_state(terms))
+
 
+def build_top_dashboard_payload_from_state(state: Dict[str, Any]):
+    timeline = build_party_timeline_from_changes(state["changes"])
+    return build_top_dashboard_payload_from_timeline(timeline, len(state["municipalities"]))
+
+
+def build_top_dashboard_payload_from_timeline(timeline: Dict[str, Any], municipality_count: int):
     summary = {
         "municipality_count": municipality_count,
         "total_seats": timeline["total_seats"],
@@ -840,52 +1024,348 @@ def build_top_dashboard_payload(candidates: List[Dict[str, Any]]):
     )
 
 
-def write_json(path: Path, payload: Dict[str, Any]) -> None:
-    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
-    if path.suffix == ".gz":
-        supports_mtime = "mtime" in inspect.signature(gzip.open).parameters
-        if supports_mtime:
-            with gzip.open(path, "wb", mtime=0) as stream:
-                stream.write(data)
-        else:
-            # Fallback for older Python without mtime support on gzip.open
-            with gzip.GzipFile(filename=str(path), mode="wb", mtime=0) as stream:
-                stream.write(data)
-    else:
-        path.write_bytes(data)
-
-
-def build_payload(records: List[Dict[str, Any]]) -> Dict[str, Any]:
-    return add_generated_at(
+def build_payload(records: List[Dict[str, Any]], schema_version: int = 1) -> Dict[str, Any]:
+    payload = add_generated_at(
         {
             "schema_version": 1,
             "records": records,
         }
     )
+    if schema_version >= COLUMNAR_SCHEMA_VERSION:
+        return columnar_payload(payload, ("records",))
+    return payload
+
+
+def import_pipeline_module(name: str):
+    if __package__ in {None, ""}:
+        return importlib.import_module(name)
+    return importlib.import_module(f"{__package__}.{name}")
+
+
+def build_compensation_rollup_payload(compensation: Dict[str, Any]) -> Dict[str, Any]:
+    """The published compensation file: rollups only, the municipality rows go to per-prefecture shards."""
+    return {key: value for key, value in compensation.items() if key != "municipality_breakdown"}
+
+
+# Intermediate products and the products each one is computed from.
+PRODUCT_DEPENDENCIES: Dict[str, tuple] = {
+    "elections": (),
+    "summary_index": ("elections",),
+    "candidates": ("summary_index",),
+    "seat_terms": ("candidates",),
+    "compensation": ("seat_terms",),
+    "top_dashboard": ("seat_terms",),
+    "win_rate": ("candidates", "top_dashboard"),
+    "election_results": ("candidates",),
+    "election_facts": ("elections", "election_results"),
+    "vote_optimization": ("election_facts",),
+    "search_index": ("candidates",),
+    "map_municipalities": ("election_facts",),
+    "candidate_identities": ("candidates",),
+}
 
+# Products the prefecture-sharded build can compute in one pass over the candidates. top_dashboard is
+# left out: it sweeps the seat_terms table, which is cheaper in this process than in the workers.
+SHARDED_PRODUCTS = ("compensation", "win_rate", "election_results")
+
+PRODUCT_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "elections": lambda products: load_election_summary(),
+    "summary_index": lambda products: build_summary_index(products["elections"]),
+    "candidates": lambda products: load_candidate_details(products["summary_index"]),
+    "compensation": lambda products: import_pipeline_module(
+        "generate_compensation_data"
+    ).build_party_compensation(products["seat_terms"]),
+    "seat_terms": lambda products: import_pipeline_module("seat_terms").load_seat_terms(
+        lambda: build_election_events(products["candidates"])[0]
+    ),
+    "top_dashboard": lambda products: build_top_dashboard_payload_from_state(
+        collect_timeline_state(products["seat_terms"])
+    ),
+    "win_rate": lambda products: build_win_rate_dataset(
+        products["candidates"], products["top_dashboard"]["timeline"].get("parties")
+    ),
+    "election_results": lambda products: collect_election_results_state(products["candidates"]),
+    "election_facts": lambda products: import_pipeline_module("election_facts").build_election_facts(
+        products["elections"], products["election_results"]
+    ),
+    "vote_optimization": lambda products: build_vote_optimization_dataset_from_facts(products["election_facts"]),
+    "search_index": lambda products: import_pipeline_module("search_index").build_search_index(
+        products["candidates"]
+    ),
+    "map_municipalities": lambda products: import_pipeline_module("map_results").build_map_municipalities(
+        products["election_facts"]
+    ),
+    "candidate_identities": lambda products: import_pipeline_module("candidate_identity").build_candidate_identities(
+        products["candidates"]
+    ),
+}
 
-def main() -> None:
-    elections = load_election_summary()
-    summary_index = build_summary_index(elections)
-    candidates = load_candidate_details(summary_index)
-    compensation = build_party_compensation()
-    top_dashboard = build_top_dashboard_payload(candidates)
-    win_rate = build_win_rate_dataset(candidates, top_dashboard["timeline"].get("parties"))
-    vote_optimization = build_vote_optimization_dataset(candidates)
-
-    # clean up compensation date fields to ISO strings for safety
-    for row in compensation.get("rows", []):
-        row["year"] = int(row["year"]) if row.get("year") is not None else None
-        row["seat_count"] = int(row["seat_count"]) if row.get("seat_count") is not None else None
-    for row in compensation.get("party_summary", []):
-        row["seat_count"] = int(row["seat_count"]) if row.get("seat_count") is not None else None
-    for row in compensation.get("municipality_breakdown", []):
-        if "term_start" in row:
-            row["term_start"] = to_iso_date(row["term_start"])
-        if "term_end" in row:
-            row["term_end"] = to_iso_date(row["term_end"])
-        if "election_date" in row:
-            row["election_date"] = to_iso_date(row["election_date"])
+OUTPUT_TARGETS: Dict[str, tuple] = {
+    ELECTION_OUTPUT_PATH.name: (ELECTION_OUTPUT_PATH, "elections", build_payload),
+    CANDIDATE_OUTPUT_PATH.name: (CANDIDATE_OUTPUT_PATH, "candidates", build_payload),
+    COMPENSATION_OUTPUT_PATH.name: (COMPENSATION_OUTPUT_PATH, "compensation", build_compensation_rollup_payload),
+    TOP_DASHBOARD_OUTPUT_PATH.name: (TOP_DASHBOARD_OUTPUT_PATH, "top_dashboard", None),
+    WIN_RATE_OUTPUT_PATH.name: (WIN_RATE_OUTPUT_PATH, "win_rate", None),
+    VOTE_OPTIMIZATION_OUTPUT_PATH.name: (VOTE_OPTIMIZATION_OUTPUT_PATH, "vote_optimization", None),
+    SEARCH_INDEX_OUTPUT_PATH.name: (SEARCH_INDEX_OUTPUT_PATH, "search_index", None),
+    MAP_MUNICIPALITIES_OUTPUT_PATH.name: (MAP_MUNICIPALITIES_OUTPUT_PATH, "map_municipalities", None),
+    CANDIDATE_IDENTITY_OUTPUT_PATH.name: (CANDIDATE_IDENTITY_OUTPUT_PATH, "candidate_identities", None),
+    ELECTION_FACTS_OUTPUT_PATH.name: (
+        ELECTION_FACTS_OUTPUT_PATH,
+        "election_facts",
+        lambda facts: import_pipeline_module("election_facts").build_election_facts_payload(facts),
+    ),
+}
+
+# Record tables stored column-wise when building with --schema-version 2.
+COLUMNAR_TABLES: Dict[str, tuple] = {
+    CANDIDATE_OUTPUT_PATH.name: ("records",),
+    COMPENSATION_OUTPUT_PATH.name: (
+        "rows",
+        "party_summary",
+        "unmatched_terms",
+        "year_totals",
+        "party_years",
+        "prefecture_years",
+        "municipalities",
+        "party_municipality_spans",
+    ),
+    MAP_MUNICIPALITIES_OUTPUT_PATH.name: ("results", "composition"),
+    CANDIDATE_IDENTITY_OUTPUT_PATH.name: ("persons", "careers", "party_switches"),
+    ELECTION_FACTS_OUTPUT_PATH.name: ("records",),
+}
+
+# Outputs also written in the binary typed series format: target -> (path, record tables made columnar first).
+TYPED_SERIES_TARGETS: Dict[str, tuple] = {
+    TOP_DASHBOARD_OUTPUT_PATH.name: (TOP_DASHBOARD_SERIES_PATH, ()),
+    WIN_RATE_OUTPUT_PATH.name: (WIN_RATE_SERIES_PATH, ("events",)),
+}
+
+
+def resolve_target_name(name: str) -> str:
+    text = normalise_string(name)
+    for target in OUTPUT_TARGETS:
+        if text in {target, target.split(".", 1)[0]}:
+            return target
+    raise ValueError(f"unknown target {name!r}; choose from {', '.join(OUTPUT_TARGETS)}")
+
+
+def required_products(names: Iterable[str], built: Iterable[str] = ()) -> List[str]:
+    """``names`` and their dependencies in build order, skipping ``built`` products and what only they need."""
+    ordered: List[str] = []
+    built = set(built)
+
+    def visit(name: str) -> None:
+        if name in ordered or name in built:
+            return
+        for dependency in PRODUCT_DEPENDENCIES[name]:
+            visit(dependency)
+        ordered.append(name)
+
+    for name in names:
+        visit(name)
+    return ordered
+
+
+# Products the sqlite backend aggregates straight from election_details.db.
+SQLITE_BACKEND_PRODUCTS = ("top_dashboard", "win_rate", "election_results")
+
+
+def build_products(names: Iterable[str], workers: int = 1, backend: str = "python") -> Dict[str, Any]:
+    names = list(names)
+    products: Dict[str, Any] = {}
+    if backend == "sqlite":
+        pushed_down = [name for name in required_products(names) if name in SQLITE_BACKEND_PRODUCTS]
+        if pushed_down:
+            products = build_products(["summary_index"], workers)
+            products.update(
+                import_pipeline_module("sqlite_aggregates").build_sqlite_aggregates(
+                    products["summary_index"], pushed_down
+                )
+            )
+    plan = required_products(names, products)
+    if workers == 1:
+        for name in plan:
+            products[name] = PRODUCT_BUILDERS[name](products)
+        return products
+
+    def build_product(name: str) -> None:
+        products[name] = PRODUCT_BUILDERS[name](products)
+
+    def build_sharded(sharded: List[str]) -> None:
+        party_order = products["top_dashboard"]["timeline"].get("parties") if "win_rate" in sharded else None
+        products.update(
+            import_pipeline_module("sharded_build").build_sharded_aggregates(
+                products.get("candidates", []), workers, sharded, party_order, products.get("seat_terms")
+            )
+        )
+
+    # Independent products are built side by side; the sharded aggregates are one stage with several outputs.
+    sharded = [name for name in plan if name in SHARDED_PRODUCTS]
+    stages = {
+        name: (PRODUCT_DEPENDENCIES[name], (name,), partial(build_product, name))
+        for name in plan
+        if name not in sharded
+    }
+    if sharded:
+        inputs = {dependency for name in sharded for dependency in PRODUCT_DEPENDENCIES[name]} - set(sharded)
+        stages["sharded_aggregates"] = (tuple(sorted(inputs)), tuple(sharded), partial(build_sharded, sharded))
+    import_pipeline_module("stage_graph").run_stages(stages, workers if workers > 0 else os.cpu_count() or 1)
+    return products
+
+
+def publish_outputs(
+    products: Dict[str, Any],
+    targets: Iterable[str],
+    schema_version: int = 1,
+    candidate_links: bool = False,
+    output_workers: int = 0,
+    typed_series: bool = False,
+) -> List[Tuple[str, bool]]:
+    """Write ``targets`` and the optional shard sets from built products; returns ``(name, written)`` pairs."""
+    manifest = load_manifest()
+
+    def publish_target(target: str) -> List[Tuple[str, bool]]:
+        path, product, prepare = OUTPUT_TARGETS[target]
+        prepared = prepare(products[product]) if prepare else products[product]
+        payload = prepared
+        if schema_version >= COLUMNAR_SCHEMA_VERSION and target in COLUMNAR_TABLES:
+            payload = columnar_payload(prepared, COLUMNAR_TABLES[target])
+        results = [(target, publish_json(path, payload, manifest, record_release))]
+        if typed_series and target in TYPED_SERIES_TARGETS:
+            series_path, tables = TYPED_SERIES_TARGETS[target]
+            data = encode_typed_series(prepared, tables)
+            results.append((series_path.name, publish_bytes(series_path, data, manifest)))
+        if target == COMPENSATION_OUTPUT_PATH.name:
+            compensation_shards = import_pipeline_module("compensation_shards")
+            index = compensation_shards.write_compensation_shards(
+                products["compensation"].get("municipality_breakdown", []), schema_version
+            )
+            index_path = compensation_shards.COMPENSATION_SHARD_INDEX_PATH
+            results.append((index_path.name, publish_json(index_path, index, manifest)))
+        return results
+
+    def publish_candidate_links() -> List[Tuple[str, bool]]:
+        links = import_pipeline_module("candidate_links")
+        index = links.write_candidate_links(products["candidates"])
+        return [(links.LINK_INDEX_PATH.name, publish_json(links.LINK_INDEX_PATH, index, manifest))]
+
+    jobs: List[Callable[[], List[Tuple[str, bool]]]] = [partial(publish_target, target) for target in targets]
+    if candidate_links:
+        jobs.append(publish_candidate_links)
+    if not jobs:
+        return []
+    # Each job writes its own files and manifest entry; serialising holds the GIL but zlib
+    # releases it, so compression of the large payloads overlaps.
+    workers = output_workers or min(len(jobs), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        results = [result for results in executor.map(lambda job: job(), jobs) for result in results]
+    save_manifest(manifest)
+    return results
+
+
+# The options the published data is built with; run_pipeline and the release workflow pass --release.
+RELEASE_DEFAULTS: Dict[str, Any] = {"schema_version": COLUMNAR_SCHEMA_VERSION}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the precomputed dashboard datasets.")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        metavar="TARGET",
+        help="outputs to build, e.g. win_rate.json.gz or win_rate (default: all)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes for the prefecture-sharded build, and threads building independent products "
+        "side by side (1 = serial, 0 = all cores)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("python", "sqlite"),
+        default="python",
+        help="sqlite aggregates top_dashboard, win_rate and the per-election results with GROUP BY queries "
+        "against data/election_details.db instead of loading every candidate",
+    )
+    parser.add_argument(
+        "--schema-version",
+        type=int,
+        choices=(1, COLUMNAR_SCHEMA_VERSION),
+        default=1,
+        help="2 writes candidate and compensation tables in the dictionary-encoded columnar layout",
+    )
+    parser.add_argument(
+        "--candidate-links",
+        action="store_true",
+        help="also write per-id-range candidate link shards from data/politician_links.db "
+        "(always written when building every target and the database exists)",
+    )
+    parser.add_argument(
+        "--sqlite",
+        action="store_true",
+        help="also write data/dashboard.sqlite (always written when building every target)",
+    )
+    parser.add_argument(
+        "--typed-series",
+        action="store_true",
+        help="also write the top_dashboard and win_rate series as little-endian Int32/Float32 buffers "
+        "(*_series.bin.gz; always written when building every target)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=tuple(COMPRESSION_PROFILES),
+        default="default",
+        help="fast (gzip level 1) for development, default (level 9), or max, which also writes "
+        ".br/.zst copies of each dataset when brotli/zstandard are installed",
+    )
+    parser.add_argument(
+        "--output-workers",
+        type=int,
+        default=0,
+        help="threads that serialise and compress the outputs (0 = one per output, up to the CPU count)",
+    )
+    parser.add_argument(
+        "--release",
+        action="store_true",
+        help="build with the published data's options (--schema-version 2); options given explicitly still apply",
+    )
+    parser.add_argument("--list-targets", action="store_true", help="print the available targets and exit")
+    args = parser.parse_args(argv)
+    if args.release:
+        parser.set_defaults(**RELEASE_DEFAULTS)
+        args = parser.parse_args(argv)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.list_targets:
+        for target, (_, product, _) in OUTPUT_TARGETS.items():
+            print(f"{target}: {' -> '.join(required_products([product]))}")
+        return
+    try:
+        targets = [resolve_target_name(name) for name in args.targets] or list(OUTPUT_TARGETS)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    targets = list(dict.fromkeys(targets))
+    variants = set_compression_profile(args.compression)
+    missing = [suffix for suffix in COMPRESSION_PROFILES[args.compression]["variants"] if suffix not in variants]
+    if missing:
+        print("Skipping", *(f".{suffix}" for suffix in missing), "copies (brotli/zstandard not installed)")
+
+    product_names = [OUTPUT_TARGETS[target][1] for target in targets]
+    candidate_links = import_pipeline_module("candidate_links")
+    build_links = args.candidate_links or (not args.targets and candidate_links.LINKS_DB_PATH.exists())
+    if build_links:
+        product_names.append("candidates")
+    build_sqlite = args.sqlite or not args.targets
+    if build_sqlite:
+        sqlite_export = import_pipeline_module("sqlite_export")
+        product_names.extend(sqlite_export.SQLITE_PRODUCTS)
+    products = build_products(product_names, args.workers, args.backend)
 
     # remove obsolete uncompressed files if any
     for stale in [
@@ -898,21 +1378,22 @@ def main() -> None:
         if stale.exists():
             stale.unlink()
 
-    write_json(ELECTION_OUTPUT_PATH, build_payload(elections))
-    write_json(CANDIDATE_OUTPUT_PATH, build_payload(candidates))
-    write_json(COMPENSATION_OUTPUT_PATH, compensation)
-    write_json(TOP_DASHBOARD_OUTPUT_PATH, top_dashboard)
-    write_json(WIN_RATE_OUTPUT_PATH, win_rate)
-    write_json(VOTE_OPTIMIZATION_OUTPUT_PATH, vote_optimization)
-    print(
-        "Generated dashboard data:",
-        ELECTION_OUTPUT_PATH.name,
-        CANDIDATE_OUTPUT_PATH.name,
-        COMPENSATION_OUTPUT_PATH.name,
-        TOP_DASHBOARD_OUTPUT_PATH.name,
-        WIN_RATE_OUTPUT_PATH.name,
-        VOTE_OPTIMIZATION_OUTPUT_PATH.name,
+    results = publish_outputs(
+        products,
+        targets,
+        args.schema_version,
+        build_links,
+        args.output_workers,
+        args.typed_series or not args.targets,
     )
+    written = [name for name, changed in results if changed]
+    unchanged = [name for name, changed in results if not changed]
+    print("Generated dashboard data:", *(written or ["(none)"]))
+    if unchanged:
+        print("Unchanged (write skipped):", *unchanged)
+    if build_sqlite:
+        counts = sqlite_export.write_dashboard_sqlite(products)
+        print(f"Wrote {sqlite_export.SQLITE_OUTPUT_PATH.name}:", *(f"{name}={count}" for name, count in counts.items()))
 
 
 if __name__ == "__main__":
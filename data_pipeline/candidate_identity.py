@@ -0,0 +1,256 @@
+"""Link candidacies of the same person across elections.
+
+Each ``candidate_details`` row is one candidacy. Comparing every pair of rows
+is quadratic, so pairs are only generated inside *blocks*. A block holds the
+candidacies with the same folded kana (or the folded name when the kana is
+missing) in the same prefecture. Inside a block, rows are sorted by estimated
+birth year, ``election year - age``. Since age is taken on election day, the
+true birth year is that estimate or one less. So only rows whose estimates
+lie within ``BIRTH_YEAR_WINDOW`` of each other are compared. Rows without an
+age are compared with the whole block.
+
+Each pair gets a score from the name, birth year, municipality, gender and
+party evidence. Pairs that cannot be one person are dropped: different
+gender, birth years too far apart, or candidacies on the same election day.
+Pairs scoring at least ``MATCH_THRESHOLD`` are merged, highest score first.
+A merge is skipped if the person would then stand in two elections on one
+day.
+
+A person id is a hash of the person's earliest candidacy (source file,
+name, kana and age). It stays the same when later elections are added. Each
+person gets a career of candidacies in date order, with wins and party
+switches, and summary counts of repeat candidacies, re-election and party
+switching.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from build_dashboard_data import ensure_party_name, is_winning_outcome, normalise_string  # type: ignore
+    from common import OLD_KANJI_VARIANTS, add_generated_at, normalise_search_text, source_prefecture  # type: ignore
+else:
+    from .build_dashboard_data import ensure_party_name, is_winning_outcome, normalise_string
+    from .common import OLD_KANJI_VARIANTS, add_generated_at, normalise_search_text, source_prefecture
+
+IDENTITY_VERSION = 1
+PERSON_ID_LENGTH = 12
+BIRTH_YEAR_WINDOW = 1
+MATCH_THRESHOLD = 3.5
+
+# Score contributions; a pair needs MATCH_THRESHOLD in total.
+NAME_MATCH = 2.0
+NAME_MISMATCH = -1.0
+BIRTH_YEAR_EXACT = 2.0
+BIRTH_YEAR_ADJACENT = 1.0
+SAME_MUNICIPALITY = 1.5
+SAME_PARTY = 0.5
+
+
+def name_key(value: Any) -> str:
+    return normalise_search_text(value).translate(OLD_KANJI_VARIANTS)
+
+
+def candidacy_features(position: int, candidate: Dict[str, Any]) -> Dict[str, Any]:
+    election_date = normalise_string(candidate.get("election_date"))[:10]
+    age = candidate.get("age")
+    birth_year = int(election_date[:4]) - int(age) if election_date and isinstance(age, (int, float)) else None
+    return {
+        "position": position,
+        "name_key": name_key(candidate.get("name")),
+        "kana_key": normalise_search_text(candidate.get("kana")),
+        "prefecture": source_prefecture(candidate.get("source_key")),
+        "source_key": normalise_string(candidate.get("source_key")),
+        "election_date": election_date,
+        "birth_year": birth_year,
+        "gender": normalise_string(candidate.get("gender")),
+        "party": ensure_party_name(candidate.get("party")),
+    }
+
+
+def blocking_key(features: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    key = features["kana_key"] or features["name_key"]
+    return (key, features["prefecture"]) if key else None
+
+
+def candidate_pairs(block: List[Dict[str, Any]]) -> Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Pairs inside one block whose birth-year estimates are within the window (or unknown)."""
+    aged = sorted((row for row in block if row["birth_year"] is not None), key=lambda row: row["birth_year"])
+    unaged = [row for row in block if row["birth_year"] is None]
+    for index, row in enumerate(aged):
+        for other in aged[index + 1 :]:
+            if other["birth_year"] - row["birth_year"] > BIRTH_YEAR_WINDOW:
+                break
+            yield row, other
+    for row in unaged:
+        for other in block:
+            if other is not row and (other["birth_year"] is not None or other["position"] > row["position"]):
+                yield row, other
+
+
+def score_pair(first: Dict[str, Any], second: Dict[str, Any]) -> Optional[float]:
+    """Match score of two candidacies, or ``None`` when they cannot be the same person."""
+    if not first["election_date"] or first["election_date"] == second["election_date"]:
+        return None
+    if first["gender"] and second["gender"] and first["gender"] != second["gender"]:
+        return None
+    score = NAME_MATCH if first["name_key"] == second["name_key"] else NAME_MISMATCH
+    if first["birth_year"] is not None and second["birth_year"] is not None:
+        difference = abs(first["birth_year"] - second["birth_year"])
+        if difference > BIRTH_YEAR_WINDOW:
+            return None
+        score += BIRTH_YEAR_EXACT if difference == 0 else BIRTH_YEAR_ADJACENT
+    if first["source_key"] and first["source_key"] == second["source_key"]:
+        score += SAME_MUNICIPALITY
+    if first["party"] == second["party"]:
+        score += SAME_PARTY
+    return score
+
+
+def resolve_clusters(features: List[Dict[str, Any]]) -> List[List[int]]:
+    """Group candidacy positions into people; returns clusters sorted by their first position."""
+    blocks: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+    for row in features:
+        key = blocking_key(row)
+        if key is not None:
+            blocks[key].append(row)
+
+    scored: List[Tuple[float, int, int]] = []
+    for block in blocks.values():
+        for first, second in candidate_pairs(block):
+            score = score_pair(first, second)
+            if score is not None and score >= MATCH_THRESHOLD:
+                low, high = sorted((first["position"], second["position"]))
+                scored.append((score, low, high))
+    scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+
+    parent = list(range(len(features)))
+    dates = [{row["election_date"]} if row["election_date"] else set() for row in features]
+
+    def root(position: int) -> int:
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    for _, low, high in scored:
+        first, second = root(low), root(high)
+        # One person stands in at most one election per day.
+        if first == second or dates[first] & dates[second]:
+            continue
+        first, second = min(first, second), max(first, second)
+        parent[second] = first
+        dates[first] |= dates[second]
+        dates[second] = set()
+
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for position in range(len(features)):
+        clusters[root(position)].append(position)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def person_id(anchor: Dict[str, Any]) -> str:
+    fields = ("source_file", "name", "kana", "age")
+    text = "|".join(normalise_string(anchor.get(field)) for field in fields)
+    return "p" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:PERSON_ID_LENGTH]
+
+
+def build_candidate_identities(candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    features = [candidacy_features(position, candidate) for position, candidate in enumerate(candidates)]
+    clusters = resolve_clusters(features)
+
+    persons: List[Dict[str, Any]] = []
+    careers: List[Dict[str, Any]] = []
+    party_switches: List[Dict[str, Any]] = []
+    reelection_attempts = reelection_wins = 0
+    seen_ids: Counter = Counter()
+    for members in clusters:
+        members.sort(key=lambda position: (features[position]["election_date"] or "9999", position))
+        pid = person_id(candidates[members[0]])
+        # Namesakes of the same age in one election share an anchor text; number them in row order.
+        seen_ids[pid] += 1
+        if seen_ids[pid] > 1:
+            pid = f"{pid}-{seen_ids[pid]}"
+        wins = 0
+        previous_party: Optional[str] = None
+        won_before = False
+        switches = 0
+        for position in members:
+            candidate, row = candidates[position], features[position]
+            won = is_winning_outcome(candidate.get("outcome"))
+            careers.append(
+                {
+                    "person_id": pid,
+                    "candidate_id": normalise_string(candidate.get("candidate_id")),
+                    "election_date": row["election_date"] or None,
+                    "source_key": row["source_key"],
+                    "party": row["party"],
+                    "votes": candidate.get("votes"),
+                    "won": won,
+                    "incumbent_status": normalise_string(candidate.get("incumbent_status")),
+                }
+            )
+            if previous_party is not None and row["party"] != previous_party:
+                switches += 1
+                party_switches.append(
+                    {
+                        "person_id": pid,
+                        "election_date": row["election_date"] or None,
+                        "from_party": previous_party,
+                        "to_party": row["party"],
+                    }
+                )
+            if won_before:
+                reelection_attempts += 1
+                reelection_wins += int(won)
+            previous_party = row["party"]
+            won_before = won_before or won
+            wins += int(won)
+
+        latest = candidates[members[-1]]
+        birth_years = Counter(features[position]["birth_year"] for position in members if features[position]["birth_year"])
+        dated = [features[position]["election_date"] for position in members if features[position]["election_date"]]
+        persons.append(
+            {
+                "person_id": pid,
+                "name": normalise_string(latest.get("name")),
+                "kana": normalise_string(latest.get("kana")),
+                "prefecture": features[members[-1]]["prefecture"] or None,
+                "birth_year": min(birth_years, key=lambda year: (-birth_years[year], year)) if birth_years else None,
+                "elections": len(members),
+                "wins": wins,
+                "first_date": min(dated) if dated else None,
+                "last_date": max(dated) if dated else None,
+                "parties": list(dict.fromkeys(features[position]["party"] for position in members)),
+                "party_switches": switches,
+                "municipalities": len({features[position]["source_key"] for position in members}),
+            }
+        )
+
+    repeat = sum(1 for person in persons if person["elections"] > 1)
+    return add_generated_at(
+        {
+            "schema_version": 1,
+            "identity_version": IDENTITY_VERSION,
+            "summary": {
+                "candidacies": len(candidates),
+                "persons": len(persons),
+                "repeat_candidates": repeat,
+                "party_switchers": sum(1 for person in persons if person["party_switches"]),
+                "party_switches": len(party_switches),
+                "reelection_attempts": reelection_attempts,
+                "reelection_wins": reelection_wins,
+                "reelection_rate": reelection_wins / reelection_attempts if reelection_attempts else None,
+            },
+            "persons": persons,
+            "careers": careers,
+            "party_switches": party_switches,
+        }
+    )
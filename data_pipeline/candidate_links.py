@@ -0,0 +1,128 @@
+"""Candidate web links from ``politician_links.db``, split into lazily fetched shards.
+
+``links_table(pid, links)`` holds a JSON array of URLs per politician id,
+where ``pid`` is the candidate_id of candidate_details. The candidate ids are
+loaded into a temporary table and joined to ``links_table`` through an index
+on ``pid``, which is created if the database lacks it. That gives one ordered
+pass instead of a query per candidate. Rows are streamed into shards of
+``LINK_SHARD_SIZE`` consecutive ids. A client can therefore derive the shard
+from a candidate id and fetch it only when that candidate's details are
+opened.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from build_dashboard_data import normalise_string  # type: ignore
+    from common import add_generated_at  # type: ignore
+    from output_writer import DATA_DIR, HASH_LENGTH, content_digest, encode_json, write_encoded  # type: ignore
+else:
+    from .build_dashboard_data import normalise_string
+    from .common import add_generated_at
+    from .output_writer import DATA_DIR, HASH_LENGTH, content_digest, encode_json, write_encoded
+
+LINKS_DB_PATH = DATA_DIR / "politician_links.db"
+LINK_SHARD_DIR = DATA_DIR / "links"
+LINK_INDEX_PATH = DATA_DIR / "candidate_links_index.json.gz"
+LINK_SHARD_SIZE = 2000
+PID_INDEX_NAME = "idx_links_table_pid"
+
+
+def candidate_ids(candidates: Iterable[Dict[str, Any]]) -> List[int]:
+    ids = {normalise_string(candidate.get("candidate_id")) for candidate in candidates}
+    return sorted(int(value) for value in ids if value.isdigit())
+
+
+def parse_links(text: Optional[str]) -> List[str]:
+    try:
+        values = json.loads(text) if text else []
+    except ValueError:
+        return []
+    if not isinstance(values, list):
+        return []
+    return [value.strip() for value in values if isinstance(value, str) and value.strip()]
+
+
+def iter_candidate_links(ids: Iterable[int], db_path: Path = LINKS_DB_PATH) -> Iterator[Tuple[int, List[str]]]:
+    """Yield ``(candidate_id, links)`` in id order for candidates with at least one link.
+
+    Duplicate ``pid`` rows are merged in rowid order without repeating a URL.
+    """
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.execute(f'CREATE INDEX IF NOT EXISTS "{PID_INDEX_NAME}" ON links_table(pid)')
+        connection.commit()
+        connection.execute("CREATE TEMP TABLE candidate_ids (pid INTEGER PRIMARY KEY)")
+        connection.executemany("INSERT OR IGNORE INTO candidate_ids (pid) VALUES (?)", ((pid,) for pid in ids))
+        cursor = connection.execute(
+            """
+            SELECT c.pid, l.links
+            FROM candidate_ids AS c
+            JOIN links_table AS l ON l.pid = c.pid
+            WHERE l.links IS NOT NULL AND l.links != '[]'
+            ORDER BY c.pid, l.rowid
+            """
+        )
+        for pid, rows in groupby(cursor, key=itemgetter(0)):
+            links = list(dict.fromkeys(url for _, text in rows for url in parse_links(text)))
+            if links:
+                yield pid, links
+    finally:
+        connection.close()
+
+
+def shard_key(pid: int) -> str:
+    return f"{pid // LINK_SHARD_SIZE:04d}"
+
+
+def shard_path(key: str, digest: str) -> Path:
+    return LINK_SHARD_DIR / f"{key}.{digest[:HASH_LENGTH]}.json.gz"
+
+
+def write_link_shard(key: str, links: Dict[str, List[str]]) -> Dict[str, Any]:
+    data = encode_json(add_generated_at({"schema_version": 1, "links": links}))
+    digest = content_digest(data)
+    path = shard_path(key, digest)
+    if not path.exists():
+        write_encoded(path, data)
+    ids = [int(pid) for pid in links]
+    return {
+        "key": key,
+        "file": path.relative_to(DATA_DIR).as_posix(),
+        "candidates": len(links),
+        "id_from": min(ids),
+        "id_to": max(ids),
+        "bytes": path.stat().st_size,
+        "sha256": digest,
+    }
+
+
+def write_candidate_links(candidates: List[Dict[str, Any]], db_path: Path = LINKS_DB_PATH) -> Dict[str, Any]:
+    """Write the link shards for ``candidates``, remove superseded ones and return the index payload."""
+    LINK_SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    entries = []
+    # Only one shard is held in memory at a time.
+    for key, rows in groupby(iter_candidate_links(candidate_ids(candidates), db_path), key=lambda row: shard_key(row[0])):
+        entries.append(write_link_shard(key, {str(pid): links for pid, links in rows}))
+    keep = {Path(entry["file"]).name for entry in entries}
+    for path in LINK_SHARD_DIR.glob("*.json.gz"):
+        if path.name not in keep:
+            path.unlink()
+    return add_generated_at(
+        {
+            "schema_version": 1,
+            "shard_size": LINK_SHARD_SIZE,
+            "candidates": sum(entry["candidates"] for entry in entries),
+            "shards": entries,
+        }
+    )
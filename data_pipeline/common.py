@@ -0,0 +1,186 @@
+"""Lightweight constants and helpers shared by the pipeline stages.
+
+Kept free of pandas so that importing a builder stays cheap until a stage
+actually needs to read tabular data.
+"""
+
+import re
+import unicodedata
+from datetime import date
+from typing import Dict, Tuple
+
+FIXED_GENERATED_AT = "1970-01-01T00:00:00+00:00"
+
+WINNING_KEYWORDS = [
+    "当選",
+    "補欠当選",
+    "繰上当選",
+    "繰り上げ当選",
+    "当せん",
+    "再選",
+]
+
+PREFECTURES = [
+    "北海道",
+    "青森県",
+    "岩手県",
+    "宮城県",
+    "秋田県",
+    "山形県",
+    "福島県",
+    "茨城県",
+    "栃木県",
+    "群馬県",
+    "埼玉県",
+    "千葉県",
+    "東京都",
+    "神奈川県",
+    "新潟県",
+    "富山県",
+    "石川県",
+    "福井県",
+    "山梨県",
+    "長野県",
+    "岐阜県",
+    "静岡県",
+    "愛知県",
+    "三重県",
+    "滋賀県",
+    "京都府",
+    "大阪府",
+    "兵庫県",
+    "奈良県",
+    "和歌山県",
+    "鳥取県",
+    "島根県",
+    "岡山県",
+    "広島県",
+    "山口県",
+    "徳島県",
+    "香川県",
+    "愛媛県",
+    "高知県",
+    "福岡県",
+    "佐賀県",
+    "長崎県",
+    "熊本県",
+    "大分県",
+    "宮崎県",
+    "鹿児島県",
+    "沖縄県",
+]
+
+TERM_YEARS = 4
+
+# Bump when the municipality key normalisation changes so cached indexes rebuild.
+MUNICIPALITY_KEY_VERSION = 1
+
+KANA_VARIANTS = str.maketrans({"ヶ": "ケ", "ヵ": "ケ", "ゖ": "ケ", "ゕ": "ケ"})
+
+OLD_KANJI_VARIANTS = str.maketrans(
+    {
+        "澤": "沢",
+        "邊": "辺",
+        "邉": "辺",
+        "龍": "竜",
+        "櫻": "桜",
+        "廣": "広",
+        "國": "国",
+        "嶋": "島",
+        "嶌": "島",
+        "檜": "桧",
+        "眞": "真",
+        "濱": "浜",
+        "髙": "高",
+        "﨑": "崎",
+        "嵜": "崎",
+        "齋": "斎",
+        "齊": "斉",
+        "惠": "恵",
+        "萬": "万",
+        "與": "与",
+        "關": "関",
+        "寶": "宝",
+        "藏": "蔵",
+        "豐": "豊",
+        "靜": "静",
+        "會": "会",
+        "縣": "県",
+        "舘": "館",
+    }
+)
+
+# Former municipalities absorbed before the 2020 compensation survey, keyed by
+# (prefecture, former name) and pointing at the successor municipality.
+MERGED_MUNICIPALITIES: Dict[Tuple[str, str], str] = {
+    ("埼玉県", "浦和市"): "さいたま市",
+    ("埼玉県", "大宮市"): "さいたま市",
+    ("埼玉県", "与野市"): "さいたま市",
+    ("埼玉県", "岩槻市"): "さいたま市",
+    ("静岡県", "清水市"): "静岡市",
+    ("静岡県", "浜北市"): "浜松市",
+    ("静岡県", "天竜市"): "浜松市",
+    ("新潟県", "新津市"): "新潟市",
+    ("新潟県", "白根市"): "新潟市",
+    ("新潟県", "豊栄市"): "新潟市",
+    ("大阪府", "美原町"): "堺市",
+    ("神奈川県", "津久井町"): "相模原市",
+    ("神奈川県", "相模湖町"): "相模原市",
+    ("神奈川県", "城山町"): "相模原市",
+    ("神奈川県", "藤野町"): "相模原市",
+}
+
+KEY_WHITESPACE_PATTERN = re.compile(r"\s+")
+KATAKANA_PATTERN = re.compile("[\u30a1-\u30f6]")
+DISTRICT_PREFIX_PATTERN = re.compile(r"^.+?郡(?=.+[町村]$)")
+
+
+def add_generated_at(payload: dict) -> dict:
+    """Return a copy of payload with a deterministic generated_at value."""
+    payload = dict(payload)
+    payload["generated_at"] = FIXED_GENERATED_AT
+    return payload
+
+
+def add_years_safe(value: date, years: int) -> date:
+    try:
+        return value.replace(year=value.year + years)
+    except ValueError:
+        # Handle February 29 on non-leap year
+        return value.replace(month=2, day=28, year=value.year + years)
+
+
+def normalise_prefecture_name(prefecture: str) -> str:
+    text = unicodedata.normalize("NFKC", "" if prefecture is None else str(prefecture))
+    return KEY_WHITESPACE_PATTERN.sub("", text)
+
+
+def normalise_municipality_name(prefecture: str, municipality: str) -> str:
+    """Return a join key that tolerates spelling variants of a municipality.
+
+    Folds full/half width forms, ヶ/ケ spellings and old kanji forms, and drops a
+    leading prefecture or 郡 (district) prefix such as 北海道 or 余市郡.
+    """
+    text = unicodedata.normalize("NFKC", "" if municipality is None else str(municipality))
+    text = KEY_WHITESPACE_PATTERN.sub("", text)
+    text = text.translate(KANA_VARIANTS).translate(OLD_KANJI_VARIANTS)
+    prefecture_key = normalise_prefecture_name(prefecture)
+    if prefecture_key and text.startswith(prefecture_key) and len(text) > len(prefecture_key):
+        text = text[len(prefecture_key) :]
+    return DISTRICT_PREFIX_PATTERN.sub("", text)
+
+
+def source_prefecture(source_key: str) -> str:
+    """Return the prefecture a scraped ``source_key`` belongs to, or ``""``."""
+    key = "" if source_key is None else str(source_key).strip()
+    return next((prefecture for prefecture in PREFECTURES if key.startswith(prefecture)), "")
+
+
+def normalise_search_text(value: str) -> str:
+    """Fold a search term: NFKC, lower case, no whitespace, katakana as hiragana.
+
+    Mirrors ``normaliseSearchText`` in ``assets/js/search/search-index.js``.
+    """
+    text = unicodedata.normalize("NFKC", "" if value is None else str(value)).lower()
+    text = KEY_WHITESPACE_PATTERN.sub("", text)
+    return KATAKANA_PATTERN.sub(lambda match: chr(ord(match.group(0)) - 0x60), text)
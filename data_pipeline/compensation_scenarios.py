@@ -0,0 +1,252 @@
+"""Batch what-if scenarios for the council compensation estimate.
+
+``build_party_compensation`` walks every month of every seat term with the
+2020 monthly amounts and March/June/December bonus rates. Here that walk is
+replaced by a seat-term *exposure* table, built once with array arithmetic
+and cached under ``data/.cache``. It has one row per term and calendar year,
+holding the first calendar month covered, the months covered and how many
+months into the term that year starts. A scenario is then a handful of
+vectorised multiplies over that table, so hundreds of them can be swept
+without touching the candidate data again.
+
+A scenario is a dict; every key is optional:
+
+``name``
+    label used in the output.
+``monthly_multiplier``
+    factor on every monthly amount, e.g. ``1.05`` for a 5% raise.
+``class_multipliers``
+    factor per municipality class (種別 in SeatsAndCompensation.csv:
+    政令指定都市, 中核市, 一般市, 特別区, 町村), applied on top of
+    ``monthly_multiplier``.
+``bonus_rates``
+    ``{month: percent}`` replacing every municipality's own bonus schedule,
+    e.g. ``{"6": 170, "12": 180}``.
+``term_years``
+    caps each term at this many years. Terms can only be shortened, because
+    the exposure ends where the recorded term ends.
+``inflation_rate`` / ``base_year``
+    indexes amounts by ``(1 + inflation_rate) ** (year - base_year)``;
+    ``base_year`` defaults to the 2020 survey year.
+
+The default scenario ``{}`` reproduces ``build_party_compensation``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from common import MUNICIPALITY_KEY_VERSION  # type: ignore
+    from generate_compensation_data import (  # type: ignore
+        BONUS_COLUMN_INDICES,
+        CACHE_DIR,
+        COMPENSATION_PATH,
+        DATA_DIR,
+        join_compensation_reference,
+        load_compensation_index,
+        load_seat_terms,
+        month_index,
+    )
+    from seat_terms import seat_terms_cache_key  # type: ignore
+else:
+    from .common import MUNICIPALITY_KEY_VERSION
+    from .generate_compensation_data import (
+        BONUS_COLUMN_INDICES,
+        CACHE_DIR,
+        COMPENSATION_PATH,
+        DATA_DIR,
+        join_compensation_reference,
+        load_compensation_index,
+        load_seat_terms,
+        month_index,
+    )
+    from .seat_terms import seat_terms_cache_key
+
+EXPOSURE_VERSION = 2
+EXPOSURE_CACHE_PATH = CACHE_DIR / "compensation_exposure.pkl"
+SCENARIO_OUTPUT_CSV = DATA_DIR / "compensation_scenarios.csv"
+SOURCE_COMPENSATION_YEAR = 2020
+CALENDAR_MONTHS = np.arange(12)
+
+_exposure_cache: Dict[str, pd.DataFrame] = {}
+
+
+def build_exposure(matched: pd.DataFrame) -> pd.DataFrame:
+    """Split joined seat terms into one row per term and calendar year.
+
+    Covers the same months as ``iterate_months(election_date, term_end)``:
+    from the election month up to, but not including, the month the term ends.
+    """
+    is_date = matched["election_date"].map(lambda value: isinstance(value, date)) & matched["term_end"].map(
+        lambda value: isinstance(value, date)
+    )
+    matched = matched[is_date].reset_index(drop=True)
+    if matched.empty:
+        return pd.DataFrame()
+    start = month_index(matched["election_date"]).to_numpy()
+    end = month_index(matched["term_end"]).to_numpy()
+    first_year = start // 12
+    year_count = np.where(end > start, (end - 1) // 12 - first_year + 1, 0)
+
+    term = np.repeat(np.arange(len(matched)), year_count)
+    year = first_year[term] + (np.arange(len(term)) - np.repeat(np.cumsum(year_count) - year_count, year_count))
+    first = np.maximum(start[term], year * 12)
+    last = np.minimum(end[term], year * 12 + 12)
+
+    terms = matched.iloc[term].reset_index(drop=True)
+    exposure = pd.DataFrame(
+        {
+            "term": term,
+            "party": terms["party"],
+            "prefecture": terms["prefecture"],
+            "municipality": terms["municipality"],
+            "municipality_class": terms["municipality_class"],
+            "year": year,
+            "seat_count": terms["seat_count"].to_numpy(dtype="int64"),
+            "monthly": terms["monthly"].to_numpy(dtype=float),
+            "first_month": first - year * 12,
+            "months": last - first,
+            "term_offset": first - start[term],
+        }
+    )
+    for month in BONUS_COLUMN_INDICES:
+        exposure[f"bonus_rate_{month}"] = terms[f"bonus_rate_{month}"].to_numpy(dtype=float)
+    return exposure
+
+
+def exposure_cache_key() -> str:
+    digest = hashlib.sha256(COMPENSATION_PATH.read_bytes())
+    return f"{seat_terms_cache_key()}:{digest.hexdigest()}:{MUNICIPALITY_KEY_VERSION}:{EXPOSURE_VERSION}"
+
+
+def load_exposure() -> pd.DataFrame:
+    """Return the exposure table, from memory or ``data/.cache`` when the inputs are unchanged."""
+    cache_key = exposure_cache_key()
+    if cache_key in _exposure_cache:
+        return _exposure_cache[cache_key]
+    exposure = None
+    if EXPOSURE_CACHE_PATH.exists():
+        try:
+            cached = pd.read_pickle(EXPOSURE_CACHE_PATH)
+        except Exception:
+            cached = None
+        if isinstance(cached, dict) and cached.get("cache_key") == cache_key:
+            exposure = cached["exposure"]
+    if exposure is None:
+        matched, _ = join_compensation_reference(load_seat_terms(), load_compensation_index())
+        exposure = build_exposure(matched)
+        EXPOSURE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temporary = EXPOSURE_CACHE_PATH.with_name(f"{EXPOSURE_CACHE_PATH.name}.{os.getpid()}.tmp")
+        pd.to_pickle({"cache_key": cache_key, "exposure": exposure}, temporary)
+        os.replace(temporary, EXPOSURE_CACHE_PATH)
+    _exposure_cache.clear()
+    _exposure_cache[cache_key] = exposure
+    return exposure
+
+
+def scenario_compensation(exposure: pd.DataFrame, scenario: Dict[str, Any]) -> np.ndarray:
+    """Total compensation of every exposure row under ``scenario``."""
+    months = exposure["months"].to_numpy()
+    term_years = scenario.get("term_years")
+    if term_years is not None:
+        months = np.clip(round(float(term_years) * 12) - exposure["term_offset"].to_numpy(), 0, months)
+
+    first_month = exposure["first_month"].to_numpy()[:, None]
+    covered = (CALENDAR_MONTHS >= first_month) & (CALENDAR_MONTHS < first_month + months[:, None])
+    bonus_rates = scenario.get("bonus_rates")
+    if bonus_rates is None:
+        bonus_months = np.array([month - 1 for month in BONUS_COLUMN_INDICES])
+        rates = exposure[[f"bonus_rate_{month}" for month in BONUS_COLUMN_INDICES]].to_numpy()
+    else:
+        bonus_months = np.array([int(month) - 1 for month in bonus_rates], dtype="int64")
+        rates = np.array([float(rate) for rate in bonus_rates.values()])
+    bonus_multiplier = (covered[:, bonus_months] * rates).sum(axis=1) / 100.0
+
+    factor = float(scenario.get("monthly_multiplier", 1.0))
+    class_multipliers = scenario.get("class_multipliers") or {}
+    if class_multipliers:
+        factor = factor * exposure["municipality_class"].map(class_multipliers).fillna(1.0).to_numpy(dtype=float)
+    inflation_rate = scenario.get("inflation_rate")
+    if inflation_rate:
+        base_year = int(scenario.get("base_year", SOURCE_COMPENSATION_YEAR))
+        factor = factor * (1.0 + float(inflation_rate)) ** (exposure["year"].to_numpy() - base_year)
+
+    monthly = exposure["monthly"].to_numpy() * factor
+    return monthly * (months + bonus_multiplier) * exposure["seat_count"].to_numpy()
+
+
+def run_scenarios(
+    scenarios: Iterable[Dict[str, Any]],
+    exposure: Optional[pd.DataFrame] = None,
+    by: Iterable[str] = ("party", "year"),
+) -> pd.DataFrame:
+    """Evaluate ``scenarios`` and return their totals grouped by ``by``, one row per scenario and group."""
+    exposure = load_exposure() if exposure is None else exposure
+    by = list(by)
+    columns = ["scenario", *by, "total_compensation"]
+    if exposure.empty:
+        return pd.DataFrame(columns=columns)
+    if by:
+        codes, groups = pd.MultiIndex.from_frame(exposure[by]).factorize(sort=True)
+        keys = pd.DataFrame(list(groups), columns=by)
+    else:
+        codes, keys = np.zeros(len(exposure), dtype="int64"), pd.DataFrame(index=[0])
+    frames = []
+    for position, scenario in enumerate(scenarios):
+        frame = keys.copy()
+        frame.insert(0, "scenario", scenario.get("name") or f"scenario_{position + 1}")
+        frame["total_compensation"] = np.bincount(
+            codes, weights=scenario_compensation(exposure, scenario), minlength=len(keys)
+        )
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_scenarios(path: Path) -> List[Dict[str, Any]]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    scenarios = data.get("scenarios", []) if isinstance(data, dict) else data
+    if not isinstance(scenarios, list) or not all(isinstance(item, dict) for item in scenarios):
+        raise SystemExit(f"{path}: expected a list of scenario objects")
+    return scenarios
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Evaluate compensation scenarios against the cached seat-term exposure.")
+    parser.add_argument("scenarios", type=Path, help="JSON file with a list of scenarios (or {\"scenarios\": [...]})")
+    parser.add_argument(
+        "--by",
+        default="party,year",
+        help="comma separated grouping columns: party, year, prefecture, municipality, municipality_class "
+        "(default: party,year; empty for one total per scenario)",
+    )
+    parser.add_argument("--output", type=Path, default=SCENARIO_OUTPUT_CSV, help="CSV to write")
+    args = parser.parse_args(argv)
+
+    scenarios = [{"name": "baseline"}, *load_scenarios(args.scenarios)]
+    by = [name.strip() for name in args.by.split(",") if name.strip()]
+    result = run_scenarios(scenarios, by=by)
+    result["total_compensation"] = result["total_compensation"].round().astype("Int64")
+    result.to_csv(args.output, index=False, encoding="utf-8")
+    totals = result.groupby("scenario", sort=False)["total_compensation"].sum()
+    print(f"Evaluated {len(scenarios)} scenarios into {args.output.name}:")
+    for name, total in totals.items():
+        print(f"  {name}: {int(total):,} JPY")
+
+
+if __name__ == "__main__":
+    main()
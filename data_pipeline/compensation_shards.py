@@ -0,0 +1,90 @@
+"""Per-prefecture shards of the compensation municipality breakdown.
+
+``compensation.json.gz`` only carries the national, party and prefecture
+rollups that the compensation dashboard paints first. The party × year ×
+municipality rows behind them are written once per prefecture under a
+content-hashed name in ``data/compensation``, and ``compensation_index.json.gz``
+lists each shard with its row count, year range and totals. A client
+drilling into a prefecture then fetches only that prefecture's rows.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from build_dashboard_data import build_payload  # type: ignore
+    from common import PREFECTURES, add_generated_at  # type: ignore
+    from output_writer import DATA_DIR, HASH_LENGTH, content_digest, encode_json, write_encoded  # type: ignore
+else:
+    from .build_dashboard_data import build_payload
+    from .common import PREFECTURES, add_generated_at
+    from .output_writer import DATA_DIR, HASH_LENGTH, content_digest, encode_json, write_encoded
+
+COMPENSATION_SHARD_DIR = DATA_DIR / "compensation"
+COMPENSATION_SHARD_INDEX_PATH = DATA_DIR / "compensation_index.json.gz"
+UNKNOWN_PREFECTURE_CODE = "00"
+
+
+def prefecture_code(prefecture: str) -> str:
+    """Return the two digit JIS code used in shard file names."""
+    if prefecture in PREFECTURES:
+        return f"{PREFECTURES.index(prefecture) + 1:02d}"
+    return UNKNOWN_PREFECTURE_CODE
+
+
+def partition_municipality_rows(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group rows by prefecture code, sorted by municipality, party and year inside each shard."""
+    shards: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        shards.setdefault(prefecture_code(row.get("prefecture") or ""), []).append(row)
+    for records in shards.values():
+        records.sort(key=lambda row: (row["municipality"], row["party"], row["year"], row.get("term_start") or ""))
+    return dict(sorted(shards.items()))
+
+
+def shard_path(key: str, digest: str) -> Path:
+    return COMPENSATION_SHARD_DIR / f"{key}.{digest[:HASH_LENGTH]}.json.gz"
+
+
+def write_compensation_shards(rows: List[Dict[str, Any]], schema_version: int = 1) -> Dict[str, Any]:
+    """Write any new shard files, remove superseded ones and return the index payload."""
+    COMPENSATION_SHARD_DIR.mkdir(parents=True, exist_ok=True)
+    entries = []
+    for key, records in partition_municipality_rows(rows).items():
+        data = encode_json(build_payload(records, schema_version))
+        digest = content_digest(data)
+        path = shard_path(key, digest)
+        if not path.exists():
+            write_encoded(path, data)
+        years = [record["year"] for record in records]
+        entries.append(
+            {
+                "key": key,
+                "prefecture": records[0]["prefecture"],
+                "file": path.relative_to(DATA_DIR).as_posix(),
+                "records": len(records),
+                "municipalities": len({record["municipality"] for record in records}),
+                "year_from": min(years),
+                "year_to": max(years),
+                "total_compensation": float(sum(record["total_compensation"] for record in records)),
+                "bytes": path.stat().st_size,
+                "sha256": digest,
+            }
+        )
+    keep = {Path(entry["file"]).name for entry in entries}
+    for path in COMPENSATION_SHARD_DIR.glob("*.json.gz"):
+        if path.name not in keep:
+            path.unlink()
+    return add_generated_at(
+        {
+            "schema_version": 1,
+            "partition": "prefecture",
+            "records": sum(entry["records"] for entry in entries),
+            "shards": entries,
+        }
+    )
@@ -0,0 +1,257 @@
+"""Record-level delta patches between consecutive dataset releases.
+
+When a patchable dataset changes, the previous release (the fixed-name file
+about to be overwritten) is diffed against the new payload. Record lists are
+compared by key and the remaining fields are compared by value, giving a
+patch with ``remove``/``upsert`` operations per collection and ``set`` /
+``unset`` operations for everything else. Columnar record tables
+(``--schema-version 2``) are diffed row by row as well. Their collection
+diff is marked ``columnar``, and applying it re-encodes the rows. Each patch
+is verified by applying it before it is published, and the manifest keeps
+the chain of patches so a client holding release N can reach the current
+release without refetching the full file.
+
+Patchable datasets always carry a ``patches`` list in the manifest, empty
+until the first patch, so ``fetchDatasetJson`` in ``assets/js/utils.js``
+knows to keep their releases. It applies the chain from the release it holds
+when the patches are smaller than the full file.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from output_writer import (  # type: ignore
+        DATA_DIR,
+        content_digest,
+        decode_columnar_table,
+        encode_columnar_table,
+        encode_json,
+        write_encoded,
+    )
+else:
+    from .output_writer import (
+        DATA_DIR,
+        content_digest,
+        decode_columnar_table,
+        encode_columnar_table,
+        encode_json,
+        write_encoded,
+    )
+
+PATCHES_DIR = DATA_DIR / "patches"
+PATCH_FORMAT_VERSION = 1
+MAX_PATCH_CHAIN = 30
+KEY_SEPARATOR = "\u001f"
+
+# Record collections diffed per dataset: dotted path to the list -> key fields.
+# win_rate is not patched: the browser reads win_rate_series.bin.gz, not the JSON.
+PATCH_SPECS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "election_summary": {
+        "records": ("election_name", "election_day", "notice_date"),
+    },
+    "election_facts": {
+        "records": ("election_key", "election_date"),
+    },
+    "vote_optimization": {
+        "elections": ("election_key", "election_date"),
+        "parties": ("party",),
+    },
+}
+
+
+def record_keys(records: List[Dict[str, Any]], fields: Iterable[str]) -> List[str]:
+    fields = tuple(fields)
+    seen: Dict[str, int] = {}
+    keys = []
+    for record in records:
+        key = KEY_SEPARATOR.join("" if record.get(field) is None else str(record.get(field)) for field in fields)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        keys.append(f"{key}{KEY_SEPARATOR}{occurrence}" if occurrence else key)
+    return keys
+
+
+def apply_collection_diff(records: List[Dict[str, Any]], diff: Dict[str, Any]) -> List[Dict[str, Any]]:
+    keys = record_keys(records, diff["key"])
+    removed = set(diff.get("remove", []))
+    upserts = {key: (index, record) for index, key, record in diff.get("upsert", [])}
+
+    result: List[Tuple[str, Dict[str, Any]]] = []
+    for key, record in zip(keys, records):
+        if key in removed:
+            continue
+        if key in upserts:
+            record = upserts.pop(key)[1]
+        result.append((key, record))
+    for key, (index, record) in sorted(upserts.items(), key=lambda item: item[1][0]):
+        result.insert(index, (key, record))
+
+    order = diff.get("order")
+    if order is not None:
+        by_key = dict(result)
+        return [by_key[key] for key in order]
+    return [record for _, record in result]
+
+
+def diff_collection(old: List[Dict[str, Any]], new: List[Dict[str, Any]], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    old_keys = record_keys(old, fields)
+    new_keys = record_keys(new, fields)
+    old_map = dict(zip(old_keys, old))
+    new_key_set = set(new_keys)
+
+    diff: Dict[str, Any] = {
+        "key": list(fields),
+        "remove": [key for key in old_keys if key not in new_key_set],
+        "upsert": [
+            [index, key, record]
+            for index, (key, record) in enumerate(zip(new_keys, new))
+            if old_map.get(key) != record
+        ],
+    }
+    if apply_collection_diff(old, diff) != new:
+        diff["order"] = new_keys
+    return diff
+
+
+def is_columnar(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("encoding") == "columnar"
+
+
+def table_rows(value: Any) -> Optional[List[Dict[str, Any]]]:
+    """The records of a record list or a columnar table, else ``None``."""
+    if isinstance(value, list):
+        return value
+    if is_columnar(value):
+        return decode_columnar_table(value)
+    return None
+
+
+def diff_payload(
+    old: Dict[str, Any], new: Dict[str, Any], collections: Dict[str, Tuple[str, ...]], prefix: str = ""
+) -> Dict[str, Any]:
+    patch: Dict[str, Any] = {"set": {}, "unset": [], "collections": {}}
+    for key in old:
+        if key not in new:
+            patch["unset"].append(prefix + key)
+    for key, value in new.items():
+        path = prefix + key
+        previous = old.get(key)
+        old_rows, new_rows = (table_rows(previous), table_rows(value)) if path in collections else (None, None)
+        if old_rows is not None and new_rows is not None and is_columnar(previous) == is_columnar(value):
+            collection_diff = diff_collection(old_rows, new_rows, collections[path])
+            if is_columnar(value):
+                collection_diff["columnar"] = True
+            if collection_diff["remove"] or collection_diff["upsert"] or "order" in collection_diff:
+                patch["collections"][path] = collection_diff
+            elif previous != value:
+                patch["set"][path] = value
+        elif (
+            isinstance(value, dict)
+            and isinstance(previous, dict)
+            and any(name.startswith(path + ".") for name in collections)
+        ):
+            nested = diff_payload(previous, value, collections, path + ".")
+            patch["set"].update(nested["set"])
+            patch["unset"].extend(nested["unset"])
+            patch["collections"].update(nested["collections"])
+        elif key not in old or previous != value:
+            patch["set"][path] = value
+    return patch
+
+
+def _resolve_parent(payload: Dict[str, Any], path: str) -> Tuple[Dict[str, Any], str]:
+    *parents, leaf = path.split(".")
+    target = payload
+    for name in parents:
+        target = target[name]
+    return target, leaf
+
+
+def apply_patch(payload: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``payload`` upgraded by ``patch``; ``payload`` is not modified."""
+    result = json.loads(encode_json(payload))
+    for path in patch.get("unset", []):
+        parent, leaf = _resolve_parent(result, path)
+        parent.pop(leaf, None)
+    for path, value in patch.get("set", {}).items():
+        parent, leaf = _resolve_parent(result, path)
+        parent[leaf] = value
+    for path, diff in patch.get("collections", {}).items():
+        parent, leaf = _resolve_parent(result, path)
+        records = apply_collection_diff(table_rows(parent[leaf]) or [], diff)
+        parent[leaf] = encode_columnar_table(records) if diff.get("columnar") else records
+    return result
+
+
+def patch_path(name: str, from_version: int, to_version: int) -> Path:
+    return PATCHES_DIR / f"{name}.{from_version}-{to_version}.json.gz"
+
+
+def build_patch(name: str, previous_data: bytes, data: bytes) -> Optional[Dict[str, Any]]:
+    collections = PATCH_SPECS[name]
+    old = json.loads(previous_data)
+    new = json.loads(data)
+    patch = diff_payload(old, new, collections)
+    if encode_json(apply_patch(old, patch)) != data:
+        return None
+    patch.update(
+        {
+            "format": PATCH_FORMAT_VERSION,
+            "dataset": name,
+            "from_sha256": content_digest(previous_data),
+            "to_sha256": content_digest(data),
+        }
+    )
+    return patch
+
+
+def record_release(
+    name: str,
+    previous_data: Optional[bytes],
+    data: bytes,
+    previous_entry: Dict[str, Any],
+    version: int,
+) -> Optional[List[Dict[str, Any]]]:
+    """Write the patch for a new release and return the manifest patch chain (``None`` if not patchable)."""
+    if name not in PATCH_SPECS:
+        prune_patches(name, [])
+        return None
+    chain = [dict(item) for item in previous_entry.get("patches", [])]
+    patch = None
+    from_version = previous_entry.get("version")
+    if previous_data is not None and from_version == version - 1:
+        patch = build_patch(name, previous_data, data)
+    if patch is None:
+        chain = []
+    else:
+        patch.update({"from": from_version, "to": version})
+        path = patch_path(name, from_version, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_encoded(path, encode_json(patch))
+        chain.append(
+            {
+                "from": from_version,
+                "to": version,
+                "file": path.relative_to(DATA_DIR).as_posix(),
+                "bytes": path.stat().st_size,
+            }
+        )
+    chain = chain[-MAX_PATCH_CHAIN:]
+    prune_patches(name, chain)
+    return chain
+
+
+def prune_patches(name: str, chain: List[Dict[str, Any]]) -> None:
+    if not PATCHES_DIR.exists():
+        return
+    keep = {Path(item["file"]).name for item in chain}
+    for path in PATCHES_DIR.glob(f"{name}.*-*.json.gz"):
+        if path.name not in keep:
+            path.unlink()
@@ -0,0 +1,118 @@
+"""One row per election, joining ``election_summary`` to the candidate results.
+
+``election_summary`` knows each election's seats, candidate count and
+registered voters; the candidate data knows the votes and who won. The two
+used to be matched separately by each consumer: ``map_results`` joined them by
+(name, day) for the map, and the search page joined candidates to summary rows
+by file name in the browser. Here they are joined once. The summary records
+become a hash table keyed by (election name, election day), and the
+per-election candidate groups are looked up in it by (``election_key``,
+``election_date``), the same key the groups are built on.
+
+Each fact row carries the summary figures (falling back to the candidate
+counts where the summary has none), total votes, turnout, the competition
+ratio and the winner thresholds: the lowest winning vote, the highest losing
+vote and the statutory minimum (法定得票数, a quarter of the valid votes per
+seat for councils and of all valid votes for executive elections). Elections
+that appear only in the summary keep a row with the candidate figures empty.
+
+The product is a dict keyed by ``(election_key, election_date)``, in
+candidate order followed by summary order. Rows also keep the per-party
+totals and the first candidate position for ``vote_optimization``; the
+published ``election_facts.json.gz`` leaves those out and is sorted by date.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from build_dashboard_data import EXECUTIVE_KEYWORDS, normalise_string  # type: ignore
+    from common import add_generated_at  # type: ignore
+else:
+    from .build_dashboard_data import EXECUTIVE_KEYWORDS, normalise_string
+    from .common import add_generated_at
+
+ELECTION_FACTS_VERSION = 1
+# Fields used while building other products, not published.
+INTERNAL_FIELDS = ("parties", "first_seen")
+
+FactKey = Tuple[str, str]
+
+
+def ratio(numerator: Optional[float], denominator: Optional[float], digits: int = 4) -> Optional[float]:
+    return round(numerator / denominator, digits) if numerator and denominator else None
+
+
+def legal_threshold(election_key: str, total_votes: Optional[int], seats: Optional[int]) -> Optional[float]:
+    if any(keyword in election_key for keyword in EXECUTIVE_KEYWORDS):
+        return ratio(total_votes, 4, 3)
+    return ratio(total_votes, seats * 4 if seats else None, 3)
+
+
+def fact_row(election_key: str, election_date: str, summary: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+    winner_count = results.get("winner_count", 0)
+    candidates_listed = results.get("total_candidates", 0)
+    total_votes = results["total_votes"] if results.get("voted_candidates") else None
+    seats = summary.get("seats") or winner_count or None
+    candidate_count = summary.get("candidate_count") or candidates_listed or None
+    registered_voters = summary.get("registered_voters")
+    return {
+        "election_key": election_key,
+        "election_date": election_date,
+        "notice_date": summary.get("notice_date"),
+        "in_summary": bool(summary),
+        "seats": seats,
+        "candidate_count": candidate_count,
+        "registered_voters": registered_voters,
+        "candidates_listed": candidates_listed,
+        "winner_count": winner_count,
+        "total_votes": total_votes,
+        "turnout": ratio(total_votes, registered_voters),
+        "competition_ratio": ratio(candidate_count, seats),
+        "min_winning_vote": results.get("min_win_vote"),
+        "max_losing_vote": results.get("max_lose_vote"),
+        "legal_threshold": legal_threshold(election_key, total_votes, seats),
+        "missing_winner_votes": results.get("missing_winner_votes", False),
+        "parties": results.get("parties", {}),
+        "first_seen": results.get("first_seen"),
+    }
+
+
+def build_election_facts(
+    elections: Iterable[Dict[str, Any]],
+    election_results: Dict[str, Dict[str, Any]],
+) -> Dict[FactKey, Dict[str, Any]]:
+    """Join summary records to ``collect_election_results_state`` groups on (election key, date)."""
+    summaries: Dict[FactKey, Dict[str, Any]] = {}
+    for record in elections:
+        name = normalise_string(record.get("election_name"))
+        day = record.get("election_day")
+        if name and day:
+            summaries[(name, day)] = record
+
+    facts: Dict[FactKey, Dict[str, Any]] = {}
+    for results in election_results.values():
+        key = (results["election_key"], results["election_date"].date().isoformat())
+        facts[key] = fact_row(*key, summaries.get(key, {}), results)
+    for key, summary in summaries.items():
+        if key not in facts:
+            facts[key] = fact_row(*key, summary, {})
+    return facts
+
+
+def build_election_facts_payload(facts: Dict[FactKey, Dict[str, Any]]) -> Dict[str, Any]:
+    records: List[Dict[str, Any]] = [
+        {field: value for field, value in fact.items() if field not in INTERNAL_FIELDS}
+        for _, fact in sorted(facts.items(), key=lambda item: (item[0][1], item[0][0]))
+    ]
+    return add_generated_at(
+        {
+            "schema_version": ELECTION_FACTS_VERSION,
+            "records": records,
+        }
+    )
@@ -1,80 +1,45 @@
 import calendar
-import math
+import hashlib
+import json
+import os
 import re
 from collections import defaultdict
-from datetime import date, datetime
+from datetime import date
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from common import (  # type: ignore
+        MERGED_MUNICIPALITIES,
+        MUNICIPALITY_KEY_VERSION,
+        PREFECTURES,
+        add_generated_at,
+        normalise_municipality_name,
+        normalise_prefecture_name,
+    )
+else:
+    from .common import (
+        MERGED_MUNICIPALITIES,
+        MUNICIPALITY_KEY_VERSION,
+        PREFECTURES,
+        add_generated_at,
+        normalise_municipality_name,
+        normalise_prefecture_name,
+    )
+
 ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = ROOT / "data"
-DETAILS_PATH = DATA_DIR / "candidate_details.csv.gz"
 COMPENSATION_PATH = DATA_DIR / "SeatsAndCompensation.csv"
 OUTPUT_SUMMARY_CSV = DATA_DIR / "party_compensation_summary_2020.csv"
 OUTPUT_YEARLY_CSV = DATA_DIR / "party_compensation_yearly_2020.csv"
 OUTPUT_MUNICIPAL_CSV = DATA_DIR / "party_compensation_municipal_2020.csv"
-FIXED_GENERATED_AT = "1970-01-01T00:00:00+00:00"
-
-WINNING_KEYWORDS = [
-    "当選",
-    "補欠当選",
-    "繰上当選",
-    "繰り上げ当選",
-    "当せん",
-    "再選",
-]
-
-PREFECTURES = [
-    "北海道",
-    "青森県",
-    "岩手県",
-    "宮城県",
-    "秋田県",
-    "山形県",
-    "福島県",
-    "茨城県",
-    "栃木県",
-    "群馬県",
-    "埼玉県",
-    "千葉県",
-    "東京都",
-    "神奈川県",
-    "新潟県",
-    "富山県",
-    "石川県",
-    "福井県",
-    "山梨県",
-    "長野県",
-    "岐阜県",
-    "静岡県",
-    "愛知県",
-    "三重県",
-    "滋賀県",
-    "京都府",
-    "大阪府",
-    "兵庫県",
-    "奈良県",
-    "和歌山県",
-    "鳥取県",
-    "島根県",
-    "岡山県",
-    "広島県",
-    "山口県",
-    "徳島県",
-    "香川県",
-    "愛媛県",
-    "高知県",
-    "福岡県",
-    "佐賀県",
-    "長崎県",
-    "熊本県",
-    "大分県",
-    "宮崎県",
-    "鹿児島県",
-    "沖縄県",
-]
+CACHE_DIR = DATA_DIR / ".cache"
+COMPENSATION_INDEX_CACHE_PATH = CACHE_DIR / "compensation_index.json"
 
 TRAILING_PATTERNS = [
     "補欠",
@@ -92,58 +57,30 @@ TRAILING_PATTERNS = [
 
 SELECTION_PATTERN = re.compile(r"選挙.*$")
 WHITESPACE_PATTERN = re.compile(r"[\s\u3000]+")
-DATE_PATTERN = re.compile(r"(\d{4})(\d{2})(\d{2})")
-
-TERM_YEARS = 4
 
 # CSV column indices (0-based) for compensation data
+PREFECTURE_COL_INDEX = 1
+MUNICIPALITY_COL_INDEX = 2
+# 政令指定都市, 中核市, 一般市, 特別区 or 町村
+CLASS_COL_INDEX = 4
+# surveyed name, display name (may carry a prefecture prefix), 2016 survey name
+MUNICIPALITY_ALIAS_COL_INDICES = (2, 3, 24)
 MONTHLY_COL_INDEX = 11
 BONUS_COLUMN_INDICES: Dict[int, int] = {
     3: 12,
     6: 13,
     12: 14,
 }
+COMPENSATION_INDEX_VALUE_COLUMNS = [
+    "municipality_class",
+    "monthly",
+    *(f"bonus_rate_{month}" for month in BONUS_COLUMN_INDICES),
+]
 
 
-def add_generated_at(payload: dict) -> dict:
-    """Return a copy of payload with a deterministic generated_at value."""
-    payload = dict(payload)
-    payload["generated_at"] = FIXED_GENERATED_AT
-    return payload
-
-
-def to_iso_date(value) -> str:
-    if isinstance(value, datetime):
-        return value.date().isoformat()
-    if isinstance(value, date):
-        return value.isoformat()
-    if pd.isna(value) or value is None:
-        return ""
-    # pandas may store dates as Timestamp
-    try:
-        return pd.to_datetime(value).date().isoformat()
-    except Exception:
-        return str(value)
-
-
-def parse_source(source: str) -> Optional[Tuple[str, str, date]]:
-    if not isinstance(source, str) or not source:
-        return None
-    parts = source.split("_", 1)
-    if len(parts) != 2:
-        return None
-    name_part, date_part = parts
-
-    match = DATE_PATTERN.match(date_part)
-    if not match:
-        return None
-    year, month, day = map(int, match.groups())
-    try:
-        election_date = date(year, month, day)
-    except ValueError:
-        return None
-
-    name_part = WHITESPACE_PATTERN.sub("", name_part)
+def parse_municipality(election_name: str) -> Optional[Tuple[str, str]]:
+    """Return (prefecture, municipality) named by an election such as 北海道北見市議会議員選挙."""
+    name_part = WHITESPACE_PATTERN.sub("", election_name)
     name_part = SELECTION_PATTERN.sub("", name_part)
     for suffix in TRAILING_PATTERNS:
         if name_part.endswith(suffix):
@@ -154,7 +91,7 @@ def parse_source(source: str) -> Optional[Tuple[str, str, date]]:
     municipality = name_part[len(prefecture) :].strip()
     if not municipality:
         return None
-    return prefecture, municipality, election_date
+    return prefecture, municipality
 
 
 def clean_number(value) -> Optional[float]:
@@ -172,14 +109,6 @@ def clean_number(value) -> Optional[float]:
         return None
 
 
-def add_years_safe(value: date, years: int) -> date:
-    try:
-        return value.replace(year=value.year + years)
-    except ValueError:
-        # Handle February 29 on non-leap year
-        return value.replace(month=2, day=28, year=value.year + years)
-
-
 def add_months(value: date, months: int) -> date:
     total_months = value.year * 12 + (value.month - 1) + months
     year = total_months // 12
@@ -204,138 +133,336 @@ def count_bonus_occurrences(start: date, end: date, target_month: int) -> int:
     return sum(1 for current in iterate_months(start, end) if current.month == target_month)
 
 
+def seat_terms_frame(rows: List[dict]) -> pd.DataFrame:
+    """``seat_terms`` rows as one frame row per term, with dates as ``date`` objects."""
+    columns = ["prefecture", "municipality", "election_date", "party", "seat_count", "term_end"]
+    terms = pd.DataFrame(rows)
+    if terms.empty:
+        return pd.DataFrame(columns=columns)
+    terms = terms.dropna(subset=["prefecture"]).rename(columns={"term_start": "election_date", "seats": "seat_count"})
+    for column in ("election_date", "term_end"):
+        terms[column] = pd.to_datetime(terms[column]).dt.date
+    return (
+        terms[columns]
+        .sort_values(["prefecture", "municipality", "election_date", "party"], kind="stable")
+        .reset_index(drop=True)
+    )
+
+
 def load_seat_terms() -> pd.DataFrame:
-    df = pd.read_csv(DETAILS_PATH, encoding="utf-8")
-    mask = df["outcome"].fillna("").astype(str).apply(
-        lambda value: any(keyword in value for keyword in WINNING_KEYWORDS)
+    """The shared ``seat_terms`` table, read from its cache (rebuilt from the CSVs when stale)."""
+    if __package__ in {None, ""}:
+        from seat_terms import load_seat_terms as load_seat_term_rows  # type: ignore
+    else:
+        from .seat_terms import load_seat_terms as load_seat_term_rows
+
+    return seat_terms_frame(load_seat_term_rows())
+
+
+def clean_number_series(series: pd.Series) -> pd.Series:
+    text = series.astype("string").str.strip().str.replace(",", "", regex=False)
+    return pd.to_numeric(text.mask(text == ""), errors="coerce").astype(float)
+
+
+def build_compensation_index() -> pd.DataFrame:
+    """Return one compensation row per normalised (prefecture, municipality) key.
+
+    Besides the surveyed name, each row is reachable through its display name,
+    its 2016 survey name and known pre-merger names; direct names win over
+    aliases and earlier CSV rows win over later ones.
+    """
+    df = pd.read_csv(COMPENSATION_PATH, encoding="utf-8")
+    columns = df.columns
+    values = pd.DataFrame(
+        {
+            "prefecture": df[columns[PREFECTURE_COL_INDEX]].astype(str),
+            "municipality_class": df[columns[CLASS_COL_INDEX]].fillna("").astype(str).str.strip(),
+            "monthly": clean_number_series(df[columns[MONTHLY_COL_INDEX]]),
+        }
     )
-    df = df.loc[mask, ["party", "source_file"]].copy()
-    parsed = df["source_file"].apply(parse_source)
-    df = df.assign(parsed=parsed)
-    df = df.dropna(subset=["parsed"])
-    parsed_df = pd.DataFrame(
-        df["parsed"].tolist(),
-        index=df.index,
-        columns=["prefecture", "municipality", "election_date"],
+    for month, index in BONUS_COLUMN_INDICES.items():
+        values[f"bonus_rate_{month}"] = clean_number_series(df[columns[index]]).fillna(0.0)
+    values = values.dropna(subset=["monthly"])
+    rows = df.loc[values.index]
+
+    frames = []
+    for priority, index in enumerate(MUNICIPALITY_ALIAS_COL_INDICES):
+        names = rows[columns[index]]
+        frame = values.assign(municipality=names.astype(str), priority=priority, order=range(len(values)))
+        frames.append(frame[names.notna()])
+    index_df = pd.concat(frames, ignore_index=True)
+    index_df["prefecture_key"] = [normalise_prefecture_name(value) for value in index_df["prefecture"]]
+    index_df["municipality_key"] = [
+        normalise_municipality_name(prefecture, municipality)
+        for prefecture, municipality in zip(index_df["prefecture"], index_df["municipality"])
+    ]
+    index_df = index_df.sort_values(["priority", "order"], kind="stable").drop_duplicates(
+        subset=["prefecture_key", "municipality_key"], keep="first"
     )
-    df = df.join(parsed_df).drop(columns=["parsed"])
 
-    df["election_date"] = pd.to_datetime(df["election_date"]).dt.date
+    merged = pd.DataFrame(
+        [
+            (
+                normalise_prefecture_name(prefecture),
+                normalise_municipality_name(prefecture, former),
+                normalise_municipality_name(prefecture, successor),
+            )
+            for (prefecture, former), successor in MERGED_MUNICIPALITIES.items()
+        ],
+        columns=["prefecture_key", "municipality_key", "successor_key"],
+    )
+    aliases = merged.merge(
+        index_df.rename(columns={"municipality_key": "successor_key"}),
+        on=["prefecture_key", "successor_key"],
+    ).drop(columns=["successor_key"])
+
+    index_df = (
+        pd.concat([index_df, aliases], ignore_index=True)
+        .drop_duplicates(subset=["prefecture_key", "municipality_key"], keep="first")
+        .sort_values(["prefecture_key", "municipality_key"], kind="stable")
+    )
+    return index_df[["prefecture_key", "municipality_key", *COMPENSATION_INDEX_VALUE_COLUMNS]].reset_index(drop=True)
+
+
+def load_compensation_index() -> pd.DataFrame:
+    digest = hashlib.sha256(COMPENSATION_PATH.read_bytes()).hexdigest()
+    cache_key = f"{digest}:{MUNICIPALITY_KEY_VERSION}:{','.join(COMPENSATION_INDEX_VALUE_COLUMNS)}"
+    if COMPENSATION_INDEX_CACHE_PATH.exists():
+        try:
+            cached = json.loads(COMPENSATION_INDEX_CACHE_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = None
+        if cached and cached.get("cache_key") == cache_key:
+            return pd.DataFrame(cached["rows"], columns=cached["columns"])
+
+    index_df = build_compensation_index()
+    COMPENSATION_INDEX_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # run_pipeline runs this module and build_dashboard_data side by side; both may write the cache.
+    temporary = COMPENSATION_INDEX_CACHE_PATH.with_name(f"{COMPENSATION_INDEX_CACHE_PATH.name}.{os.getpid()}.tmp")
+    temporary.write_text(
+        json.dumps(
+            {
+                "cache_key": cache_key,
+                "columns": list(index_df.columns),
+                "rows": index_df.values.tolist(),
+            },
+            ensure_ascii=False,
+        ),
+        encoding="utf-8",
+    )
+    os.replace(temporary, COMPENSATION_INDEX_CACHE_PATH)
+    return index_df
+
+
+def join_compensation_reference(
+    seat_terms: pd.DataFrame, index_df: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Attach compensation rates to seat terms; return (matched, unmatched)."""
+    keys = seat_terms[["prefecture", "municipality"]].drop_duplicates()
+    keys = keys.assign(
+        prefecture_key=[normalise_prefecture_name(value) for value in keys["prefecture"]],
+        municipality_key=[
+            normalise_municipality_name(prefecture, municipality)
+            for prefecture, municipality in zip(keys["prefecture"], keys["municipality"])
+        ],
+    )
+    joined = seat_terms.merge(keys, on=["prefecture", "municipality"], how="left").merge(
+        index_df, on=["prefecture_key", "municipality_key"], how="left", indicator=True
+    )
+    joined.index = seat_terms.index
+    matched_mask = joined["_merge"] == "both"
+    joined = joined.drop(columns=["prefecture_key", "municipality_key", "_merge"])
+    return joined[matched_mask], seat_terms[~matched_mask]
+
+
+def summarise_unmatched_terms(unmatched: pd.DataFrame) -> list:
+    if unmatched.empty:
+        return []
     grouped = (
-        df.groupby(["prefecture", "municipality", "election_date", "party"], as_index=False)
-        .size()
-        .rename(columns={"size": "seat_count"})
+        unmatched.groupby(["prefecture", "municipality"], as_index=False)
+        .agg(term_count=("election_date", "nunique"), seat_count=("seat_count", "sum"))
+        .sort_values(["prefecture", "municipality"])
+    )
+    return [
+        {
+            "prefecture": row.prefecture,
+            "municipality": row.municipality,
+            "term_count": int(row.term_count),
+            "seat_count": int(row.seat_count),
+        }
+        for row in grouped.itertuples(index=False)
+    ]
+
+
+def empty_compensation_payload(unmatched_terms: Optional[list] = None) -> dict:
+    return add_generated_at(
+        {
+            "currency": "JPY",
+            "formula": "Prorated using monthly amount and bonus rates.",
+            "source_compensation_year": 2020,
+            "rows": [],
+            "party_summary": [],
+            "municipality_breakdown": [],
+            "unmatched_terms": unmatched_terms or [],
+            **empty_compensation_rollups(),
+        }
     )
 
-    unique_elections = (
-        grouped[["prefecture", "municipality", "election_date"]]
-        .drop_duplicates()
-        .sort_values(["prefecture", "municipality", "election_date"])
+
+def empty_compensation_rollups() -> dict:
+    return {
+        "year_totals": [],
+        "party_years": [],
+        "prefecture_years": [],
+        "municipalities": [],
+        "party_municipality_spans": [],
+    }
+
+
+def year_spans(years) -> list:
+    """Collapse sorted years into inclusive ``(first, last)`` runs of consecutive years."""
+    spans = []
+    for year in years:
+        if spans and year == spans[-1][1] + 1:
+            spans[-1][1] = year
+        else:
+            spans.append([year, year])
+    return spans
+
+
+def build_compensation_rollups(annual_df: pd.DataFrame) -> dict:
+    """National, party and prefecture rollups per year, as the dashboard shows them.
+
+    Records of the same municipality, party and year (a term ending and the
+    next one starting) are merged first: compensation is summed and the larger
+    seat count is kept. ``party_municipality_spans`` lists the consecutive
+    years each party held seats in a municipality, so distinct municipality
+    counts for any year range can be taken without the municipality rows.
+    """
+    merged = (
+        annual_df.groupby(["prefecture", "municipality", "party", "year"], as_index=False)
+        .agg(seat_count=("seat_count", "max"), total_compensation=("total_compensation", "sum"))
+        .sort_values(["prefecture", "municipality", "party", "year"])
     )
-    unique_elections["next_election_date"] = unique_elections.groupby(
-        ["prefecture", "municipality"]
-    )["election_date"].shift(-1)
-    unique_elections["term_end"] = unique_elections["next_election_date"]
-    missing_mask = unique_elections["term_end"].isna()
-    unique_elections.loc[missing_mask, "term_end"] = unique_elections.loc[
-        missing_mask, "election_date"
-    ].apply(lambda value: add_years_safe(value, TERM_YEARS))
-    unique_elections = unique_elections.drop(columns=["next_election_date"])
-
-    grouped = grouped.merge(
-        unique_elections,
-        on=["prefecture", "municipality", "election_date"],
-        how="left",
+    municipality_keys = merged[["prefecture", "municipality"]].drop_duplicates()
+    municipality_ids = {key: index for index, key in enumerate(municipality_keys.itertuples(index=False, name=None))}
+    merged["municipality_id"] = [
+        municipality_ids[key] for key in zip(merged["prefecture"], merged["municipality"])
+    ]
+
+    year_totals = [
+        {
+            "year": int(year),
+            "seat_count": int(group["seat_count"].sum()),
+            "municipality_count": int(group["municipality_id"].nunique()),
+            "party_count": int(group["party"].nunique()),
+            "total_compensation": float(group["total_compensation"].sum()),
+        }
+        for year, group in merged.groupby("year")
+    ]
+    party_years = [
+        {
+            "party": party,
+            "year": int(year),
+            "seat_count": int(group["seat_count"].sum()),
+            "municipality_count": len(group),
+            "total_compensation": float(group["total_compensation"].sum()),
+        }
+        for (party, year), group in merged.groupby(["party", "year"])
+    ]
+    prefecture_years = [
+        {
+            "prefecture": prefecture,
+            "year": int(year),
+            "seat_count": int(group["seat_count"].sum()),
+            "municipality_count": int(group["municipality_id"].nunique()),
+            "party_count": int(group["party"].nunique()),
+            "total_compensation": float(group["total_compensation"].sum()),
+        }
+        for (prefecture, year), group in merged.groupby(["prefecture", "year"])
+    ]
+    spans = []
+    for (party, municipality_id), group in merged.groupby(["party", "municipality_id"]):
+        for first, last in year_spans(int(year) for year in group["year"]):
+            spans.append(
+                {"party": party, "municipality_id": int(municipality_id), "year_from": first, "year_to": last}
+            )
+
+    return {
+        "year_totals": year_totals,
+        "party_years": party_years,
+        "prefecture_years": prefecture_years,
+        "municipalities": [
+            {"prefecture": prefecture, "municipality": municipality} for prefecture, municipality in municipality_ids
+        ],
+        "party_municipality_spans": spans,
+    }
+
+
+def build_party_compensation(seat_term_rows: Optional[List[dict]] = None) -> dict:
+    """Price ``seat_term_rows`` (the ``seat_terms`` product; default: the cached table)."""
+    seat_terms = load_seat_terms() if seat_term_rows is None else seat_terms_frame(seat_term_rows)
+    matched, unmatched = join_compensation_reference(seat_terms, load_compensation_index())
+    return summarise_party_compensation(
+        build_annual_records(build_term_records(matched)),
+        summarise_unmatched_terms(unmatched),
     )
-    return grouped
 
 
-def load_compensation_reference() -> Dict[Tuple[str, str], Dict[str, float]]:
-    df = pd.read_csv(COMPENSATION_PATH, encoding="utf-8")
-    monthly_col = df.columns[MONTHLY_COL_INDEX]
-    bonus_cols = {month: df.columns[index] for month, index in BONUS_COLUMN_INDICES.items()}
-
-    ref = {}
-    for row in df.itertuples(index=False):
-        prefecture = WHITESPACE_PATTERN.sub("", str(getattr(row, df.columns[1])))
-        municipality = WHITESPACE_PATTERN.sub("", str(getattr(row, df.columns[2])))
-        monthly = clean_number(getattr(row, monthly_col))
-        if monthly is None:
-            continue
-        bonus_rates = {}
-        for month, column in bonus_cols.items():
-            bonus_rates[month] = clean_number(getattr(row, column)) or 0.0
-        key = (prefecture, municipality)
-        if key not in ref:
-            ref[key] = {"monthly": monthly, "bonus_rates": bonus_rates}
-    return ref
-
-
-def build_party_compensation() -> dict:
-    seat_terms = load_seat_terms()
-    comp_map = load_compensation_reference()
-
-    term_records = []
-    for row in seat_terms.itertuples(index=False):
-        key = (row.prefecture, row.municipality)
-        comp = comp_map.get(key)
-        if comp is None:
-            continue
-        start_date = row.election_date
-        end_date = row.term_end
-        if not isinstance(start_date, date) or not isinstance(end_date, date):
-            continue
-
-        months = months_between(start_date, end_date)
-        if months <= 0:
-            months = 1
-
-        monthly = comp["monthly"]
-        bonus_rates = comp["bonus_rates"]
-        bonus_multiplier = 0.0
-        bonus_counts = {}
-        for month, rate in bonus_rates.items():
-            occurrences = count_bonus_occurrences(start_date, end_date, month)
-            bonus_counts[month] = occurrences
-            if occurrences > 0 and rate:
-                bonus_multiplier += (rate / 100.0) * occurrences
-
-        per_seat_total = monthly * (months + bonus_multiplier)
-        total_compensation = per_seat_total * row.seat_count
-
-        term_records.append(
-            {
-                "prefecture": row.prefecture,
-                "municipality": row.municipality,
-                "party": row.party,
-                "election_date": start_date,
-                "term_end": end_date,
-                "seat_count": row.seat_count,
-                "months_in_term": months,
-                "bonus_count_march": bonus_counts.get(3, 0),
-                "bonus_count_june": bonus_counts.get(6, 0),
-                "bonus_count_december": bonus_counts.get(12, 0),
-                "monthly_compensation": monthly,
-                "per_seat_compensation": per_seat_total,
-                "total_compensation": total_compensation,
-                "bonus_rate_march": bonus_rates.get(3, 0.0),
-                "bonus_rate_june": bonus_rates.get(6, 0.0),
-                "bonus_rate_december": bonus_rates.get(12, 0.0),
-            }
-        )
+def month_index(values: pd.Series) -> pd.Series:
+    return values.map(lambda value: value.year * 12 + value.month - 1).astype("int64")
+
+
+def build_term_records(matched: pd.DataFrame) -> pd.DataFrame:
+    """Compute per-term months and bonus occurrences for joined seat terms."""
+    is_date = matched["election_date"].map(lambda value: isinstance(value, date)) & matched["term_end"].map(
+        lambda value: isinstance(value, date)
+    )
+    terms = matched[is_date]
+    if terms.empty:
+        return pd.DataFrame()
+
+    start_index = month_index(terms["election_date"])
+    end_index = month_index(terms["term_end"])
+    months = (end_index - start_index).clip(lower=0)
+    months = months.where(months > 0, 1)
+
+    bonus_multiplier = pd.Series(0.0, index=terms.index)
+    bonus_counts = {}
+    for month in BONUS_COLUMN_INDICES:
+        # months in [start, end) whose calendar month equals ``month``
+        offset = month - 1
+        occurrences = ((end_index - offset + 11) // 12 - (start_index - offset + 11) // 12).clip(lower=0)
+        bonus_counts[month] = occurrences
+        rate = terms[f"bonus_rate_{month}"]
+        bonus_multiplier = bonus_multiplier + (rate / 100.0) * occurrences
+
+    per_seat_total = terms["monthly"] * (months + bonus_multiplier)
+    return pd.DataFrame(
+        {
+            "prefecture": terms["prefecture"],
+            "municipality": terms["municipality"],
+            "party": terms["party"],
+            "election_date": terms["election_date"],
+            "term_end": terms["term_end"],
+            "seat_count": terms["seat_count"],
+            "months_in_term": months,
+            "bonus_count_march": bonus_counts[3],
+            "bonus_count_june": bonus_counts[6],
+            "bonus_count_december": bonus_counts[12],
+            "monthly_compensation": terms["monthly"],
+            "per_seat_compensation": per_seat_total,
+            "total_compensation": per_seat_total * terms["seat_count"],
+            "bonus_rate_march": terms["bonus_rate_3"],
+            "bonus_rate_june": terms["bonus_rate_6"],
+            "bonus_rate_december": terms["bonus_rate_12"],
+        }
+    ).reset_index(drop=True)
+
 
-    term_df = pd.DataFrame(term_records)
+def build_annual_records(term_df: pd.DataFrame) -> list:
     if term_df.empty:
-        return add_generated_at(
-            {
-                "currency": "JPY",
-                "formula": "Prorated using monthly amount and bonus rates.",
-                "source_compensation_year": 2020,
-                "rows": [],
-                "party_summary": [],
-                "municipality_breakdown": [],
-            }
-        )
+        return []
 
     annual_records = []
     for row in term_df.itertuples(index=False):
@@ -391,18 +518,13 @@ def build_party_compensation() -> dict:
                 }
             )
 
+    return annual_records
+
+
+def summarise_party_compensation(annual_records: list, unmatched_terms: Optional[list] = None) -> dict:
     annual_df = pd.DataFrame(annual_records)
     if annual_df.empty:
-        return add_generated_at(
-            {
-                "currency": "JPY",
-                "formula": "Prorated using monthly amount and bonus rates.",
-                "source_compensation_year": 2020,
-                "rows": [],
-                "party_summary": [],
-                "municipality_breakdown": [],
-            }
-        )
+        return empty_compensation_payload(unmatched_terms)
 
     party_year_rows = []
     for (party, year), group in annual_df.groupby(["party", "year"]):
@@ -434,41 +556,38 @@ def build_party_compensation() -> dict:
             }
         )
 
-    municipality_rows = []
-    for row in annual_df.itertuples(index=False):
-        bonus_amount_march = row.monthly_compensation * (row.bonus_rate_march or 0) / 100.0
-        bonus_amount_june = row.monthly_compensation * (row.bonus_rate_june or 0) / 100.0
-        bonus_amount_december = row.monthly_compensation * (row.bonus_rate_december or 0) / 100.0
-        bonus_total = (
-            bonus_amount_march * (row.bonus_count_march or 0)
-            + bonus_amount_june * (row.bonus_count_june or 0)
-            + bonus_amount_december * (row.bonus_count_december or 0)
-        )
-
-        municipality_rows.append(
-            {
-                "party": row.party,
-                "year": int(row.year),
-                "prefecture": row.prefecture,
-                "municipality": row.municipality,
-                "seat_count": int(row.seat_count),
-                "annual_compensation": float(row.annual_compensation),
-                "monthly_compensation": float(row.monthly_compensation),
-                "bonus_compensation": float(bonus_total),
-                "total_compensation": float(row.total_compensation),
-                "months_in_term": int(row.months_in_term),
-                "bonus_count_march": int(row.bonus_count_march),
-                "bonus_count_june": int(row.bonus_count_june),
-                "bonus_count_december": int(row.bonus_count_december),
-                "bonus_amount_march": float(bonus_amount_march),
-                "bonus_amount_june": float(bonus_amount_june),
-                "bonus_amount_december": float(bonus_amount_december),
-                "term_start": to_iso_date(row.term_start),
-                "term_end": to_iso_date(row.term_end),
-                "election_date": to_iso_date(row.term_start),
-                "election_year": int(row.election_year),
-            }
-        )
+    monthly = annual_df["monthly_compensation"]
+    bonus_amounts = {
+        month: monthly * annual_df[f"bonus_rate_{month}"].fillna(0) / 100.0 for month in ("march", "june", "december")
+    }
+    bonus_total = sum(
+        bonus_amounts[month] * annual_df[f"bonus_count_{month}"].fillna(0) for month in ("march", "june", "december")
+    )
+    # Dates stay date objects; the JSON encoder writes them as ISO strings.
+    municipality_rows = pd.DataFrame(
+        {
+            "party": annual_df["party"],
+            "year": annual_df["year"],
+            "prefecture": annual_df["prefecture"],
+            "municipality": annual_df["municipality"],
+            "seat_count": annual_df["seat_count"],
+            "annual_compensation": annual_df["annual_compensation"].astype(float),
+            "monthly_compensation": monthly.astype(float),
+            "bonus_compensation": bonus_total.astype(float),
+            "total_compensation": annual_df["total_compensation"].astype(float),
+            "months_in_term": annual_df["months_in_term"],
+            "bonus_count_march": annual_df["bonus_count_march"],
+            "bonus_count_june": annual_df["bonus_count_june"],
+            "bonus_count_december": annual_df["bonus_count_december"],
+            "bonus_amount_march": bonus_amounts["march"].astype(float),
+            "bonus_amount_june": bonus_amounts["june"].astype(float),
+            "bonus_amount_december": bonus_amounts["december"].astype(float),
+            "term_start": annual_df["term_start"],
+            "term_end": annual_df["term_end"],
+            "election_date": annual_df["term_start"],
+            "election_year": annual_df["election_year"],
+        }
+    ).to_dict("records")
 
     return add_generated_at(
         {
@@ -478,6 +597,8 @@ def build_party_compensation() -> dict:
             "rows": party_year_rows,
             "party_summary": party_summary,
             "municipality_breakdown": municipality_rows,
+            "unmatched_terms": unmatched_terms or [],
+            **build_compensation_rollups(annual_df),
         }
     )
 
@@ -530,6 +651,12 @@ def main() -> None:
         f"{OUTPUT_SUMMARY_CSV.name}, {OUTPUT_YEARLY_CSV.name}, {OUTPUT_MUNICIPAL_CSV.name} "
         f"({year_rows} party-year rows, {party_count} parties, {term_count} municipality records)."
     )
+    unmatched = data.get("unmatched_terms", [])
+    if unmatched:
+        print(
+            f"Unmatched compensation reference: {len(unmatched)} municipalities "
+            f"({sum(item['term_count'] for item in unmatched)} terms) were left out of the totals."
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,432 @@
+"""Pre-simplified, quantized map geometry at several zoom levels.
+
+Reads the full-resolution municipal TopoJSON together with the legacy
+Shizuoka geometry and writes one topology per level to
+``assets/data/map.<level>.topojson.gz``. Each topology holds three objects:
+
+* ``municipalities``: current municipal boundaries, one feature per
+  municipality code, with only the properties the map reads.
+* ``municipalities_legacy``: the pre-2024 Shizuoka features that replace
+  prefecture 22 for older election years.
+* ``prefectures``: prefecture outlines stitched from the municipal arcs, so
+  the browser no longer calls ``topojson.merge``.
+
+Arcs are simplified once per level with Douglas-Peucker, keeping their end
+points. Shared borders therefore stay shared, and neighbouring polygons
+never gap or overlap. Coordinates are then snapped to the level's grid and
+delta-encoded.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from common import PREFECTURES  # type: ignore
+    from output_writer import encode_json, write_encoded  # type: ignore
+else:
+    from .common import PREFECTURES
+    from .output_writer import encode_json, write_encoded
+
+ROOT = Path(__file__).resolve().parent.parent
+ASSET_DATA_DIR = ROOT / "assets" / "data"
+MUNICIPAL_SOURCE_PATH = ASSET_DATA_DIR / "municipal.topojson.gz"
+SHIZUOKA_LEGACY_SOURCE_PATH = ASSET_DATA_DIR / "shizuoka.topojson.gz"
+SHIZUOKA_PREF_CODE = "22"
+
+# level -> (Douglas-Peucker tolerance, quantization grid, minimum polygon extent), in degrees.
+# Polygons smaller than the extent (mostly islets) are dropped, except the largest of each feature.
+GEOMETRY_LEVELS: Dict[str, Tuple[float, float, float]] = {
+    "coarse": (0.005, 0.001, 0.02),
+    "medium": (0.001, 0.0002, 0.004),
+    "fine": (0.0002, 0.0001, 0.0),
+}
+KEPT_PROPERTIES = ("N03_001", "N03_004", "N03_005", "N03_007")
+
+Point = Tuple[float, float]
+Ring = List[int]
+
+
+def load_topology(path: Path) -> Dict[str, Any]:
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        return json.load(stream)
+
+
+def decode_arcs(topology: Dict[str, Any]) -> Tuple[List[List[Tuple[int, int]]], List[List[Point]]]:
+    """Return each arc as absolute quantized points and as longitude/latitude points."""
+    transform = topology.get("transform")
+    quantized: List[List[Tuple[int, int]]] = []
+    positions: List[List[Point]] = []
+    for arc in topology["arcs"]:
+        if transform:
+            x = y = 0
+            points = []
+            for dx, dy in arc:
+                x += dx
+                y += dy
+                points.append((x, y))
+            (sx, sy), (tx, ty) = transform["scale"], transform["translate"]
+            quantized.append(points)
+            positions.append([(px * sx + tx, py * sy + ty) for px, py in points])
+        else:
+            quantized.append([(round(px * 1e7), round(py * 1e7)) for px, py, *_ in arc])
+            positions.append([(px, py) for px, py, *_ in arc])
+    return quantized, positions
+
+
+def geometry_rings(geometry: Dict[str, Any]) -> List[List[Ring]]:
+    """Return the geometry's polygons as lists of arc-index rings."""
+    if geometry.get("type") == "Polygon":
+        return [geometry["arcs"]]
+    if geometry.get("type") == "MultiPolygon":
+        return list(geometry["arcs"])
+    return []
+
+
+def offset_rings(polygons: List[List[Ring]], offset: int) -> List[List[Ring]]:
+    return [
+        [[index + offset if index >= 0 else ~(~index + offset) for index in ring] for ring in polygon]
+        for polygon in polygons
+    ]
+
+
+def municipal_feature_key(properties: Dict[str, Any]) -> str:
+    code = str(properties.get("N03_007") or "").strip()
+    if code:
+        return code
+    return "|".join(str(properties.get(name) or "") for name in ("N03_001", "N03_004", "N03_005"))
+
+
+def group_municipal_geometries(
+    geometries: Iterable[Dict[str, Any]], arc_offset: int = 0
+) -> List[Dict[str, Any]]:
+    """Collapse the per-polygon geometries of each municipality into one MultiPolygon."""
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for geometry in geometries:
+        polygons = offset_rings(geometry_rings(geometry), arc_offset)
+        if not polygons:
+            continue
+        properties = geometry.get("properties") or {}
+        key = municipal_feature_key(properties)
+        entry = grouped.get(key)
+        if entry is None:
+            entry = {
+                "type": "MultiPolygon",
+                "arcs": [],
+                "properties": {name: properties.get(name) for name in KEPT_PROPERTIES},
+            }
+            grouped[key] = entry
+        entry["arcs"].extend(polygons)
+    return list(grouped.values())
+
+
+def prefecture_code(properties: Dict[str, Any]) -> Optional[str]:
+    name = str(properties.get("N03_001") or "").strip()
+    if name in PREFECTURES:
+        return f"{PREFECTURES.index(name) + 1:02d}"
+    code = str(properties.get("N03_007") or "").strip()
+    return code[:2] if len(code) >= 2 else None
+
+
+def arc_endpoints(quantized: List[List[Tuple[int, int]]], index: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    points = quantized[index if index >= 0 else ~index]
+    return (points[0], points[-1]) if index >= 0 else (points[-1], points[0])
+
+
+def ring_area(positions: List[List[Point]], ring: Ring) -> float:
+    points: List[Point] = []
+    for index in ring:
+        arc = positions[index] if index >= 0 else positions[~index][::-1]
+        points.extend(arc if not points else arc[1:])
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:])) / 2
+
+
+def ring_points(positions: List[List[Point]], ring: Ring) -> List[Point]:
+    points: List[Point] = []
+    for index in ring:
+        arc = positions[index] if index >= 0 else positions[~index][::-1]
+        points.extend(arc if not points else arc[1:])
+    return points
+
+
+def point_in_ring(point: Point, ring: Sequence[Point]) -> bool:
+    x, y = point
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        if (y0 > y) != (y1 > y) and x < (x1 - x0) * (y - y0) / (y1 - y0) + x0:
+            inside = not inside
+    return inside
+
+
+def stitch_rings(arcs: List[int], quantized: List[List[Tuple[int, int]]]) -> List[Ring]:
+    """Chain directed boundary arcs end to start into closed rings."""
+    by_start: Dict[Tuple[int, int], List[int]] = {}
+    for index in arcs:
+        by_start.setdefault(arc_endpoints(quantized, index)[0], []).append(index)
+    used = set()
+    rings: List[Ring] = []
+    for first in arcs:
+        if first in used:
+            continue
+        ring = [first]
+        used.add(first)
+        start, end = arc_endpoints(quantized, first)
+        while end != start:
+            candidates = [index for index in by_start.get(end, []) if index not in used]
+            if not candidates:
+                break
+            ring.append(candidates[0])
+            used.add(candidates[0])
+            end = arc_endpoints(quantized, candidates[0])[1]
+        if end == start:
+            rings.append(ring)
+    return rings
+
+
+def merge_polygons(
+    polygons: List[List[Ring]], quantized: List[List[Tuple[int, int]]], positions: List[List[Point]]
+) -> List[List[Ring]]:
+    """Dissolve ``polygons`` into the outline of their union, like topojson.merge."""
+    counts: Dict[int, int] = {}
+    for polygon in polygons:
+        for ring in polygon:
+            for index in ring:
+                key = index if index >= 0 else ~index
+                counts[key] = counts.get(key, 0) + 1
+    boundary = [
+        index
+        for polygon in polygons
+        for ring in polygon
+        for index in ring
+        if counts[index if index >= 0 else ~index] == 1
+    ]
+    rings = stitch_rings(boundary, quantized)
+    if not rings:
+        return []
+
+    # Boundary arcs keep the direction they had in their source rings, so merged
+    # exteriors share the orientation of the input exteriors.
+    exterior_sign = 1 if ring_area(positions, polygons[0][0]) >= 0 else -1
+    exteriors: List[Tuple[float, Ring, List[Point]]] = []
+    holes: List[Tuple[Ring, List[Point]]] = []
+    for ring in rings:
+        area = ring_area(positions, ring)
+        points = ring_points(positions, ring)
+        if area * exterior_sign >= 0:
+            exteriors.append((abs(area), ring, points))
+        else:
+            holes.append((ring, points))
+    exteriors.sort(key=lambda item: item[0])
+    merged: List[List[Ring]] = [[ring] for _, ring, _ in exteriors]
+    for hole, points in holes:
+        for position, (_, _, outline) in enumerate(exteriors):
+            if point_in_ring(points[0], outline):
+                merged[position].append(hole)
+                break
+    return merged
+
+
+def build_prefecture_geometries(
+    municipalities: List[Dict[str, Any]], quantized: List[List[Tuple[int, int]]], positions: List[List[Point]]
+) -> List[Dict[str, Any]]:
+    polygons_by_pref: Dict[str, List[List[Ring]]] = {}
+    for geometry in municipalities:
+        code = prefecture_code(geometry["properties"])
+        if code:
+            polygons_by_pref.setdefault(code, []).extend(geometry["arcs"])
+    geometries = []
+    for code in sorted(polygons_by_pref):
+        merged = merge_polygons(polygons_by_pref[code], quantized, positions)
+        if merged:
+            geometries.append(
+                {
+                    "type": "MultiPolygon",
+                    "arcs": merged,
+                    "properties": {"pref_code": code, "region_name": PREFECTURES[int(code) - 1]},
+                }
+            )
+    return geometries
+
+
+def perpendicular_distance(point: Point, start: Point, end: Point) -> float:
+    (x, y), (x0, y0), (x1, y1) = point, start, end
+    dx, dy = x1 - x0, y1 - y0
+    if dx == 0 and dy == 0:
+        return ((x - x0) ** 2 + (y - y0) ** 2) ** 0.5
+    return abs(dy * x - dx * y + x1 * y0 - y1 * x0) / (dx * dx + dy * dy) ** 0.5
+
+
+def simplify_arc(points: List[Point], tolerance: float) -> List[Point]:
+    """Douglas-Peucker that always keeps both end points (and closed rings non-degenerate)."""
+    if len(points) <= 2 or tolerance <= 0:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        best_index, best_distance = -1, -1.0
+        for index in range(first + 1, last):
+            distance = perpendicular_distance(points[index], points[first], points[last])
+            if distance > best_distance:
+                best_index, best_distance = index, distance
+        if best_index >= 0 and (best_distance > tolerance or (first == 0 and last == len(points) - 1 and points[0] == points[-1])):
+            keep[best_index] = True
+            stack.append((first, best_index))
+            stack.append((best_index, last))
+    simplified = [point for point, kept in zip(points, keep) if kept]
+    if points[0] == points[-1] and len(simplified) < 4:
+        # A closed ring needs at least three distinct vertices to stay a polygon.
+        extra = sorted(
+            (i for i in range(1, len(points) - 1) if not keep[i]),
+            key=lambda i: -perpendicular_distance(points[i], points[0], points[0]),
+        )
+        indices = sorted({i for i, kept in enumerate(keep) if kept} | set(extra[: 4 - len(simplified)]))
+        simplified = [points[i] for i in indices]
+    return simplified
+
+
+def polygon_extent(positions: List[List[Point]], polygon: List[Ring]) -> float:
+    points = [point for index in polygon[0] for point in positions[index if index >= 0 else ~index]]
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    return max(max(xs) - min(xs), max(ys) - min(ys))
+
+
+def drop_small_polygons(
+    positions: List[List[Point]], objects: Dict[str, Any], min_extent: float
+) -> Dict[str, Any]:
+    if min_extent <= 0:
+        return objects
+    filtered: Dict[str, Any] = {}
+    for name, collection in objects.items():
+        geometries = []
+        for geometry in collection["geometries"]:
+            extents = [polygon_extent(positions, polygon) for polygon in geometry["arcs"]]
+            largest = max(range(len(extents)), key=extents.__getitem__)
+            polygons = [
+                polygon
+                for index, (polygon, extent) in enumerate(zip(geometry["arcs"], extents))
+                if extent >= min_extent or index == largest
+            ]
+            geometries.append(dict(geometry, arcs=polygons))
+        filtered[name] = dict(collection, geometries=geometries)
+    return filtered
+
+
+def renumber_arcs(objects: Dict[str, Any]) -> Tuple[Dict[str, Any], List[int]]:
+    """Rewrite arc references to a dense range and return the kept source arc ids in order."""
+    mapping: Dict[int, int] = {}
+    renumbered: Dict[str, Any] = {}
+    for name, collection in objects.items():
+        geometries = []
+        for geometry in collection["geometries"]:
+            polygons = []
+            for polygon in geometry["arcs"]:
+                rings = []
+                for ring in polygon:
+                    indices = []
+                    for index in ring:
+                        source = index if index >= 0 else ~index
+                        target = mapping.setdefault(source, len(mapping))
+                        indices.append(target if index >= 0 else ~target)
+                    rings.append(indices)
+                polygons.append(rings)
+            geometries.append(dict(geometry, arcs=polygons))
+        renumbered[name] = dict(collection, geometries=geometries)
+    return renumbered, list(mapping)
+
+
+def encode_level(
+    positions: List[List[Point]], objects: Dict[str, Any], tolerance: float, grid: float, min_extent: float = 0.0
+) -> Dict[str, Any]:
+    objects, kept = renumber_arcs(drop_small_polygons(positions, objects, min_extent))
+    positions = [positions[index] for index in kept]
+    xs = [x for arc in positions for x, _ in arc]
+    ys = [y for arc in positions for _, y in arc]
+    translate = [min(xs), min(ys)]
+    arcs = []
+    for arc in positions:
+        x = y = 0
+        encoded = []
+        for px, py in simplify_arc(arc, tolerance):
+            qx = round((px - translate[0]) / grid)
+            qy = round((py - translate[1]) / grid)
+            if encoded and qx == x and qy == y:
+                continue
+            encoded.append([qx - x, qy - y])
+            x, y = qx, qy
+        if len(encoded) == 1:
+            encoded.append([0, 0])
+        arcs.append(encoded)
+    return {
+        "type": "Topology",
+        "transform": {"scale": [grid, grid], "translate": translate},
+        "objects": objects,
+        "arcs": arcs,
+    }
+
+
+def build_map_objects() -> Tuple[Dict[str, Any], List[List[Point]]]:
+    municipal = load_topology(MUNICIPAL_SOURCE_PATH)
+    legacy = load_topology(SHIZUOKA_LEGACY_SOURCE_PATH)
+    municipal_quantized, municipal_positions = decode_arcs(municipal)
+    legacy_quantized, legacy_positions = decode_arcs(legacy)
+
+    municipal_object = next(iter(municipal["objects"].values()))
+    legacy_object = next(iter(legacy["objects"].values()))
+    municipalities = group_municipal_geometries(municipal_object.get("geometries", []))
+    legacy_municipalities = [
+        geometry
+        for geometry in group_municipal_geometries(legacy_object.get("geometries", []), len(municipal_positions))
+        if prefecture_code(geometry["properties"]) == SHIZUOKA_PREF_CODE
+    ]
+    prefectures = build_prefecture_geometries(municipalities, municipal_quantized, municipal_positions)
+
+    objects = {
+        "municipalities": {"type": "GeometryCollection", "geometries": municipalities},
+        "municipalities_legacy": {
+            "type": "GeometryCollection",
+            "replaces_pref_code": SHIZUOKA_PREF_CODE,
+            "geometries": legacy_municipalities,
+        },
+        "prefectures": {"type": "GeometryCollection", "geometries": prefectures},
+    }
+    return objects, municipal_positions + legacy_positions
+
+
+def level_path(level: str) -> Path:
+    return ASSET_DATA_DIR / f"map.{level}.topojson.gz"
+
+
+def write_map_levels(levels: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    objects, positions = build_map_objects()
+    sizes = {}
+    for level in levels or GEOMETRY_LEVELS:
+        topology = encode_level(positions, objects, *GEOMETRY_LEVELS[level])
+        path = level_path(level)
+        write_encoded(path, encode_json(topology))
+        sizes[level] = path.stat().st_size
+    return sizes
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build multi-resolution map geometry.")
+    parser.add_argument("levels", nargs="*", help=f"levels to build: {', '.join(GEOMETRY_LEVELS)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [level for level in args.levels if level not in GEOMETRY_LEVELS]
+    if unknown:
+        parser.error(f"unknown level(s): {', '.join(unknown)}")
+    for level, size in write_map_levels(args.levels).items():
+        print(f"Wrote {level_path(level).name}: {size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
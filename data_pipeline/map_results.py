@@ -0,0 +1,157 @@
+"""Municipal council results keyed by the map's geometry ids.
+
+The map used to rebuild council composition from every candidate in the
+browser and then guess the matching polygon by name. This stage does both
+at build time instead. It builds one row per (geometry id, general council
+election) with the winners' party composition, the leading party's share and
+the turnout-style figures of the election fact table. Election names are joined
+to geometry ids through a normalised (prefecture, municipality) index. A
+council elected city-wide (such as 札幌市) maps to every ward polygon of
+that city.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from build_dashboard_data import normalise_string  # type: ignore
+    from common import (  # type: ignore
+        MERGED_MUNICIPALITIES,
+        TERM_YEARS,
+        add_generated_at,
+        normalise_municipality_name,
+        normalise_prefecture_name,
+    )
+    from generate_compensation_data import parse_municipality  # type: ignore
+    from map_geometry import level_path, load_topology  # type: ignore
+else:
+    from .build_dashboard_data import normalise_string
+    from .common import (
+        MERGED_MUNICIPALITIES,
+        TERM_YEARS,
+        add_generated_at,
+        normalise_municipality_name,
+        normalise_prefecture_name,
+    )
+    from .generate_compensation_data import parse_municipality
+    from .map_geometry import level_path, load_topology
+
+MAP_MUNICIPALITIES_VERSION = 1
+# Every level carries the same features and properties, so read the smallest.
+GEOMETRY_INDEX_SOURCE = level_path("coarse")
+GEOMETRY_OBJECTS = ("municipalities", "municipalities_legacy")
+
+# Mirrors isGeneralMunicipalElection in assets/js/map/dashboard.js.
+MUNICIPAL_COUNCIL_PATTERN = re.compile(r"(市|町|村|区)議会議員選挙")
+BY_ELECTION_PATTERN = re.compile(r"(市|町|村|区)議会議員選挙[^\u4e00-\u9fff]*(補欠|再|出直し|解散|臨時)")
+# Older Shizuoka features spell designated-city wards as one name, e.g. 静岡市葵区.
+COMBINED_WARD_PATTERN = re.compile(r"^(.+市)(.+区)$")
+
+GeometryIndex = Dict[Tuple[str, str], List[str]]
+
+
+def is_general_municipal_election(source_key: str) -> bool:
+    return bool(MUNICIPAL_COUNCIL_PATTERN.search(source_key)) and not BY_ELECTION_PATTERN.search(source_key)
+
+
+def municipality_key(prefecture: str, municipality: str) -> Tuple[str, str]:
+    return normalise_prefecture_name(prefecture), normalise_municipality_name(prefecture, municipality)
+
+
+def build_geometry_index(path: Optional[Path] = None) -> GeometryIndex:
+    """Map (prefecture, municipality) keys to the geometry ids that draw them."""
+    topology = load_topology(GEOMETRY_INDEX_SOURCE if path is None else Path(path))
+    index: Dict[Tuple[str, str], set] = {}
+    for object_name in GEOMETRY_OBJECTS:
+        for geometry in topology["objects"].get(object_name, {}).get("geometries", []):
+            properties = geometry.get("properties") or {}
+            region_id = normalise_string(properties.get("N03_007"))
+            prefecture = normalise_string(properties.get("N03_001"))
+            city = normalise_string(properties.get("N03_004"))
+            ward = normalise_string(properties.get("N03_005"))
+            if not region_id or not prefecture or not city:
+                continue
+            match = COMBINED_WARD_PATTERN.match(city) if not ward else None
+            if match:
+                city, ward = match.groups()
+            index.setdefault(municipality_key(prefecture, city), set()).add(region_id)
+            if ward:
+                index.setdefault(municipality_key(prefecture, f"{city}{ward}"), set()).add(region_id)
+    for (prefecture, former), successor in MERGED_MUNICIPALITIES.items():
+        successor_ids = index.get(municipality_key(prefecture, successor))
+        if successor_ids:
+            index.setdefault(municipality_key(prefecture, former), successor_ids)
+    return {key: sorted(ids) for key, ids in index.items()}
+
+
+def build_map_municipalities(
+    election_facts: Dict[Tuple[str, str], Dict[str, Any]],
+    geometry_index: Optional[GeometryIndex] = None,
+) -> Dict[str, Any]:
+    """Return ``results`` (one row per geometry id and election) and ``composition``.
+
+    ``composition`` rows point at ``results`` by position and hold the seats
+    each party won in that election.
+    """
+    geometry_index = build_geometry_index() if geometry_index is None else geometry_index
+
+    matched: List[Tuple[str, str, str, Dict[str, Any]]] = []
+    unmatched = set()
+    for (source_key, election_date), fact in election_facts.items():
+        if not fact["winner_count"] or not is_general_municipal_election(source_key):
+            continue
+        parsed = parse_municipality(source_key)
+        region_ids = geometry_index.get(municipality_key(*parsed), []) if parsed else []
+        if not region_ids:
+            unmatched.add(source_key)
+            continue
+        for region_id in region_ids:
+            matched.append((region_id, election_date, source_key, fact))
+    matched.sort(key=lambda item: item[:3])
+
+    results: List[Dict[str, Any]] = []
+    composition: List[Dict[str, Any]] = []
+    for region_id, election_date, source_key, fact in matched:
+        parties = sorted(
+            ((party, stats["winners"]) for party, stats in fact["parties"].items() if stats["winners"]),
+            key=lambda item: (-item[1], item[0]),
+        )
+        winners = fact["winner_count"]
+        top_party, top_seats = parties[0]
+        results.append(
+            {
+                "region_id": region_id,
+                "pref_code": region_id[:2],
+                "source_key": source_key,
+                "election_date": election_date,
+                "winners": winners,
+                "seats": fact["seats"],
+                "candidate_count": fact["candidate_count"],
+                "competition_ratio": fact["competition_ratio"],
+                "registered_voters": fact["registered_voters"],
+                "votes": fact["total_votes"],
+                "turnout": fact["turnout"],
+                "top_party": top_party,
+                "top_party_seats": top_seats,
+                "top_party_share": round(top_seats / winners, 4),
+            }
+        )
+        position = len(results) - 1
+        composition.extend({"result": position, "party": party, "seats": count} for party, count in parties)
+
+    return add_generated_at(
+        {
+            "schema_version": MAP_MUNICIPALITIES_VERSION,
+            "term_years": TERM_YEARS,
+            "regions": len({row["region_id"] for row in results}),
+            "results": results,
+            "composition": composition,
+            "unmatched_elections": sorted(unmatched),
+        }
+    )
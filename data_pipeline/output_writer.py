@@ -0,0 +1,473 @@
+"""Serialisation of dashboard outputs and the content-addressed data manifest.
+
+Payloads are serialised to compact UTF-8 JSON by ``encode_json``. It uses
+orjson when installed and the standard library otherwise, and both give the
+same bytes. NumPy scalars and arrays, pandas Series/DataFrames, dates and
+missing values (NaN, ``pd.NA``, ``NaT``) are encoded directly, so builders
+can hand over values without converting them first. Non-finite floats
+become ``null``.
+
+Every published dataset is written twice: under its fixed name (for existing
+links) and under ``<name>.<hash>.json.gz``, which never changes content and can
+be cached indefinitely. ``manifest.json`` maps each dataset name to its hashed
+file so clients only need to revalidate the manifest itself.
+
+Payloads may also be written in the schema_version 2 columnar layout, where
+each record table is stored as per-column arrays and repeated strings are
+replaced by indices into a per-column dictionary.
+
+``encode_typed_series`` writes a payload as a binary file instead. Every long
+list of numbers (and nulls) becomes a little-endian Int32, Float32 or Float64
+buffer (Float32 only when every value survives the round trip unchanged),
+plus a null bitmap when the list has gaps. Everything else stays in a small
+JSON header that refers to the buffers by index. The file starts with
+``EDTS``, then the header length as a little-endian uint32, then the header,
+padded with spaces to a multiple of 8 bytes, then the buffers, each starting
+at a multiple of 8 bytes from the end of the header. The browser can wrap each
+buffer in a typed array without parsing any numbers. Fixed-width values also
+compress better with gzip than decimal text.
+
+``.gz`` files are compressed according to the active compression profile.
+Under ``max``, each published dataset and its hashed copy also get brotli
+(``.br``) and zstd (``.zst``) siblings when those modules are installed.
+Every encoder runs with fixed settings and no timestamps, so the same
+payload always yields the same bytes.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import importlib
+import importlib.util
+import inspect
+import json
+import math
+import re
+import shutil
+import struct
+import sys
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = ROOT / "data"
+MANIFEST_PATH = DATA_DIR / "manifest.json"
+MANIFEST_VERSION = 1
+HASH_LENGTH = 12
+COLUMNAR_SCHEMA_VERSION = 2
+# String columns whose distinct values are at most this share of the rows are dictionary-encoded.
+DICTIONARY_MAX_RATIO = 0.5
+TYPED_SERIES_MAGIC = b"EDTS"
+TYPED_SERIES_VERSION = 1
+# Numeric lists shorter than this stay in the JSON header of a typed series file.
+TYPED_SERIES_MIN_LENGTH = 16
+TYPED_SERIES_ALIGNMENT = 8
+TYPED_BUFFER_CODES = {"int32": "i", "float32": "f", "float64": "d"}
+INT32_MIN, INT32_MAX = -(2**31), 2**31 - 1
+
+# gzip level for every ``.gz`` file and the extra encodings written next to published datasets.
+COMPRESSION_PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {"gzip_level": 1, "variants": ()},
+    "default": {"gzip_level": 9, "variants": ()},
+    "max": {"gzip_level": 9, "variants": ("br", "zst")},
+}
+# Variant suffix -> (module, compress function).
+VARIANT_ENCODERS: Dict[str, tuple] = {
+    "br": ("brotli", lambda module, data: module.compress(data, quality=11)),
+    "zst": ("zstandard", lambda module, data: module.ZstdCompressor(level=19).compress(data)),
+}
+_compression = {"profile": "default"}
+
+
+def set_compression_profile(name: str) -> List[str]:
+    """Select the profile used by later writes; return the variants it can actually produce."""
+    if name not in COMPRESSION_PROFILES:
+        raise ValueError(f"unknown compression profile {name!r}; choose from {', '.join(COMPRESSION_PROFILES)}")
+    _compression["profile"] = name
+    return active_variants()
+
+
+def active_variants() -> List[str]:
+    return [
+        suffix
+        for suffix in COMPRESSION_PROFILES[_compression["profile"]]["variants"]
+        if importlib.util.find_spec(VARIANT_ENCODERS[suffix][0]) is not None
+    ]
+
+
+# Number spellings where orjson may differ from float.__repr__: every exponent (1e-7 vs 1e-07, 1e16 vs
+# 1e+16) and the decimals orjson keeps below 1e-4 (0.00005 vs 5e-05). Output containing a number spelled
+# either way is re-encoded with the standard library.
+ORJSON_FLOAT_MISMATCH = re.compile(rb"(?:^|[:,\[])-?(?:0\.0000[0-9]|[0-9]+(?:\.[0-9]+)?[eE])")
+
+
+def json_default(value: Any) -> Any:
+    """Plain JSON value for the objects the encoders do not handle themselves."""
+    pandas = sys.modules.get("pandas")
+    if pandas is not None:
+        if value is pandas.NA or value is pandas.NaT:
+            return None
+        if isinstance(value, pandas.DataFrame):
+            return value.to_dict("records")
+        if isinstance(value, (pandas.Series, pandas.Index)):
+            return value.tolist()
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        if isinstance(value, numpy.ndarray):
+            return value.tolist()
+        if isinstance(value, numpy.datetime64):
+            return None if numpy.isnat(value) else str(numpy.datetime_as_string(value))
+        if isinstance(value, numpy.generic):
+            return value.item()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+STDLIB_ENCODER = json.JSONEncoder(
+    ensure_ascii=False,
+    separators=(",", ":"),
+    allow_nan=False,
+    default=json_default,
+)
+
+
+def replace_non_finite(value: Any) -> Any:
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [replace_non_finite(item) for item in value]
+    if value is None or isinstance(value, (str, int)):
+        return value
+    return replace_non_finite(json_default(value))
+
+
+def encode_json(payload: Any) -> bytes:
+    if orjson is not None:
+        try:
+            # Non-string keys raise here and go to the standard library, which decides how to spell them.
+            data = orjson.dumps(payload, default=json_default)
+        except TypeError:
+            data = None
+        if data is not None and not ORJSON_FLOAT_MISMATCH.search(data):
+            return data
+    try:
+        text = STDLIB_ENCODER.encode(payload)
+    except ValueError:
+        # NaN or infinity somewhere: rare, so only then walk the payload.
+        text = STDLIB_ENCODER.encode(replace_non_finite(payload))
+    return text.encode("utf-8")
+
+
+def encode_columnar_table(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    columns: List[str] = list(dict.fromkeys(name for record in records for name in record))
+    values: List[List[Any]] = []
+    dictionaries: Dict[str, List[Any]] = {}
+    for name in columns:
+        column = [record.get(name) for record in records]
+        # Only string columns are dictionary-encoded; lists (e.g. a person's parties) stay plain values.
+        if not all(value is None or isinstance(value, str) for value in column):
+            values.append(column)
+            continue
+        distinct = dict.fromkeys(column)
+        if any(value is not None for value in distinct) and len(distinct) <= len(column) * DICTIONARY_MAX_RATIO:
+            codes = {value: code for code, value in enumerate(distinct)}
+            dictionaries[name] = list(distinct)
+            column = [codes[value] for value in column]
+        values.append(column)
+    return {
+        "encoding": "columnar",
+        "length": len(records),
+        "columns": columns,
+        "values": values,
+        "dictionaries": dictionaries,
+    }
+
+
+def decode_columnar_table(table: Dict[str, Any]) -> List[Dict[str, Any]]:
+    columns = []
+    for name, column in zip(table["columns"], table["values"]):
+        dictionary = table["dictionaries"].get(name)
+        columns.append([dictionary[code] for code in column] if dictionary is not None else column)
+    if not columns:
+        return [{} for _ in range(table["length"])]
+    return [dict(zip(table["columns"], row)) for row in zip(*columns)]
+
+
+def columnar_payload(payload: Dict[str, Any], tables: Iterable[str]) -> Dict[str, Any]:
+    """Return ``payload`` with the listed record tables in the columnar layout."""
+    result = dict(payload, schema_version=COLUMNAR_SCHEMA_VERSION)
+    for name in tables:
+        if isinstance(result.get(name), list):
+            result[name] = encode_columnar_table(result[name])
+    return result
+
+
+def typed_buffer(values: List[Any]) -> Optional[tuple]:
+    """``(type, little-endian values, null bitmap or None)`` for a list of numbers and nulls, else ``None``."""
+    present = [value for value in values if value is not None]
+    if not present or any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in present):
+        return None
+    if any(isinstance(value, float) for value in present):
+        if not all(math.isfinite(value) for value in present):
+            return None
+        single = all(abs(value) <= 3.4e38 for value in present) and struct.unpack(
+            f"<{len(present)}f", struct.pack(f"<{len(present)}f", *present)
+        ) == tuple(present)
+        kind, code = ("float32", "f") if single else ("float64", "d")
+    elif all(INT32_MIN <= value <= INT32_MAX for value in present):
+        kind, code = "int32", "i"
+    else:
+        return None
+    data = struct.pack(f"<{len(values)}{code}", *(0 if value is None else value for value in values))
+    if len(present) == len(values):
+        return kind, data, None
+    # Bit i (least significant first) is set when values[i] is present.
+    nulls = bytearray((len(values) + 7) // 8)
+    for index, value in enumerate(values):
+        if value is not None:
+            nulls[index >> 3] |= 1 << (index & 7)
+    return kind, data, bytes(nulls)
+
+
+def encode_typed_series(payload: Dict[str, Any], tables: Iterable[str] = ()) -> bytes:
+    """Return ``payload`` as a typed series file; the listed record tables are made columnar first."""
+    payload = dict(payload)
+    for name in tables:
+        if isinstance(payload.get(name), list):
+            payload[name] = encode_columnar_table(payload[name])
+
+    buffers: List[Dict[str, Any]] = []
+    body = bytearray()
+
+    def append(data: bytes) -> int:
+        body.extend(b"\0" * (-len(body) % TYPED_SERIES_ALIGNMENT))
+        offset = len(body)
+        body.extend(data)
+        return offset
+
+    def pack(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: pack(item) for key, item in value.items()}
+        if isinstance(value, list):
+            typed = typed_buffer(value) if len(value) >= TYPED_SERIES_MIN_LENGTH else None
+            if typed is None:
+                return [pack(item) for item in value]
+            kind, data, nulls = typed
+            buffers.append(
+                {
+                    "type": kind,
+                    "length": len(value),
+                    "offset": append(data),
+                    "nulls": append(nulls) if nulls is not None else None,
+                }
+            )
+            return {"$typed": len(buffers) - 1}
+        return value
+
+    packed = pack(payload)
+    header = encode_json(
+        {"format": "typed_series", "version": TYPED_SERIES_VERSION, "buffers": buffers, "payload": packed}
+    )
+    header += b" " * (-len(header) % TYPED_SERIES_ALIGNMENT)
+    return TYPED_SERIES_MAGIC + struct.pack("<I", len(header)) + header + bytes(body)
+
+
+def decode_typed_series(data: bytes) -> Dict[str, Any]:
+    if data[:4] != TYPED_SERIES_MAGIC:
+        raise ValueError("not a typed series file")
+    (header_length,) = struct.unpack_from("<I", data, 4)
+    header = json.loads(data[8 : 8 + header_length])
+    body = 8 + header_length
+    arrays = []
+    for buffer in header["buffers"]:
+        code = TYPED_BUFFER_CODES[buffer["type"]]
+        values: List[Any] = list(struct.unpack_from(f"<{buffer['length']}{code}", data, body + buffer["offset"]))
+        if buffer["nulls"] is not None:
+            nulls = data[body + buffer["nulls"] :]
+            values = [value if nulls[index >> 3] & (1 << (index & 7)) else None for index, value in enumerate(values)]
+        arrays.append(values)
+
+    def unpack(value: Any) -> Any:
+        if isinstance(value, dict):
+            return arrays[value["$typed"]] if set(value) == {"$typed"} else {k: unpack(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [unpack(item) for item in value]
+        return value
+
+    return unpack(header["payload"])
+
+
+def write_encoded(path: Path, data: bytes) -> None:
+    if path.suffix == ".gz":
+        level = COMPRESSION_PROFILES[_compression["profile"]]["gzip_level"]
+        supports_mtime = "mtime" in inspect.signature(gzip.open).parameters
+        if supports_mtime:
+            with gzip.open(path, "wb", compresslevel=level, mtime=0) as stream:
+                stream.write(data)
+        else:
+            # Fallback for older Python without mtime support on gzip.open
+            with gzip.GzipFile(filename=str(path), mode="wb", compresslevel=level, mtime=0) as stream:
+                stream.write(data)
+    else:
+        path.write_bytes(data)
+
+
+def variant_path(path: Path, suffix: str) -> Path:
+    return path.with_suffix(f".{suffix}")
+
+
+def write_variants(path: Path, data: bytes, replace: bool) -> None:
+    """Write the active profile's encodings of ``data`` next to the ``.gz`` file ``path``.
+
+    With ``replace`` the content has changed, so existing variants are
+    rewritten and variants outside the profile are removed as stale.
+    """
+    variants = active_variants()
+    for suffix, (module_name, compress) in VARIANT_ENCODERS.items():
+        target = variant_path(path, suffix)
+        if suffix in variants:
+            if replace or not target.exists():
+                target.write_bytes(compress(importlib.import_module(module_name), data))
+        elif replace and target.exists():
+            target.unlink()
+
+
+def write_json(path: Path, payload: Dict[str, Any], columnar_tables: Iterable[str] = ()) -> None:
+    if columnar_tables:
+        payload = columnar_payload(payload, columnar_tables)
+    write_encoded(path, encode_json(payload))
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_content(path: Path) -> Optional[bytes]:
+    if not path.exists():
+        return None
+    try:
+        return gzip.decompress(path.read_bytes()) if path.suffix == ".gz" else path.read_bytes()
+    except (OSError, EOFError):
+        return None
+
+
+def read_digest(path: Path) -> Optional[str]:
+    data = read_content(path)
+    return None if data is None else content_digest(data)
+
+
+def dataset_name(path: Path) -> str:
+    return path.name.split(".", 1)[0]
+
+
+def hashed_path(path: Path, digest: str) -> Path:
+    stem, suffixes = path.name.split(".", 1)
+    return path.with_name(f"{stem}.{digest[:HASH_LENGTH]}.{suffixes}")
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Dict[str, Any]:
+    if path.exists():
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = None
+        if isinstance(manifest, dict) and manifest.get("version") == MANIFEST_VERSION:
+            manifest.setdefault("datasets", {})
+            return manifest
+    return {"version": MANIFEST_VERSION, "datasets": {}}
+
+
+def save_manifest(manifest: Dict[str, Any], path: Path = MANIFEST_PATH) -> None:
+    manifest = dict(manifest, datasets=dict(sorted(manifest["datasets"].items())))
+    text = json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+    if path.exists() and path.read_text(encoding="utf-8") == text:
+        return
+    path.write_text(text, encoding="utf-8")
+
+
+def prune_hashed_copies(path: Path, keep: Path) -> None:
+    stem, suffixes = path.name.split(".", 1)
+    inner = re.escape(suffixes.rsplit(".", 1)[0])
+    encodings = "|".join(re.escape(suffix) for suffix in ("gz", *VARIANT_ENCODERS))
+    pattern = re.compile(rf"^{re.escape(stem)}\.([0-9a-f]{{{HASH_LENGTH}}})\.{inner}\.(?:{encodings})$")
+    for candidate in path.parent.iterdir():
+        match = pattern.match(candidate.name)
+        if match and not keep.name.startswith(f"{stem}.{match.group(1)}."):
+            candidate.unlink()
+
+
+# Called with (name, previous release bytes or None, new bytes, previous manifest
+# entry, new version) when a dataset changes; returns the entry's patch chain,
+# or None for datasets that are not patched.
+ReleaseHook = Callable[[str, Optional[bytes], bytes, Dict[str, Any], int], Optional[List[Dict[str, Any]]]]
+
+
+def publish_json(
+    path: Path,
+    payload: Dict[str, Any],
+    manifest: Dict[str, Any],
+    on_release: Optional[ReleaseHook] = None,
+) -> bool:
+    """Write ``payload`` to ``path`` and its hashed copy unless already current.
+
+    Returns ``True`` when anything was written. The manifest entry is updated
+    in place either way; its ``version`` increases whenever the content does.
+    """
+    return publish_bytes(path, encode_json(payload), manifest, on_release)
+
+
+def publish_bytes(
+    path: Path,
+    data: bytes,
+    manifest: Dict[str, Any],
+    on_release: Optional[ReleaseHook] = None,
+) -> bool:
+    """``publish_json`` for content that is already encoded."""
+    digest = content_digest(data)
+    name = dataset_name(path)
+    target = hashed_path(path, digest)
+    previous = manifest["datasets"].get(name) or {}
+    changed = previous.get("sha256") != digest
+    version = int(previous.get("version", 0)) + 1 if changed else int(previous.get("version", 1))
+
+    written = False
+    previous_data = None
+    if not (path.exists() and (not changed or read_digest(path) == digest)):
+        previous_data = read_content(path) if on_release else None
+        if previous_data is not None and content_digest(previous_data) != previous.get("sha256"):
+            previous_data = None
+        write_encoded(path, data)
+        written = True
+    write_variants(path, data, replace=written)
+    if not target.exists():
+        shutil.copyfile(path, target)
+        written = True
+    write_variants(target, data, replace=False)
+    prune_hashed_copies(path, target)
+
+    entry: Dict[str, Any] = {
+        "file": target.name,
+        "sha256": digest,
+        "bytes": target.stat().st_size,
+        "version": version,
+    }
+    if changed and on_release:
+        patches = on_release(name, previous_data, data, previous, version)
+    else:
+        patches = previous.get("patches")
+    if patches is not None:
+        entry["patches"] = patches
+    manifest["datasets"][name] = entry
+    return written
@@ -0,0 +1,414 @@
+"""HTTP query API for filtered dashboard aggregates.
+
+The published datasets cover every party, prefecture and date, and the
+dashboards filter them in the browser. This server loads the candidate and
+compensation tables once and answers filtered queries with only the slice
+asked for. Filter columns (party, prefecture, election date) are held as
+columns, so a filter is a few vectorised comparisons. The selected rows are
+then run through the same builders as the published files:
+
+``/api/win_rate``
+    ``build_win_rate_dataset`` with the party order of the seat timeline,
+    exactly as ``win_rate.json.gz``; ``max_parties`` (default 12).
+``/api/timeline``
+    ``build_top_dashboard_payload``, the seat timeline of ``top_dashboard.json.gz``.
+``/api/vote_optimization``
+    ``build_vote_optimization_dataset``.
+``/api/compensation``
+    compensation totals of the municipality rows grouped by ``by``
+    (any of party, year, prefecture, municipality; default ``party,year``).
+``/api/meta``
+    the filter values available and the loaded row counts.
+
+Every endpoint takes ``party`` and ``prefecture`` (name or two-digit code,
+repeated or comma separated) and ``from``/``to`` (``YYYY``, ``YYYY-MM`` or
+``YYYY-MM-DD``, inclusive). For the win rate and compensation the party
+filter selects rows. The seat timeline and vote optimisation need every
+candidate of an election (seat changes, the lowest winning vote), so there
+it only trims the parties in the result.
+
+With no filters the responses equal the published files. Responses are kept
+in an LRU cache keyed by the normalised query, carry an ``ETag`` and are
+gzip-encoded when the client accepts it. Anything outside ``/api/`` is
+served like ``serve.py``. Tables come from ``data/dashboard.sqlite`` when it
+exists, otherwise from the pipeline inputs like ``build_dashboard_data``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import io
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import partial
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from build_dashboard_data import (  # type: ignore
+        build_products,
+        build_top_dashboard_payload,
+        build_vote_optimization_dataset,
+        build_win_rate_dataset,
+        ensure_party_name,
+    )
+    from common import PREFECTURES, add_generated_at, source_prefecture  # type: ignore
+    from output_writer import content_digest, encode_json  # type: ignore
+    from serve import ROOT, DashboardRequestHandler, DashboardServer, accepted_codings, accepts, etag_matches  # type: ignore
+    from sqlite_export import SQLITE_OUTPUT_PATH  # type: ignore
+else:
+    from .build_dashboard_data import (
+        build_products,
+        build_top_dashboard_payload,
+        build_vote_optimization_dataset,
+        build_win_rate_dataset,
+        ensure_party_name,
+    )
+    from .common import PREFECTURES, add_generated_at, source_prefecture
+    from .output_writer import content_digest, encode_json
+    from .serve import ROOT, DashboardRequestHandler, DashboardServer, accepted_codings, accepts, etag_matches
+    from .sqlite_export import SQLITE_OUTPUT_PATH
+
+API_PREFIX = "/api/"
+CACHE_SIZE = 512
+DATE_PATTERN = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+COMPENSATION_GROUPS = ("party", "year", "prefecture", "municipality")
+COMPENSATION_COLUMNS = ["party", "year", "prefecture", "municipality", "seat_count", "total_compensation"]
+
+
+class QueryError(ValueError):
+    """A query the API cannot answer; reported to the client as 400."""
+
+
+def split_values(values: List[str]) -> List[str]:
+    return [item.strip() for value in values for item in value.split(",") if item.strip()]
+
+
+def resolve_prefecture(value: str) -> str:
+    if value.isdigit() and 1 <= int(value) <= len(PREFECTURES):
+        return PREFECTURES[int(value) - 1]
+    if value in PREFECTURES:
+        return value
+    raise QueryError(f"unknown prefecture {value!r}")
+
+
+def date_bound(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    value = (params.get(name) or [""])[-1].strip()
+    if not value:
+        return None
+    if not DATE_PATTERN.match(value):
+        raise QueryError(f"{name} must be YYYY, YYYY-MM or YYYY-MM-DD")
+    parts = [int(part) for part in value.split("-")]
+    try:
+        date(*parts, *[1] * (3 - len(parts)))
+    except ValueError:
+        raise QueryError(f"{name} is not a valid date: {value!r}") from None
+    return value
+
+
+def int_param(params: Dict[str, List[str]], name: str, default: int) -> int:
+    value = (params.get(name) or [""])[-1].strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError(f"{name} must be an integer") from None
+
+
+def parse_filters(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Normalise the shared filter parameters into a hashable form."""
+    date_from, date_to = date_bound(params, "from"), date_bound(params, "to")
+    # ``to`` covers everything it is a prefix of, so from=2024-02-10&to=2024-02 is a valid range.
+    if date_from and date_to and date_from[: len(date_to)] > date_to:
+        raise QueryError("from is after to")
+    return {
+        "parties": tuple(sorted({ensure_party_name(value) for value in split_values(params.get("party", []))})),
+        "prefectures": tuple(sorted({resolve_prefecture(value) for value in split_values(params.get("prefecture", []))})),
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+
+def load_sqlite_tables(path: Path) -> Tuple[List[Dict[str, Any]], pd.DataFrame]:
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    try:
+        candidates = [dict(row) for row in connection.execute("SELECT * FROM candidates ORDER BY rowid")]
+        columns = ", ".join(f'"{column}"' for column in COMPENSATION_COLUMNS)
+        compensation = pd.read_sql_query(f"SELECT {columns} FROM compensation_municipality", connection)
+    finally:
+        connection.close()
+    return candidates, compensation
+
+
+def load_pipeline_tables() -> Tuple[List[Dict[str, Any]], pd.DataFrame]:
+    products = build_products(["candidates", "compensation"])
+    rows = products["compensation"].get("municipality_breakdown", [])
+    return products["candidates"], pd.DataFrame(rows, columns=COMPENSATION_COLUMNS)
+
+
+class QueryEngine:
+    """In-memory candidate and compensation tables with a response cache."""
+
+    def __init__(self, candidates: List[Dict[str, Any]], compensation: pd.DataFrame, cache_size: int = CACHE_SIZE):
+        self.candidates = candidates
+        self.frame = pd.DataFrame(
+            {
+                "party": pd.Categorical([ensure_party_name(row.get("party")) for row in candidates]),
+                "prefecture": pd.Categorical([source_prefecture(row.get("source_key")) for row in candidates]),
+                "election_date": [str(row.get("election_date") or "")[:10] for row in candidates],
+            }
+        )
+        self.compensation = compensation.assign(
+            year=compensation["year"].astype("int64"),
+            party=compensation["party"].astype("category"),
+            prefecture=compensation["prefecture"].astype("category"),
+        )
+        self.endpoints: Dict[str, Callable[[Dict[str, Any], Dict[str, List[str]]], Dict[str, Any]]] = {
+            "win_rate": self.win_rate,
+            "timeline": self.timeline,
+            "vote_optimization": self.vote_optimization,
+            "compensation": self.compensation_totals,
+            "meta": self.meta,
+        }
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # -- filtering ----------------------------------------------------------------------
+
+    def select(self, filters: Dict[str, Any], by_party: bool = True) -> List[Dict[str, Any]]:
+        """Candidates passing ``filters`` in their original order (which sets first-seen ordering)."""
+        mask = np.ones(len(self.frame), dtype=bool)
+        if by_party and filters["parties"]:
+            mask &= self.frame["party"].isin(filters["parties"]).to_numpy()
+        if filters["prefectures"]:
+            mask &= self.frame["prefecture"].isin(filters["prefectures"]).to_numpy()
+        dates = self.frame["election_date"]
+        if filters["date_from"]:
+            mask &= (dates >= filters["date_from"]).to_numpy()
+        if filters["date_to"]:
+            mask &= (dates.str.slice(0, len(filters["date_to"])) <= filters["date_to"]).to_numpy()
+        if filters["date_from"] or filters["date_to"]:
+            mask &= (dates != "").to_numpy()
+        if mask.all():
+            return self.candidates
+        return [self.candidates[position] for position in np.flatnonzero(mask)]
+
+    # -- endpoints ----------------------------------------------------------------------
+
+    def timeline(self, filters: Dict[str, Any], params: Dict[str, List[str]]) -> Dict[str, Any]:
+        payload = build_top_dashboard_payload(self.select(filters, by_party=False))
+        if filters["parties"]:
+            timeline = payload["timeline"]
+            keep = set(filters["parties"])
+            payload["timeline"] = dict(
+                timeline,
+                series=[series for series in timeline["series"] if series["name"] in keep],
+                parties=[party for party in timeline["parties"] if party in keep],
+                totals={party: value for party, value in timeline["totals"].items() if party in keep},
+                sparkline_values={
+                    party: values for party, values in timeline["sparkline_values"].items() if party in keep
+                },
+            )
+        return payload
+
+    def win_rate(self, filters: Dict[str, Any], params: Dict[str, List[str]]) -> Dict[str, Any]:
+        # The published file orders parties like the seat timeline of the same candidates.
+        party_order = self.timeline(dict(filters, parties=()), {})["timeline"].get("parties")
+        return build_win_rate_dataset(
+            self.select(filters), party_order, max_parties=int_param(params, "max_parties", 12)
+        )
+
+    def vote_optimization(self, filters: Dict[str, Any], params: Dict[str, List[str]]) -> Dict[str, Any]:
+        payload = build_vote_optimization_dataset(self.select(filters, by_party=False))
+        if filters["parties"]:
+            keep = set(filters["parties"])
+            elections = []
+            for election in payload["elections"]:
+                results = [result for result in election["party_results"] if result["party"] in keep]
+                if results:
+                    elections.append(dict(election, party_results=results))
+            payload = dict(
+                payload,
+                parties=[party for party in payload["parties"] if party["party"] in keep],
+                elections=elections,
+            )
+        return payload
+
+    def compensation_totals(self, filters: Dict[str, Any], params: Dict[str, List[str]]) -> Dict[str, Any]:
+        by = split_values(params.get("by", [])) or ["party", "year"]
+        unknown = [name for name in by if name not in COMPENSATION_GROUPS]
+        if unknown:
+            raise QueryError(f"by accepts {', '.join(COMPENSATION_GROUPS)}")
+        frame = self.compensation
+        mask = np.ones(len(frame), dtype=bool)
+        if filters["parties"]:
+            mask &= frame["party"].isin(filters["parties"]).to_numpy()
+        if filters["prefectures"]:
+            mask &= frame["prefecture"].isin(filters["prefectures"]).to_numpy()
+        if filters["date_from"]:
+            mask &= (frame["year"] >= int(filters["date_from"][:4])).to_numpy()
+        if filters["date_to"]:
+            mask &= (frame["year"] <= int(filters["date_to"][:4])).to_numpy()
+        frame = frame[mask]
+        by = list(dict.fromkeys(by))
+        grouped = (
+            frame.groupby(by, observed=True, sort=True)
+            .agg(
+                total_compensation=("total_compensation", "sum"),
+                seat_years=("seat_count", "sum"),
+                records=("total_compensation", "size"),
+            )
+            .reset_index()
+        )
+        return add_generated_at(
+            {
+                "by": by,
+                "total_compensation": float(frame["total_compensation"].sum()),
+                "rows": grouped.to_dict("records"),
+            }
+        )
+
+    def meta(self, filters: Dict[str, Any], params: Dict[str, List[str]]) -> Dict[str, Any]:
+        dates = self.frame.loc[self.frame["election_date"] != "", "election_date"]
+        return add_generated_at(
+            {
+                "candidates": len(self.candidates),
+                "compensation_rows": len(self.compensation),
+                "parties": sorted(party for party in self.frame["party"].cat.categories if party),
+                "prefectures": [prefecture for prefecture in PREFECTURES if prefecture in set(self.frame["prefecture"])],
+                "min_date": dates.min() if len(dates) else None,
+                "max_date": dates.max() if len(dates) else None,
+                "endpoints": sorted(self.endpoints),
+            }
+        )
+
+    # -- cached entry point ---------------------------------------------------------------
+
+    def query(self, endpoint: str, params: Dict[str, List[str]]) -> Tuple[bytes, str]:
+        """Return the encoded JSON response and its digest, from the cache when possible."""
+        if endpoint not in self.endpoints:
+            raise KeyError(endpoint)
+        filters = parse_filters(params)
+        extras = tuple(
+            (name, tuple(values)) for name, values in sorted(params.items()) if name not in {"party", "prefecture", "from", "to"}
+        )
+        key = (endpoint, tuple(filters.values()), extras)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        data = encode_json(self.endpoints[endpoint](filters, params))
+        result = (data, content_digest(data))
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+class QueryRequestHandler(DashboardRequestHandler):
+    engine: QueryEngine
+
+    def send_head(self):  # type: ignore[override]
+        url = urlsplit(self.path)
+        if not url.path.startswith(API_PREFIX):
+            return super().send_head()
+        endpoint = url.path[len(API_PREFIX) :].strip("/")
+        try:
+            data, digest = self.engine.query(endpoint, parse_qs(url.query))
+        except KeyError:
+            return self.send_json_error(HTTPStatus.NOT_FOUND, f"unknown endpoint {endpoint!r}")
+        except QueryError as error:
+            return self.send_json_error(HTTPStatus.BAD_REQUEST, str(error))
+
+        gzipped = accepts(accepted_codings(self.headers.get("Accept-Encoding")), "gzip")
+        etag = f'"{digest}-gzip"' if gzipped else f'"{digest}"'
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return None
+        if gzipped:
+            data = gzip.compress(data, compresslevel=6, mtime=0)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        return io.BytesIO(data)
+
+    def send_json_error(self, status: HTTPStatus, message: str) -> io.BytesIO:
+        data = encode_json({"error": message})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        return io.BytesIO(data)
+
+
+def load_engine(source: str = "auto", sqlite_path: Path = SQLITE_OUTPUT_PATH) -> QueryEngine:
+    started = time.perf_counter()
+    if source == "sqlite" or (source == "auto" and sqlite_path.exists()):
+        candidates, compensation = load_sqlite_tables(sqlite_path)
+        origin = sqlite_path.name
+    else:
+        candidates, compensation = load_pipeline_tables()
+        origin = "pipeline inputs"
+    engine = QueryEngine(candidates, compensation)
+    print(
+        f"Loaded {len(candidates):,} candidates and {len(compensation):,} compensation rows "
+        f"from {origin} ({time.perf_counter() - started:.2f}s)"
+    )
+    return engine
+
+
+def serve(engine: QueryEngine, bind: str = "127.0.0.1", port: int = 8000, directory: Path = ROOT) -> None:
+    handler = partial(type("BoundQueryRequestHandler", (QueryRequestHandler,), {"engine": engine}), directory=str(directory))
+    with DashboardServer((bind, port), handler) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving {directory} with the query API at http://{host}:{port}{API_PREFIX}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Stopped.")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve filtered dashboard aggregates over HTTP.")
+    parser.add_argument("port", nargs="?", type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument("--bind", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+    parser.add_argument(
+        "--source",
+        choices=("auto", "sqlite", "pipeline"),
+        default="auto",
+        help="read data/dashboard.sqlite or the pipeline inputs (default: the SQLite file when it exists)",
+    )
+    parser.add_argument("--directory", type=Path, default=ROOT, help="directory for static files (default: the dashboard root)")
+    args = parser.parse_args(argv)
+    serve(load_engine(args.source), args.bind, args.port, args.directory.resolve())
+
+
+if __name__ == "__main__":
+    main()
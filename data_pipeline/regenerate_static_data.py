@@ -1,6 +1,7 @@
+import argparse
 import sqlite3
 from pathlib import Path
-from typing import Union
+from typing import List, Optional, Union
 
 import pandas as pd
 
@@ -8,6 +9,8 @@ ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = ROOT / "data"
 BASE_DB = DATA_DIR / "election_base.db"
 DETAILS_DB = DATA_DIR / "election_details.db"
+ELECTION_SUMMARY_CSV = DATA_DIR / "election_summary.csv"
+CANDIDATE_DETAILS_CSV = DATA_DIR / "candidate_details.csv.gz"
 
 
 def _decode_text(value: Union[bytes, bytearray, str]):
@@ -31,41 +34,66 @@ def read_table(db_path: Path, query: str) -> pd.DataFrame:
     return df
 
 
-base_df = read_table(BASE_DB, "SELECT * FROM election_data")
-base_df = base_df.rename(
-    columns={
-        base_df.columns[0]: "election_name",
-        base_df.columns[1]: "notice_date",
-        base_df.columns[2]: "election_day",
-        base_df.columns[3]: "seats",
-        base_df.columns[4]: "candidate_count",
-        base_df.columns[5]: "registered_voters",
-        base_df.columns[6]: "note",
-    }
-)
-base_df.to_csv(DATA_DIR / "election_summary.csv", index=False, encoding="utf-8")
-
-detail_df = read_table(DETAILS_DB, "SELECT * FROM links_table")
-detail_columns = list(detail_df.columns)
-detail_df = detail_df.rename(
-    columns={
-        detail_columns[0]: "candidate_id",
-        detail_columns[1]: "name",
-        detail_columns[2]: "kana",
-        detail_columns[3]: "age",
-        detail_columns[4]: "gender",
-        detail_columns[5]: "incumbent_status",
-        detail_columns[6]: "profession",
-        detail_columns[7]: "party",
-        detail_columns[8]: "votes",
-        detail_columns[9]: "outcome",
-        detail_columns[10]: "image_file",
-        detail_columns[11]: "source_file",
-    }
-)
-detail_df.to_csv(
-    DATA_DIR / "candidate_details.csv.gz",
-    index=False,
-    encoding="utf-8",
-    compression="gzip",
-)
+def export_election_summary() -> None:
+    base_df = read_table(BASE_DB, "SELECT * FROM election_data")
+    base_df = base_df.rename(
+        columns={
+            base_df.columns[0]: "election_name",
+            base_df.columns[1]: "notice_date",
+            base_df.columns[2]: "election_day",
+            base_df.columns[3]: "seats",
+            base_df.columns[4]: "candidate_count",
+            base_df.columns[5]: "registered_voters",
+            base_df.columns[6]: "note",
+        }
+    )
+    base_df.to_csv(ELECTION_SUMMARY_CSV, index=False, encoding="utf-8")
+
+
+def export_candidate_details() -> None:
+    detail_df = read_table(DETAILS_DB, "SELECT * FROM links_table")
+    detail_columns = list(detail_df.columns)
+    detail_df = detail_df.rename(
+        columns={
+            detail_columns[0]: "candidate_id",
+            detail_columns[1]: "name",
+            detail_columns[2]: "kana",
+            detail_columns[3]: "age",
+            detail_columns[4]: "gender",
+            detail_columns[5]: "incumbent_status",
+            detail_columns[6]: "profession",
+            detail_columns[7]: "party",
+            detail_columns[8]: "votes",
+            detail_columns[9]: "outcome",
+            detail_columns[10]: "image_file",
+            detail_columns[11]: "source_file",
+        }
+    )
+    detail_df.to_csv(
+        CANDIDATE_DETAILS_CSV,
+        index=False,
+        encoding="utf-8",
+        # A fixed gzip mtime keeps the file identical when the database is unchanged.
+        compression={"method": "gzip", "mtime": 0},
+    )
+
+
+EXPORTS = {
+    "election_summary": export_election_summary,
+    "candidate_details": export_candidate_details,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export the scraped databases to the pipeline's CSV inputs.")
+    parser.add_argument("exports", nargs="*", metavar="EXPORT", help=f"{', '.join(EXPORTS)} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.exports if name not in EXPORTS]
+    if unknown:
+        parser.error(f"unknown export {unknown[0]!r}; choose from {', '.join(EXPORTS)}")
+    for name in args.exports or EXPORTS:
+        EXPORTS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,173 @@
-"""Dashboard data regeneration orchestrator."""
+"""Dashboard data regeneration orchestrator.
+
+Each stage runs as its own process and declares the files it reads and
+writes. ``stage_graph`` starts a stage once the stages writing its inputs are
+done. The two database exports run side by side. The seat-term table is built
+once from their CSVs, and then the compensation CSVs and the dashboard build,
+which both read it, run side by side.
+The first failing stage stops the others. Finished stages are recorded in
+``data/.cache/pipeline_state.json`` with the size and mtime of their inputs,
+and ``--resume`` skips them on the next run while their inputs are unchanged
+and their outputs still exist.
+"""
 
 from __future__ import annotations
 
+import argparse
+import json
+import os
 import subprocess
 import sys
+import threading
+import time
+from functools import partial
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+if __package__ in {None, ""}:
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from stage_graph import Stage, StageError, run_stages, stage_dependencies, stage_order  # type: ignore
+else:
+    from .stage_graph import Stage, StageError, run_stages, stage_dependencies, stage_order
 
 
 PIPELINE_DIR = Path(__file__).resolve().parent
 ROOT = PIPELINE_DIR.parent
 PROJECT_PARENT = ROOT.parent
 DATA_DIR = ROOT / "data"
-INTERMEDIATE_PATHS = [
-    DATA_DIR / "election_summary.csv",
-    DATA_DIR / "candidate_details.csv.gz",
+STATE_PATH = DATA_DIR / ".cache" / "pipeline_state.json"
+BASE_DB = DATA_DIR / "election_base.db"
+DETAILS_DB = DATA_DIR / "election_details.db"
+ELECTION_SUMMARY_CSV = DATA_DIR / "election_summary.csv"
+CANDIDATE_DETAILS_CSV = DATA_DIR / "candidate_details.csv.gz"
+COMPENSATION_CSV = DATA_DIR / "SeatsAndCompensation.csv"
+SEAT_TERMS_CACHE = DATA_DIR / ".cache" / "seat_terms.json.gz"
+COMPENSATION_OUTPUTS = [
     DATA_DIR / "party_compensation_summary_2020.csv",
     DATA_DIR / "party_compensation_yearly_2020.csv",
     DATA_DIR / "party_compensation_municipal_2020.csv",
 ]
+INTERMEDIATE_PATHS = [ELECTION_SUMMARY_CSV, CANDIDATE_DETAILS_CSV, *COMPENSATION_OUTPUTS]
+
+# stage -> (module run with ``python -m``, its arguments, input files, output files)
+STAGES = {
+    "export_election_summary": (
+        "regenerate_static_data",
+        ["election_summary"],
+        [BASE_DB],
+        [ELECTION_SUMMARY_CSV],
+    ),
+    "export_candidate_details": (
+        "regenerate_static_data",
+        ["candidate_details"],
+        [DETAILS_DB],
+        [CANDIDATE_DETAILS_CSV],
+    ),
+    "build_seat_terms": (
+        "seat_terms",
+        [],
+        [ELECTION_SUMMARY_CSV, CANDIDATE_DETAILS_CSV],
+        [SEAT_TERMS_CACHE],
+    ),
+    "generate_compensation_data": (
+        "generate_compensation_data",
+        [],
+        [SEAT_TERMS_CACHE, COMPENSATION_CSV],
+        COMPENSATION_OUTPUTS,
+    ),
+    "build_dashboard_data": (
+        "build_dashboard_data",
+        ["--release"],
+        [ELECTION_SUMMARY_CSV, CANDIDATE_DETAILS_CSV, SEAT_TERMS_CACHE, COMPENSATION_CSV],
+        [DATA_DIR / "manifest.json"],
+    ),
+}
+
+_processes: Set[subprocess.Popen] = set()
+_processes_lock = threading.Lock()
+
+
+def log(message: str) -> None:
+    print(f"[pipeline] {message}", flush=True)
 
 
 def run_step(description: str, command: list[str]) -> None:
-    print(f"[pipeline] start: {description}")
-    process = subprocess.run(command, cwd=PROJECT_PARENT, check=False)
-    if process.returncode != 0:
-        print(f"[pipeline] failed: {description} (exit code {process.returncode})")
-        raise SystemExit(process.returncode)
-    print(f"[pipeline] done : {description}")
+    process = subprocess.Popen(command, cwd=PROJECT_PARENT)
+    with _processes_lock:
+        _processes.add(process)
+    try:
+        returncode = process.wait()
+    finally:
+        with _processes_lock:
+            _processes.discard(process)
+    if returncode != 0:
+        raise RuntimeError(f"{description} exited with code {returncode}")
+
+
+def stop_running_steps() -> None:
+    with _processes_lock:
+        for process in _processes:
+            process.terminate()
+
+
+def input_stamps(paths: Iterable[Path]) -> Dict[str, Optional[List[int]]]:
+    stamps: Dict[str, Optional[List[int]]] = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            stamps[path.name] = None
+        else:
+            stamps[path.name] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+
+def load_state() -> Dict[str, dict]:
+    try:
+        state = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state.get("completed", {}) if isinstance(state, dict) else {}
+
+
+def save_state(completed: Dict[str, dict]) -> None:
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temporary = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    temporary.write_text(json.dumps({"completed": completed}, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(temporary, STATE_PATH)
+
+
+def resumable_stages(stages: Dict[str, Stage], recorded: Dict[str, dict]) -> List[str]:
+    """Recorded stages whose inputs are unchanged, outputs exist and upstream stages are resumable too."""
+    dependencies = stage_dependencies(stages)
+    resumable: List[str] = []
+    for name in stage_order(dependencies):
+        inputs, outputs, _ = stages[name]
+        if (
+            name in recorded
+            and recorded[name] == input_stamps(inputs)
+            and all(path.exists() for path in outputs)
+            and dependencies[name] <= set(resumable)
+        ):
+            resumable.append(name)
+    return resumable
+
+
+def pipeline_stages(completed: Dict[str, dict]) -> Dict[str, Stage]:
+    lock = threading.Lock()
+
+    def run_stage(name: str, command: List[str], inputs: List[Path]) -> None:
+        stamps = input_stamps(inputs)
+        run_step(name, command)
+        with lock:
+            completed[name] = stamps
+            save_state(completed)
+
+    stages: Dict[str, Stage] = {}
+    for name, (module, arguments, inputs, outputs) in STAGES.items():
+        command = [sys.executable, "-m", f"election_dashboard.data_pipeline.{module}", *arguments]
+        stages[name] = (tuple(inputs), tuple(outputs), partial(run_stage, name, command, inputs))
+    return stages
 
 
 def cleanup_intermediate_files() -> None:
@@ -43,25 +184,37 @@ def cleanup_intermediate_files() -> None:
         print(f"[pipeline] removed intermediates: {', '.join(removed)}")
 
 
-def main() -> None:
-    steps = [
-        (
-            "regenerate_static_data",
-            [sys.executable, "-m", "election_dashboard.data_pipeline.regenerate_static_data"],
-        ),
-        (
-            "generate_compensation_data",
-            [sys.executable, "-m", "election_dashboard.data_pipeline.generate_compensation_data"],
-        ),
-        (
-            "build_dashboard_data",
-            [sys.executable, "-m", "election_dashboard.data_pipeline.build_dashboard_data"],
-        ),
-    ]
-    for description, command in steps:
-        run_step(description, command)
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Regenerate the dashboard data, running independent stages in parallel."
+    )
+    parser.add_argument("--jobs", type=int, default=0, help="stages run at once (default: 0 = all cores)")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the stages the last failed run finished, while their inputs and outputs are unchanged",
+    )
+    args = parser.parse_args(argv)
+
+    recorded = load_state() if args.resume else {}
+    completed: Dict[str, dict] = {}
+    stages = pipeline_stages(completed)
+    skipped = resumable_stages(stages, recorded)
+    for name in skipped:
+        completed[name] = recorded[name]
+        log(f"skip : {name} (finished in the previous run)")
+
+    started = time.perf_counter()
+    try:
+        run_stages(stages, args.jobs or os.cpu_count() or 1, skipped, stop_running_steps, log)
+    except StageError as error:
+        log(f"stopped: {error.stage} failed; finished before it: {', '.join(error.completed) or 'none'}")
+        log("rerun with --resume to continue after the finished stages")
+        raise SystemExit(1) from None
+    if STATE_PATH.exists():
+        STATE_PATH.unlink()
     cleanup_intermediate_files()
-    print("[pipeline] all steps completed successfully")
+    log(f"all steps completed successfully ({time.perf_counter() - started:.2f}s)")
 
 
 if __name__ == "__main__":
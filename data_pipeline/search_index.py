@@ -0,0 +1,87 @@
+"""Inverted n-gram index over candidate names, kana, parties and election keys.
+
+Every indexed value is folded with ``normalise_search_text`` and split into
+overlapping bigrams plus its final character, so any substring query can be
+answered from the index alone: one-character queries take the range of terms
+starting with that character, longer queries intersect the postings of their
+bigrams. Terms are sorted by UTF-16 code units to match JavaScript string
+comparison, which lets the browser binary-search them directly.
+
+Row ids are positions in the index's own ``candidates`` table, which holds
+only the fields the search page shows and charts. The page answers every
+query from this one file and never loads candidate_details.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from common import add_generated_at, normalise_search_text  # type: ignore
+    from output_writer import encode_columnar_table  # type: ignore
+else:
+    from .common import add_generated_at, normalise_search_text
+    from .output_writer import encode_columnar_table
+
+SEARCH_INDEX_VERSION = 2
+SEARCH_FIELDS = ("name", "kana", "party", "source_key")
+DISPLAY_FIELDS = ("candidate_id", "name", "kana", "age", "gender", "party", "outcome", "source_key", "source_file")
+NGRAM_SIZE = 2
+
+
+def search_terms(value: Any) -> Set[str]:
+    text = normalise_search_text(value)
+    if not text:
+        return set()
+    terms = {text[index : index + NGRAM_SIZE] for index in range(max(len(text) - NGRAM_SIZE + 1, 0))}
+    terms.add(text[-1])
+    return terms
+
+
+def utf16_sort_key(term: str) -> bytes:
+    return term.encode("utf-16-be")
+
+
+def build_search_index(candidates: List[Dict[str, Any]], fields: Iterable[str] = SEARCH_FIELDS) -> Dict[str, Any]:
+    """Return the index payload; row ids are positions in its ``candidates`` table.
+
+    ``offsets[i]:offsets[i + 1]`` slices ``postings`` for ``terms[i]``; each
+    slice holds ascending row ids stored as differences from the previous id.
+    """
+    fields = tuple(fields)
+    postings: Dict[str, List[int]] = {}
+    for row_id, candidate in enumerate(candidates):
+        terms: Set[str] = set()
+        for field in fields:
+            terms.update(search_terms(candidate.get(field)))
+        for term in terms:
+            postings.setdefault(term, []).append(row_id)
+
+    terms = sorted(postings, key=utf16_sort_key)
+    offsets = [0]
+    flat: List[int] = []
+    for term in terms:
+        previous = 0
+        for row_id in postings[term]:
+            flat.append(row_id - previous)
+            previous = row_id
+        offsets.append(len(flat))
+
+    return add_generated_at(
+        {
+            "schema_version": SEARCH_INDEX_VERSION,
+            "fields": list(fields),
+            "ngram": NGRAM_SIZE,
+            "rows": len(candidates),
+            "terms": terms,
+            "offsets": offsets,
+            "postings": flat,
+            "candidates": encode_columnar_table(
+                [{field: candidate.get(field) for field in DISPLAY_FIELDS} for candidate in candidates]
+            ),
+        }
+    )
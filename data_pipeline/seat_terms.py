@@ -0,0 +1,161 @@
+"""The seat-term table shared by the seat timeline and the compensation estimate.
+
+A term is the seats one party won in one election, held from election day
+until the next election of the same ``source_key`` (the same council or
+office). The last election of a ``source_key`` has no successor yet, so its
+term ends ``TERM_YEARS`` later. ``end_reason`` records which of the two rules
+set ``term_end``. Each row carries the ``source_key``, the prefecture and
+municipality named by it, the party, the seat count, the term dates and
+``first_seen``, the position of the election's first winning candidate.
+Rows are in election date order, and the parties of one election keep the
+order of their first winner.
+
+``build_party_timeline`` sweeps these rows for the seat timeline, and
+``generate_compensation_data`` prices them month by month, so both see the
+same term boundaries. ``load_seat_terms`` keeps the table in
+``data/.cache/seat_terms.json.gz`` under a hash of the election summary and
+candidate CSV contents, and rebuilds it only when those change.
+``run_pipeline`` runs this module as its own stage before both consumers. The
+SQLite backend reads ``election_details.db`` instead of the CSVs, so it builds
+the same rows in memory with ``build_seat_terms``.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from common import TERM_YEARS, add_years_safe  # type: ignore
+    from generate_compensation_data import CACHE_DIR, DATA_DIR, parse_municipality  # type: ignore
+else:
+    from .common import TERM_YEARS, add_years_safe
+    from .generate_compensation_data import CACHE_DIR, DATA_DIR, parse_municipality
+
+# The build_dashboard_data inputs. That module imports this one, so the paths are not taken from it.
+ELECTION_SUMMARY_PATH = DATA_DIR / "election_summary.csv"
+CANDIDATE_DETAILS_PATH = DATA_DIR / "candidate_details.csv.gz"
+
+SEAT_TERMS_VERSION = 1
+SEAT_TERMS_PATH = CACHE_DIR / "seat_terms.json.gz"
+
+END_NEXT_ELECTION = "next_election"
+END_TERM_YEARS = "term_years"
+
+
+def build_seat_terms(events: List[Dict[str, Any]], term_years: int = TERM_YEARS) -> List[Dict[str, Any]]:
+    """One row per party and election from ``build_election_events`` style events."""
+    dates_by_key: Dict[str, List[Any]] = {}
+    for event in events:
+        dates_by_key.setdefault(event["key"], []).append(event["date"].date())
+    next_dates: Dict[tuple, Any] = {}
+    for key, dates in dates_by_key.items():
+        dates.sort()
+        for current, following in zip(dates, dates[1:]):
+            next_dates[(key, current)] = following
+
+    terms: List[Dict[str, Any]] = []
+    for event in sorted(events, key=lambda item: item["date"]):
+        start = event["date"].date()
+        next_date = next_dates.get((event["key"], start))
+        if next_date:
+            end, reason = next_date, END_NEXT_ELECTION
+        else:
+            end, reason = add_years_safe(start, term_years), END_TERM_YEARS
+        prefecture, municipality = parse_municipality(event["key"]) or (None, None)
+        for party, seats in event["winners"].items():
+            terms.append(
+                {
+                    "source_key": event["key"],
+                    "prefecture": prefecture,
+                    "municipality": municipality,
+                    "party": party,
+                    "seats": seats,
+                    "term_start": start.isoformat(),
+                    "term_end": end.isoformat(),
+                    "end_reason": reason,
+                    "first_seen": event["first_seen"],
+                }
+            )
+    return terms
+
+
+def seat_terms_cache_key() -> str:
+    # Hash the CSV text, not the gzip bytes: the gzip header carries the export time.
+    digest = hashlib.sha256()
+    for path in (ELECTION_SUMMARY_PATH, CANDIDATE_DETAILS_PATH):
+        with (gzip.open(path, "rb") if path.suffix == ".gz" else path.open("rb")) as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+    return f"{digest.hexdigest()}:{TERM_YEARS}:{SEAT_TERMS_VERSION}"
+
+
+def read_cached_terms(cache_key: str) -> Optional[List[Dict[str, Any]]]:
+    try:
+        with gzip.open(SEAT_TERMS_PATH, "rt", encoding="utf-8") as handle:
+            cached = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if isinstance(cached, dict) and cached.get("cache_key") == cache_key:
+        return cached.get("terms")
+    return None
+
+
+def write_cached_terms(cache_key: str, terms: List[Dict[str, Any]]) -> None:
+    SEAT_TERMS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temporary = SEAT_TERMS_PATH.with_name(f"{SEAT_TERMS_PATH.name}.{os.getpid()}.tmp")
+    text = json.dumps({"cache_key": cache_key, "terms": terms}, ensure_ascii=False, separators=(",", ":"))
+    temporary.write_bytes(gzip.compress(text.encode("utf-8"), mtime=0))
+    os.replace(temporary, SEAT_TERMS_PATH)
+
+
+def load_candidate_events() -> List[Dict[str, Any]]:
+    # Imported here: build_dashboard_data passes its own events in, and run as a script it is ``__main__``.
+    if __package__ in {None, ""}:
+        from build_dashboard_data import (  # type: ignore
+            build_election_events,
+            build_summary_index,
+            load_candidate_details,
+            load_election_summary,
+        )
+    else:
+        from .build_dashboard_data import (
+            build_election_events,
+            build_summary_index,
+            load_candidate_details,
+            load_election_summary,
+        )
+    candidates = load_candidate_details(build_summary_index(load_election_summary()))
+    return build_election_events(candidates)[0]
+
+
+def load_seat_terms(election_events: Optional[Callable[[], List[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+    """Return the cached table, rebuilding it from ``election_events()`` (default: the CSVs) when stale."""
+    cache_key = seat_terms_cache_key()
+    terms = read_cached_terms(cache_key)
+    if terms is None:
+        terms = build_seat_terms((election_events or load_candidate_events)())
+        write_cached_terms(cache_key, terms)
+    return terms
+
+
+def main() -> None:
+    cache_key = seat_terms_cache_key()
+    if read_cached_terms(cache_key) is not None:
+        print(f"[seat_terms] unchanged: {SEAT_TERMS_PATH.name}")
+        return
+    terms = build_seat_terms(load_candidate_events())
+    write_cached_terms(cache_key, terms)
+    renewed = sum(1 for term in terms if term["end_reason"] == END_NEXT_ELECTION)
+    print(f"[seat_terms] wrote {len(terms)} terms to {SEAT_TERMS_PATH.name} ({renewed} ended by a later election)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Local static server for the dashboard that understands the precompressed outputs.
+
+``python -m http.server`` hands ``*.json.gz`` to the browser as opaque
+``application/gzip`` blobs, so every fetch is inflated in JavaScript and
+downloaded again in full on reload. This server sends them as the JSON they
+contain, with ``Content-Encoding: gzip``, so the browser inflates them
+natively. When the build wrote brotli or zstd siblings (``--compression
+max``) and the client accepts them, those are sent instead. A request for
+``name.json`` is answered from ``name.json.gz`` when only the compressed file
+exists.
+
+Every response carries a strong ``ETag`` built from the sha256 of the decoded
+content, the same digest ``data/manifest.json`` records. It also answers
+``If-None-Match``/``If-Modified-Since`` with 304 and single ``bytes=``
+ranges with 206. Content-hashed files are marked immutable. Each request runs
+on its own thread.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import io
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from output_writer import HASH_LENGTH, content_digest  # type: ignore
+else:
+    from .output_writer import HASH_LENGTH, content_digest
+
+ROOT = Path(__file__).resolve().parent.parent
+HASHED_NAME_PATTERN = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}\.")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Inner extensions of ``*.gz`` files that are served with Content-Encoding.
+ENCODED_CONTENT_TYPES = {
+    ".json": "application/json; charset=utf-8",
+    ".topojson": "application/json; charset=utf-8",
+    ".csv": "text/csv; charset=utf-8",
+    ".bin": "application/octet-stream",
+}
+# Content codings of the sibling files written next to ``*.gz`` outputs, in order of preference.
+VARIANT_CODINGS = {"br": ".br", "zstd": ".zst"}
+
+
+class FileDigests:
+    """sha256 of each file's decoded content, recomputed only when the file changes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cache: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+
+    def get(self, path: Path, data: bytes, encoded: bool, stamp: Tuple[int, int]) -> str:
+        with self._lock:
+            cached = self._cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        digest = content_digest(gzip.decompress(data) if encoded else data)
+        with self._lock:
+            self._cache[path] = (stamp, digest)
+        return digest
+
+
+def accepted_codings(header: Optional[str]) -> Dict[str, float]:
+    codings: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        match = re.fullmatch(r"\s*q=([0-9.]+)\s*", params)
+        try:
+            quality = float(match.group(1)) if match else 1.0
+        except ValueError:
+            quality = 0.0
+        coding = coding.strip().lower()
+        codings["gzip" if coding == "x-gzip" else coding] = quality
+    return codings
+
+
+def accepts(codings: Dict[str, float], coding: str) -> bool:
+    return codings.get(coding, codings.get("*", 0.0)) > 0
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored.
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def parse_range(header: str, length: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive byte span of a single range, ``(-1, -1)`` if unsatisfiable, or ``None`` to ignore it."""
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), length - 1) if last else length - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(length - int(last), 0), length - 1
+        if int(last) == 0:
+            return (-1, -1)
+    if start >= length:
+        return (-1, -1)
+    return start, end
+
+
+class DashboardRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    digests = FileDigests()
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        ".js": "text/javascript",
+        ".mjs": "text/javascript",
+        ".json": "application/json",
+    }
+
+    def send_head(self):  # type: ignore[override]
+        url_path = urlsplit(self.path).path
+        path = Path(self.translate_path(self.path))
+        if path.is_dir():
+            if not url_path.endswith("/") or not (path / "index.html").is_file():
+                return super().send_head()
+            path = path / "index.html"
+        if not path.is_file() and path.with_name(path.name + ".gz").is_file():
+            path = path.with_name(path.name + ".gz")
+        if not path.is_file():
+            return super().send_head()
+        try:
+            return self.send_file(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+    def send_file(self, path: Path) -> Optional[io.BytesIO]:
+        stat = path.stat()
+        data = path.read_bytes()
+        inner_type = ENCODED_CONTENT_TYPES.get(Path(path.stem).suffix) if path.suffix == ".gz" else None
+        encoded = inner_type is not None
+        digest = self.digests.get(path, data, encoded, (stat.st_mtime_ns, stat.st_size))
+        coding = self.choose_coding(path) if encoded else None
+        if coding in VARIANT_CODINGS:
+            data = path.with_suffix(VARIANT_CODINGS[coding]).read_bytes()
+        elif encoded and coding is None:
+            data = gzip.decompress(data)
+        etag = f'"{digest}-{coding}"' if coding else f'"{digest}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        headers: List[Tuple[str, str]] = [
+            ("ETag", etag),
+            ("Last-Modified", last_modified),
+            (
+                "Cache-Control",
+                IMMUTABLE_CACHE_CONTROL if HASHED_NAME_PATTERN.search(path.name) else REVALIDATE_CACHE_CONTROL,
+            ),
+            ("Accept-Ranges", "bytes"),
+        ]
+        if encoded:
+            headers.append(("Vary", "Accept-Encoding"))
+
+        if self.is_not_modified(etag, stat.st_mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return None
+
+        status = HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (if_range is None or if_range.strip() in {etag, last_modified}):
+            span = parse_range(range_header, len(data))
+            if span == (-1, -1):
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            if span is not None:
+                start, end = span
+                headers.append(("Content-Range", f"bytes {start}-{end}/{len(data)}"))
+                data = data[start : end + 1]
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        headers.append(("Content-Type", inner_type if encoded else self.guess_type(str(path))))
+        if coding:
+            headers.append(("Content-Encoding", coding))
+
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        return io.BytesIO(data)
+
+    def choose_coding(self, path: Path) -> Optional[str]:
+        """Pick the content coding for a ``*.gz`` file: a variant sibling, gzip itself, or ``None`` to inflate."""
+        codings = accepted_codings(self.headers.get("Accept-Encoding"))
+        options = [coding for coding in VARIANT_CODINGS if path.with_suffix(VARIANT_CODINGS[coding]).is_file()]
+        options.append("gzip")
+        options = [coding for coding in options if accepts(codings, coding)]
+        if not options:
+            return None
+        # Highest q-value wins; ties keep the order above.
+        return max(options, key=lambda coding: codings.get(coding, codings.get("*", 0.0)))
+
+    def is_not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(mtime) <= since
+        return False
+
+
+class DashboardServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(bind: str = "127.0.0.1", port: int = 8000, directory: Path = ROOT) -> None:
+    handler = partial(DashboardRequestHandler, directory=str(directory))
+    with DashboardServer((bind, port), handler) as server:
+        host, port = server.server_address[:2]
+        print(f"Serving {directory} at http://{host}:{port}/index.html")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Stopped.")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the dashboard with precompressed data and caching headers.")
+    parser.add_argument("port", nargs="?", type=int, default=8000, help="port to listen on (default: 8000)")
+    parser.add_argument("--bind", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+    parser.add_argument("--directory", type=Path, default=ROOT, help="directory to serve (default: the dashboard root)")
+    args = parser.parse_args(argv)
+    serve(args.bind, args.port, args.directory.resolve())
+
+
+if __name__ == "__main__":
+    main()
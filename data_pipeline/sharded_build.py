@@ -0,0 +1,161 @@
+"""Prefecture-sharded parallel build of the dashboard aggregates.
+
+Candidates are partitioned by the prefecture prefix of their ``source_key`` so
+that every election and every municipality term lives in exactly one shard.
+Worker processes (spawned, never forked, as the caller may be running other
+threads) return plain-dict partial states which are merged in shard order and
+re-ranked by original row position, so the result matches the
+single-process build regardless of worker count or completion order.
+
+``top_dashboard`` is not sharded: since the seat timeline became a sweep over
+the ``seat_terms`` table it costs less than shipping its state back from the
+workers, so the caller builds it in the main process and passes its party
+order in for ``win_rate``.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    CURRENT_DIR = Path(__file__).resolve().parent
+    sys.path.insert(0, str(CURRENT_DIR))
+    from build_dashboard_data import (  # type: ignore
+        SHARDED_PRODUCTS,
+        build_win_rate_dataset_from_state,
+        collect_election_results_state,
+        collect_win_rate_state,
+        merge_election_results_states,
+        merge_win_rate_states,
+        normalise_string,
+    )
+    from common import source_prefecture  # type: ignore
+    from generate_compensation_data import (  # type: ignore
+        build_annual_records,
+        build_term_records,
+        join_compensation_reference,
+        load_compensation_index,
+        load_seat_terms,
+        seat_terms_frame,
+        summarise_party_compensation,
+        summarise_unmatched_terms,
+    )
+else:
+    from .build_dashboard_data import (
+        SHARDED_PRODUCTS,
+        build_win_rate_dataset_from_state,
+        collect_election_results_state,
+        collect_win_rate_state,
+        merge_election_results_states,
+        merge_win_rate_states,
+        normalise_string,
+    )
+    from .common import source_prefecture
+    from .generate_compensation_data import (
+        build_annual_records,
+        build_term_records,
+        join_compensation_reference,
+        load_compensation_index,
+        load_seat_terms,
+        seat_terms_frame,
+        summarise_party_compensation,
+        summarise_unmatched_terms,
+    )
+
+
+def resolve_workers(workers: int) -> int:
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def shard_key(candidate: Dict[str, Any]) -> str:
+    return source_prefecture(
+        normalise_string(candidate.get("source_key")) or normalise_string(candidate.get("source_file"))
+    )
+
+
+def partition_candidates(candidates: List[Dict[str, Any]]) -> List[Tuple[str, List[int], List[Dict[str, Any]]]]:
+    shards: Dict[str, Tuple[List[int], List[Dict[str, Any]]]] = {}
+    for position, candidate in enumerate(candidates):
+        indices, rows = shards.setdefault(shard_key(candidate), ([], []))
+        indices.append(position)
+        rows.append(candidate)
+    return [(key, indices, rows) for key, (indices, rows) in sorted(shards.items())]
+
+
+def build_candidate_shard(
+    shard: Tuple[str, List[int], List[Dict[str, Any]]],
+    products: Iterable[str] = SHARDED_PRODUCTS,
+) -> Dict[str, Any]:
+    _, indices, rows = shard
+    states: Dict[str, Any] = {}
+    if "win_rate" in products:
+        states["win_rate"] = collect_win_rate_state(rows, indices)
+    if "election_results" in products:
+        states["election_results"] = collect_election_results_state(rows, indices)
+    return states
+
+
+def build_compensation_shard(shard: Tuple[int, Any]) -> Tuple[int, list]:
+    first_position, matched_terms = shard
+    return first_position, build_annual_records(build_term_records(matched_terms))
+
+
+def partition_seat_terms(matched_terms) -> List[Tuple[int, Any]]:
+    return [
+        (int(frame.index[0]), frame)
+        for _, frame in matched_terms.groupby("prefecture", sort=False)
+    ]
+
+
+def build_sharded_aggregates(
+    candidates: List[Dict[str, Any]],
+    workers: int = 0,
+    products: Optional[Iterable[str]] = None,
+    party_order: Optional[List[str]] = None,
+    seat_term_rows: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    workers = resolve_workers(workers)
+    products = tuple(SHARDED_PRODUCTS if products is None else products)
+    candidate_products = [name for name in products if name != "compensation"]
+    candidate_shards = partition_candidates(candidates) if candidate_products else []
+    compensation_shards = []
+    if "compensation" in products:
+        seat_terms = load_seat_terms() if seat_term_rows is None else seat_terms_frame(seat_term_rows)
+        matched_terms, unmatched_terms = join_compensation_reference(seat_terms, load_compensation_index())
+        compensation_shards = partition_seat_terms(matched_terms)
+
+    # build_products runs this from a stage_graph thread while other threads build products; forking a
+    # multithreaded process can copy a lock another thread holds, so the workers are spawned instead.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        compensation_futures = executor.map(build_compensation_shard, compensation_shards)
+        candidate_states = list(
+            executor.map(build_candidate_shard, candidate_shards, [candidate_products] * len(candidate_shards))
+        )
+        compensation_parts = sorted(compensation_futures, key=lambda item: item[0])
+
+    results: Dict[str, Dict[str, Any]] = {}
+    if "compensation" in products:
+        annual_records: list = []
+        for _, records in compensation_parts:
+            annual_records.extend(records)
+        results["compensation"] = summarise_party_compensation(
+            annual_records, summarise_unmatched_terms(unmatched_terms)
+        )
+
+    if "win_rate" in products:
+        results["win_rate"] = build_win_rate_dataset_from_state(
+            merge_win_rate_states(state["win_rate"] for state in candidate_states), party_order
+        )
+    if "election_results" in products:
+        results["election_results"] = merge_election_results_states(
+            state["election_results"] for state in candidate_states
+        )
+    return results
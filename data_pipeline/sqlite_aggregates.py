@@ -0,0 +1,332 @@
+"""Push-down aggregation backend over the scraped ``election_details.db``.
+
+Instead of exporting ``links_table`` to CSV and loading every candidate as a
+Python dict, one ``GROUP BY source_file, party, outcome`` query lets SQLite
+count candidates and sum votes. Only the grouped rows, a few per party per
+election, reach Python. They are normalised (party names, winning outcomes,
+election keys and dates) and folded into the same partial states the
+candidate-based builders produce, so the finished datasets are identical.
+``MIN(rowid)`` stands in for the candidate row position that orders parties
+and elections.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from build_dashboard_data import (  # type: ignore
+        DATA_DIR,
+        SQLITE_BACKEND_PRODUCTS,
+        build_top_dashboard_payload_from_state,
+        build_win_rate_dataset_from_state,
+        collect_timeline_state,
+        ensure_party_name,
+        is_winning_outcome,
+        normalise_string,
+        resolve_election_date,
+        split_source_file,
+    )
+    from seat_terms import build_seat_terms  # type: ignore
+else:
+    from .build_dashboard_data import (
+        DATA_DIR,
+        SQLITE_BACKEND_PRODUCTS,
+        build_top_dashboard_payload_from_state,
+        build_win_rate_dataset_from_state,
+        collect_timeline_state,
+        ensure_party_name,
+        is_winning_outcome,
+        normalise_string,
+        resolve_election_date,
+        split_source_file,
+    )
+    from .seat_terms import build_seat_terms
+
+DETAILS_DB = DATA_DIR / "election_details.db"
+DETAILS_TABLE = "links_table"
+# links_table columns are positional; regenerate_static_data assigns the same names.
+PARTY_COLUMN_INDEX = 7
+VOTES_COLUMN_INDEX = 8
+OUTCOME_COLUMN_INDEX = 9
+SOURCE_COLUMN_INDEX = 11
+
+# Same rules as clean_numeric for plain decimal vote counts (thousands separators allowed).
+VOTES_TEXT = "TRIM(REPLACE(CAST({column} AS TEXT), ',', ''))"
+VOTES_NUMBER = """
+    CASE
+        WHEN typeof({column}) IN ('integer', 'real') THEN {column}
+        WHEN {text} <> '' AND {text} NOT GLOB '*[^0-9.]*' AND {text} GLOB '*[0-9]*'
+            AND {text} NOT GLOB '*.*.*' THEN CAST({text} AS REAL)
+    END
+"""
+VOTES_INTEGER = """
+    CASE
+        WHEN number IS NULL THEN NULL
+        WHEN ABS(number - ROUND(number)) < 1e-6 THEN CAST(ROUND(number) AS INTEGER)
+        ELSE CAST(number AS INTEGER)
+    END
+"""
+
+
+def decode_text(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        for encoding in ("utf-8", "cp932", "shift_jis"):
+            try:
+                return value.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def detail_columns(connection: sqlite3.Connection) -> Dict[str, str]:
+    names = [decode_text(row[1]) for row in connection.execute(f"PRAGMA table_info({DETAILS_TABLE})")]
+    if len(names) <= SOURCE_COLUMN_INDEX:
+        raise ValueError(f"{DETAILS_TABLE} has {len(names)} columns; expected at least {SOURCE_COLUMN_INDEX + 1}")
+    return {
+        "party": quote_identifier(names[PARTY_COLUMN_INDEX]),
+        "votes": quote_identifier(names[VOTES_COLUMN_INDEX]),
+        "outcome": quote_identifier(names[OUTCOME_COLUMN_INDEX]),
+        "source_file": quote_identifier(names[SOURCE_COLUMN_INDEX]),
+    }
+
+
+def query_candidate_groups(db_path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Return per ``(source_file, party, outcome)`` candidate and vote aggregates.
+
+    The scraped database is opened read-only and not indexed: the GROUP BY is
+    run once per build, and SQLite sorts it through a temporary B-tree at the
+    same cost as building an index first.
+    """
+    db_path = DETAILS_DB if db_path is None else Path(db_path)
+    if not db_path.exists():
+        raise FileNotFoundError(f"{db_path} was not found")
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    connection.text_factory = bytes
+    try:
+        columns = detail_columns(connection)
+        number = VOTES_NUMBER.format(column=columns["votes"], text=VOTES_TEXT.format(column=columns["votes"]))
+        query = f"""
+            SELECT source_file, party, outcome,
+                   COUNT(*), COUNT(votes), SUM(votes), MIN(votes), MAX(votes), MIN(position)
+            FROM (
+                SELECT source_file, party, outcome, position, {VOTES_INTEGER} AS votes
+                FROM (
+                    SELECT {columns['source_file']} AS source_file,
+                           {columns['party']} AS party,
+                           {columns['outcome']} AS outcome,
+                           rowid AS position,
+                           {number} AS number
+                    FROM {DETAILS_TABLE}
+                )
+            )
+            GROUP BY source_file, party, outcome
+        """
+        groups = []
+        for row in connection.execute(query):
+            source_file, party, outcome, count, vote_count, vote_sum, vote_min, vote_max, position = row
+            groups.append(
+                {
+                    "source_file": normalise_string(decode_text(source_file)),
+                    "party": ensure_party_name(decode_text(party)),
+                    "is_winner": is_winning_outcome(decode_text(outcome)),
+                    "candidates": count,
+                    "vote_count": vote_count,
+                    "vote_sum": vote_sum or 0,
+                    "vote_min": vote_min,
+                    "vote_max": vote_max,
+                    "first_seen": position,
+                }
+            )
+    finally:
+        connection.close()
+    groups.sort(key=lambda group: group["first_seen"])
+    return groups
+
+
+def attach_election(
+    groups: Iterable[Dict[str, Any]], summary_index: Dict[str, List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Add ``election_key`` and ``election_date`` exactly as load_candidate_details derives them."""
+    resolved: Dict[str, Tuple[str, Optional[datetime]]] = {}
+    result = []
+    for group in groups:
+        source_file = group["source_file"]
+        if source_file not in resolved:
+            election_key, date_code = split_source_file(source_file)
+            election_date = resolve_election_date(election_key, date_code, summary_index)
+            resolved[source_file] = (
+                election_key,
+                datetime(election_date.year, election_date.month, election_date.day) if election_date else None,
+            )
+        election_key, election_date = resolved[source_file]
+        result.append(
+            dict(group, election_key=election_key or source_file, source_key=election_key, election_date=election_date)
+        )
+    return result
+
+
+def _add_counts(entries: Dict[str, Dict[str, Any]], key: str, group: Dict[str, Any], **fields: Any) -> Dict[str, Any]:
+    entry = entries.get(key)
+    if entry is None:
+        entry = dict(fields, candidates=0, winners=0, first_seen=group["first_seen"])
+        entries[key] = entry
+    entry["candidates"] += group["candidates"]
+    if group["is_winner"]:
+        entry["winners"] += group["candidates"]
+    entry["first_seen"] = min(entry["first_seen"], group["first_seen"])
+    return entry
+
+
+def collect_win_rate_state_from_groups(groups: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary_totals: Dict[str, Dict[str, Any]] = {}
+    monthly_totals: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    election_points: Dict[str, Dict[str, Any]] = {}
+    for group in groups:
+        election_date = group["election_date"]
+        if election_date is None:
+            continue
+        party = group["party"]
+        _add_counts(summary_totals, party, group)
+        _add_counts(monthly_totals.setdefault(election_date.strftime("%Y-%m"), {}), party, group)
+        if not group["election_key"]:
+            continue
+        _add_counts(
+            election_points,
+            f"{party}::{group['election_key']}::{election_date.isoformat()}",
+            group,
+            party=party,
+            election_key=group["election_key"],
+            date=election_date.isoformat(),
+        )
+    ordered = lambda entries: dict(sorted(entries.items(), key=lambda item: item[1]["first_seen"]))  # noqa: E731
+    return {
+        "summary_totals": ordered(summary_totals),
+        "monthly_totals": monthly_totals,
+        "election_points": ordered(election_points),
+    }
+
+
+def collect_election_results_state_from_groups(groups: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    elections: Dict[str, Dict[str, Any]] = {}
+    for group in groups:
+        election_date = group["election_date"]
+        if not group["election_key"] or election_date is None:
+            continue
+        election_id = f"{group['election_key']}|{election_date.date().isoformat()}"
+        entry = elections.get(election_id)
+        if entry is None:
+            entry = {
+                "election_key": group["election_key"],
+                "election_date": election_date,
+                "total_candidates": 0,
+                "winner_count": 0,
+                "min_win_vote": None,
+                "max_lose_vote": None,
+                "missing_winner_votes": False,
+                "total_votes": 0,
+                "voted_candidates": 0,
+                "parties": {},
+                "first_seen": group["first_seen"],
+            }
+            elections[election_id] = entry
+        entry["first_seen"] = min(entry["first_seen"], group["first_seen"])
+        entry["total_candidates"] += group["candidates"]
+        entry["total_votes"] += group["vote_sum"]
+        entry["voted_candidates"] += group["vote_count"]
+
+        party_bucket = entry["parties"].get(group["party"])
+        if party_bucket is None:
+            party_bucket = {
+                "total_votes": 0,
+                "actual_winners": 0,
+                "winners": 0,
+                "candidates": 0,
+                "first_seen": group["first_seen"],
+            }
+            entry["parties"][group["party"]] = party_bucket
+        party_bucket["first_seen"] = min(party_bucket["first_seen"], group["first_seen"])
+        party_bucket["candidates"] += group["candidates"]
+        party_bucket["total_votes"] += group["vote_sum"]
+
+        if group["is_winner"]:
+            entry["winner_count"] += group["candidates"]
+            party_bucket["winners"] += group["candidates"]
+            if group["vote_count"] < group["candidates"]:
+                entry["missing_winner_votes"] = True
+            if group["vote_min"] is not None:
+                current_min = entry["min_win_vote"]
+                entry["min_win_vote"] = (
+                    group["vote_min"] if current_min is None else min(current_min, group["vote_min"])
+                )
+            party_bucket["actual_winners"] += group["vote_count"]
+        elif group["vote_max"] is not None:
+            current_max = entry["max_lose_vote"]
+            entry["max_lose_vote"] = group["vote_max"] if current_max is None else max(current_max, group["vote_max"])
+
+    for entry in elections.values():
+        parties = sorted(entry["parties"].items(), key=lambda item: item[1].pop("first_seen"))
+        entry["parties"] = dict(parties)
+    return dict(sorted(elections.items(), key=lambda item: item[1]["first_seen"]))
+
+
+def election_events_from_groups(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    events_map: Dict[str, Dict[str, Any]] = {}
+    for group in groups:
+        election_date = group["election_date"]
+        if not group["is_winner"] or election_date is None or not group["source_key"]:
+            continue
+        date_code = election_date.strftime("%Y%m%d")
+        event_key = f"{group['source_key']}|{date_code}"
+        event = events_map.get(event_key)
+        if event is None:
+            event = {
+                "key": group["source_key"],
+                "date": election_date,
+                "date_code": date_code,
+                "winners": {},
+                "first_seen": group["first_seen"],
+            }
+            events_map[event_key] = event
+        event["first_seen"] = min(event["first_seen"], group["first_seen"])
+        first_seen, count = event["winners"].get(group["party"], (group["first_seen"], 0))
+        event["winners"][group["party"]] = (min(first_seen, group["first_seen"]), count + group["candidates"])
+
+    events = []
+    for event in sorted(events_map.values(), key=lambda item: item["first_seen"]):
+        ranked = sorted(event["winners"].items(), key=lambda item: item[1][0])
+        events.append(dict(event, winners={party: count for party, (_, count) in ranked}))
+    events.sort(key=lambda item: item["date"])
+    return events
+
+
+def build_sqlite_aggregates(
+    summary_index: Dict[str, List[Dict[str, Any]]],
+    products: Optional[Iterable[str]] = None,
+    db_path: Optional[Path] = None,
+) -> Dict[str, Dict[str, Any]]:
+    products = tuple(SQLITE_BACKEND_PRODUCTS if products is None else products)
+    groups = attach_election(query_candidate_groups(db_path), summary_index)
+    results: Dict[str, Dict[str, Any]] = {}
+    if "top_dashboard" in products or "win_rate" in products:
+        terms = build_seat_terms(election_events_from_groups(groups))
+        results["top_dashboard"] = build_top_dashboard_payload_from_state(collect_timeline_state(terms))
+    if "win_rate" in products:
+        results["win_rate"] = build_win_rate_dataset_from_state(
+            collect_win_rate_state_from_groups(groups),
+            results["top_dashboard"]["timeline"].get("parties"),
+        )
+    if "election_results" in products:
+        results["election_results"] = collect_election_results_state_from_groups(groups)
+    return results
@@ -0,0 +1,242 @@
+"""Normalised SQLite copy of the dashboard products for ad-hoc analysis.
+
+``dashboard.sqlite`` holds the elections, candidates, seat terms, compensation
+rows and derived aggregates as plain tables with indexes on the usual filter
+columns (party, source_key, election date, prefecture). The file is rebuilt
+from scratch in a temporary path with one bulk transaction and swapped into
+place, so readers never see a half-written database.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+if __package__ in {None, ""}:
+    import sys
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from common import source_prefecture  # type: ignore
+    from election_facts import build_election_facts_payload  # type: ignore
+    from output_writer import DATA_DIR  # type: ignore
+else:
+    from .common import source_prefecture
+    from .election_facts import build_election_facts_payload
+    from .output_writer import DATA_DIR
+
+SQLITE_OUTPUT_PATH = DATA_DIR / "dashboard.sqlite"
+
+# Products the export reads; missing ones simply leave their tables out.
+SQLITE_PRODUCTS = (
+    "elections",
+    "election_facts",
+    "candidates",
+    "seat_terms",
+    "compensation",
+    "top_dashboard",
+    "win_rate",
+    "vote_optimization",
+    "candidate_identities",
+)
+
+# table -> column definitions. Tables are created from these even when they have no rows (several, such as
+# compensation_unmatched_terms, are normally empty); record fields not listed are appended with inferred types.
+TABLE_COLUMNS: Dict[str, str] = {
+    "elections": (
+        "election_name TEXT, notice_date TEXT, election_day TEXT, seats INTEGER, candidate_count INTEGER, "
+        "registered_voters INTEGER, note TEXT"
+    ),
+    "election_facts": (
+        "election_key TEXT, election_date TEXT, notice_date TEXT, in_summary INTEGER, seats INTEGER, "
+        "candidate_count INTEGER, registered_voters INTEGER, candidates_listed INTEGER, winner_count INTEGER, "
+        "total_votes INTEGER, turnout REAL, competition_ratio REAL, min_winning_vote INTEGER, max_losing_vote INTEGER, "
+        "legal_threshold REAL, missing_winner_votes INTEGER"
+    ),
+    "candidates": (
+        "candidate_id TEXT, name TEXT, kana TEXT, age INTEGER, gender TEXT, incumbent_status TEXT, profession TEXT, "
+        "party TEXT, votes INTEGER, outcome TEXT, image_file TEXT, source_file TEXT, source_key TEXT, "
+        "source_date_code TEXT, election_date TEXT, prefecture TEXT"
+    ),
+    "terms": (
+        "source_key TEXT, prefecture TEXT, municipality TEXT, party TEXT, seats INTEGER, term_start TEXT, "
+        "term_end TEXT, end_reason TEXT, first_seen INTEGER"
+    ),
+    "compensation_municipality": (
+        "party TEXT, year INTEGER, prefecture TEXT, municipality TEXT, seat_count INTEGER, annual_compensation REAL, "
+        "monthly_compensation REAL, bonus_compensation REAL, total_compensation REAL, months_in_term INTEGER, "
+        "bonus_count_march INTEGER, bonus_count_june INTEGER, bonus_count_december INTEGER, bonus_amount_march REAL, "
+        "bonus_amount_june REAL, bonus_amount_december REAL, term_start TEXT, term_end TEXT, election_date TEXT, "
+        "election_year INTEGER"
+    ),
+    "compensation_party_year": (
+        "party TEXT, year INTEGER, seat_count INTEGER, municipality_count INTEGER, total_compensation REAL"
+    ),
+    "compensation_party_summary": "party TEXT, total_compensation REAL, seat_count INTEGER, municipality_count INTEGER",
+    "compensation_unmatched_terms": "prefecture TEXT, municipality TEXT, term_count INTEGER, seat_count INTEGER",
+    "win_rate_events": "party TEXT, election_key TEXT, date TEXT, candidates INTEGER, winners INTEGER, ratio REAL",
+    "win_rate_parties": "party TEXT, candidates INTEGER, winners INTEGER, ratio REAL",
+    "vote_optimization_elections": (
+        "election_key TEXT, election_date TEXT, min_winning_vote INTEGER, total_candidates INTEGER, "
+        "winner_count INTEGER, total_votes INTEGER, total_gap INTEGER"
+    ),
+    "vote_optimization_party_results": (
+        "party TEXT, total_votes INTEGER, candidates INTEGER, actual_winners INTEGER, potential_winners INTEGER, "
+        "gap INTEGER, election_key TEXT, election_date TEXT"
+    ),
+    "vote_optimization_parties": (
+        "party TEXT, elections INTEGER, total_votes INTEGER, candidates INTEGER, actual_winners INTEGER, "
+        "potential_winners INTEGER, gap INTEGER"
+    ),
+    "party_seat_totals": "party TEXT, seats INTEGER",
+    "persons": (
+        "person_id TEXT, name TEXT, kana TEXT, prefecture TEXT, birth_year INTEGER, elections INTEGER, wins INTEGER, "
+        "first_date TEXT, last_date TEXT, parties TEXT, party_switches INTEGER, municipalities INTEGER"
+    ),
+    "careers": (
+        "person_id TEXT, candidate_id TEXT, election_date TEXT, source_key TEXT, party TEXT, votes INTEGER, "
+        "won INTEGER, incumbent_status TEXT"
+    ),
+    "party_switches": "person_id TEXT, election_date TEXT, from_party TEXT, to_party TEXT",
+}
+
+# table -> indexed column groups
+TABLE_INDEXES: Dict[str, Tuple[Tuple[str, ...], ...]] = {
+    "elections": (("election_name",), ("election_day",)),
+    "election_facts": (("election_key", "election_date"), ("election_date",)),
+    "candidates": (("party",), ("source_key",), ("election_date",), ("prefecture",)),
+    "terms": (("party",), ("source_key",), ("prefecture", "municipality"), ("term_start", "term_end")),
+    "compensation_municipality": (("party", "year"), ("prefecture", "municipality"), ("election_date",)),
+    "compensation_party_year": (("party", "year"),),
+    "compensation_party_summary": (("party",),),
+    "win_rate_events": (("party",), ("election_key",), ("date",)),
+    "win_rate_parties": (("party",),),
+    "vote_optimization_elections": (("election_key",), ("election_date",)),
+    "vote_optimization_party_results": (("party",), ("election_key",)),
+    "vote_optimization_parties": (("party",),),
+    "party_seat_totals": (("party",),),
+    "persons": (("person_id",), ("prefecture",)),
+    "careers": (("person_id",), ("candidate_id",), ("election_date",)),
+    "party_switches": (("person_id",), ("from_party", "to_party")),
+}
+
+
+def column_type(values: Iterable[Any]) -> str:
+    kinds = {type(value) for value in values if value is not None}
+    if kinds and kinds <= {int, bool}:
+        return "INTEGER"
+    if kinds and kinds <= {int, float, bool}:
+        return "REAL"
+    return "TEXT"
+
+
+def sql_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def create_table(connection: sqlite3.Connection, name: str, records: List[Dict[str, Any]]) -> None:
+    """Create ``name`` with the columns of ``TABLE_COLUMNS`` and bulk-insert ``records``."""
+    types = dict(definition.split() for definition in TABLE_COLUMNS.get(name, "").split(", ") if definition)
+    for column in dict.fromkeys(column for record in records for column in record):
+        if column not in types:
+            types[column] = column_type(record.get(column) for record in records)
+    if not types:
+        return
+    columns = list(types)
+    definitions = ", ".join(f'"{column}" {kind}' for column, kind in types.items())
+    connection.execute(f'CREATE TABLE "{name}" ({definitions})')
+    placeholders = ", ".join("?" for _ in columns)
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    connection.executemany(
+        f'INSERT INTO "{name}" ({quoted}) VALUES ({placeholders})',
+        ([sql_value(record.get(column)) for column in columns] for record in records),
+    )
+    for group in TABLE_INDEXES.get(name, ()):
+        if all(column in columns for column in group):
+            index_columns = ", ".join(f'"{column}"' for column in group)
+            connection.execute(f'CREATE INDEX "idx_{name}_{"_".join(group)}" ON "{name}" ({index_columns})')
+
+
+def build_tables(products: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    tables: Dict[str, List[Dict[str, Any]]] = {}
+    if "elections" in products:
+        tables["elections"] = products["elections"]
+    if "election_facts" in products:
+        tables["election_facts"] = build_election_facts_payload(products["election_facts"])["records"]
+    if "candidates" in products:
+        candidates = products["candidates"]
+        tables["candidates"] = [
+            dict(candidate, prefecture=source_prefecture(candidate.get("source_key")) or None)
+            for candidate in candidates
+        ]
+    if "seat_terms" in products:
+        tables["terms"] = products["seat_terms"]
+    if "compensation" in products:
+        compensation = products["compensation"]
+        tables["compensation_municipality"] = compensation.get("municipality_breakdown", [])
+        tables["compensation_party_year"] = compensation.get("rows", [])
+        tables["compensation_party_summary"] = compensation.get("party_summary", [])
+        tables["compensation_unmatched_terms"] = compensation.get("unmatched_terms", [])
+    if "win_rate" in products:
+        tables["win_rate_events"] = products["win_rate"].get("events", [])
+        tables["win_rate_parties"] = products["win_rate"].get("summary", {}).get("parties", [])
+    if "vote_optimization" in products:
+        elections = products["vote_optimization"].get("elections", [])
+        tables["vote_optimization_elections"] = [
+            {key: value for key, value in election.items() if key != "party_results"} for election in elections
+        ]
+        tables["vote_optimization_party_results"] = [
+            dict(result, election_key=election.get("election_key"), election_date=election.get("election_date"))
+            for election in elections
+            for result in election.get("party_results", [])
+        ]
+        tables["vote_optimization_parties"] = products["vote_optimization"].get("parties", [])
+    if "top_dashboard" in products:
+        totals = products["top_dashboard"].get("timeline", {}).get("totals", {})
+        tables["party_seat_totals"] = [{"party": party, "seats": seats} for party, seats in totals.items()]
+    if "candidate_identities" in products:
+        identities = products["candidate_identities"]
+        tables["persons"] = identities.get("persons", [])
+        tables["careers"] = identities.get("careers", [])
+        tables["party_switches"] = identities.get("party_switches", [])
+    return tables
+
+
+def write_dashboard_sqlite(products: Dict[str, Any], path: Optional[Path] = None) -> Dict[str, int]:
+    """Rebuild the SQLite file from ``products`` and return the row count per table."""
+    path = SQLITE_OUTPUT_PATH if path is None else Path(path)
+    tables = build_tables(products)
+    temporary = path.with_name(path.name + ".tmp")
+    for leftover in (temporary, Path(f"{temporary}-wal"), Path(f"{temporary}-shm")):
+        if leftover.exists():
+            leftover.unlink()
+
+    connection = sqlite3.connect(temporary, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("BEGIN")
+        try:
+            for name, records in tables.items():
+                create_table(connection, name, records)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("ANALYZE")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        connection.close()
+    # A WAL file left by an earlier reader of the old database must not be replayed into the new one.
+    for stale in (Path(f"{path}-wal"), Path(f"{path}-shm")):
+        if stale.exists():
+            stale.unlink()
+    os.replace(temporary, path)
+    return {name: len(records) for name, records in tables.items()}
@@ -0,0 +1,123 @@
+"""Run a graph of pipeline stages, starting each one as soon as its inputs exist.
+
+A stage is declared as ``name -> (inputs, outputs, run)``. Inputs and outputs
+are plain names: file paths for ``run_pipeline``, product names for
+``build_dashboard_data.build_products``. A stage depends on every stage that
+outputs one of its inputs. Inputs that no stage outputs are sources and count
+as available from the start. ``run`` takes no arguments and does the work. The
+caller's closure stores its results where the later stages read them.
+
+Stages whose dependencies are done run together on a thread pool, so the
+wall time follows the critical path instead of the sum of all stages. Threads
+suit both callers: pipeline stages wait on subprocesses, and products share
+one in-memory dict. The first failure stops the run. No new stage is started,
+``cancel`` (if given) is called so that running stages can be stopped, and a
+``StageError`` naming the stage is raised after the running ones return.
+Stages listed in ``completed`` are treated as done, which is how a failed run
+is resumed.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+Stage = Tuple[Tuple[Any, ...], Tuple[Any, ...], Callable[[], Any]]
+
+
+class StageError(RuntimeError):
+    """A stage failed; ``completed`` lists the stages that finished before it, in order."""
+
+    def __init__(self, stage: str, error: BaseException, completed: List[str]) -> None:
+        super().__init__(f"stage {stage!r} failed: {type(error).__name__}: {error}")
+        self.stage = stage
+        self.error = error
+        self.completed = completed
+
+
+def stage_dependencies(stages: Dict[str, Stage]) -> Dict[str, Set[str]]:
+    """The stages each stage waits for; raises ``ValueError`` for shared outputs or cycles."""
+    producers: Dict[Any, str] = {}
+    for name, (_, outputs, _) in stages.items():
+        for output in outputs:
+            if output in producers:
+                raise ValueError(f"{output!r} is an output of both {producers[output]!r} and {name!r}")
+            producers[output] = name
+    dependencies = {
+        name: {producers[item] for item in inputs if item in producers and producers[item] != name}
+        for name, (inputs, _, _) in stages.items()
+    }
+    stage_order(dependencies)
+    return dependencies
+
+
+def stage_order(dependencies: Dict[str, Set[str]]) -> List[str]:
+    """A topological order of the stages, in declaration order where there is a choice."""
+    ordered: List[str] = []
+    state: Dict[str, int] = {}
+
+    def visit(name: str, path: Tuple[str, ...]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"stage cycle: {' -> '.join(path + (name,))}")
+        state[name] = 1
+        for dependency in sorted(dependencies[name], key=list(dependencies).index):
+            visit(dependency, path + (name,))
+        state[name] = 2
+        ordered.append(name)
+
+    for name in dependencies:
+        visit(name, ())
+    return ordered
+
+
+def run_stages(
+    stages: Dict[str, Stage],
+    workers: int,
+    completed: Iterable[str] = (),
+    cancel: Optional[Callable[[], None]] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> List[str]:
+    """Run ``stages`` on ``workers`` threads; returns the stages run, in completion order."""
+    dependencies = stage_dependencies(stages)
+    order = stage_order(dependencies)
+    done = set(completed) & set(stages)
+    pending = [name for name in order if name not in done]
+    finished: List[str] = []
+    running: Dict[Future, Tuple[str, float]] = {}
+    failure: Optional[Tuple[str, BaseException]] = None
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        while pending or running:
+            if failure is None:
+                for name in [name for name in pending if dependencies[name] <= done]:
+                    if len(running) >= max(workers, 1):
+                        break
+                    pending.remove(name)
+                    if log:
+                        log(f"start: {name}")
+                    running[executor.submit(stages[name][2])] = (name, time.perf_counter())
+            if not running:
+                break
+            finished_now, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished_now:
+                name, started = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    if log:
+                        log(f"failed: {name} ({type(error).__name__}: {error})")
+                    if failure is None:
+                        failure = (name, error)
+                        if cancel:
+                            cancel()
+                    continue
+                done.add(name)
+                finished.append(name)
+                if log:
+                    log(f"done : {name} ({time.perf_counter() - started:.2f}s)")
+
+    if failure is not None:
+        raise StageError(failure[0], failure[1], finished) from failure[1]
+    return finished
@@ -0,0 +1,440 @@
+"""Watch mode: keep the dashboard products in memory and rebuild what a change touches.
+
+``run_pipeline`` starts cold every time. It re-exports both databases,
+re-parses the CSVs and recomputes every aggregate. This process builds the
+products of ``build_dashboard_data`` once and then polls its inputs:
+
+* ``election_base.db`` / ``election_details.db``: the matching CSV is
+  re-exported with ``regenerate_static_data``.
+* ``election_summary.csv``, ``candidate_details.csv.gz`` and
+  ``SeatsAndCompensation.csv``: the products read from the file, and every
+  product computed from those, are dropped.
+* ``politician_links.db``: only the link shards are rewritten.
+* ``data_pipeline/*.py``: the pipeline modules are reloaded. Each product
+  carries a fingerprint of the code reachable from its builder. That covers
+  the functions and constants it references, across modules and through
+  ``import_pipeline_module``. Only products whose fingerprint changed are
+  recomputed. A change to the output code (payload preparation,
+  serialisation, shards) republishes the outputs from the warm products.
+
+Only the outputs of recomputed products are published again, and
+``publish_json`` still skips files whose content did not change. Outputs use
+the ``fast`` compression profile unless ``--compression`` says otherwise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import sys
+import time
+import traceback
+import types
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+if __package__ in {None, ""}:
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_dashboard_data  # type: ignore
+    import regenerate_static_data  # type: ignore
+    from generate_compensation_data import COMPENSATION_PATH  # type: ignore
+    from output_writer import COLUMNAR_SCHEMA_VERSION, COMPRESSION_PROFILES  # type: ignore
+else:
+    from . import build_dashboard_data, regenerate_static_data
+    from .generate_compensation_data import COMPENSATION_PATH
+    from .output_writer import COLUMNAR_SCHEMA_VERSION, COMPRESSION_PROFILES
+
+PIPELINE_DIR = Path(__file__).resolve().parent
+POLL_INTERVAL = 0.25
+
+# Scraped databases -> the regenerate_static_data export that turns each into a CSV, and that CSV.
+DATABASE_EXPORTS = {
+    regenerate_static_data.BASE_DB: ("export_election_summary", regenerate_static_data.ELECTION_SUMMARY_CSV),
+    regenerate_static_data.DETAILS_DB: ("export_candidate_details", regenerate_static_data.CANDIDATE_DETAILS_CSV),
+}
+# Input files and the products read from them.
+INPUT_PRODUCTS = {
+    build_dashboard_data.ELECTION_SUMMARY_PATH: ("elections",),
+    build_dashboard_data.CANDIDATE_DETAILS_PATH: ("candidates",),
+    COMPENSATION_PATH: ("compensation",),
+}
+OUTPUT_CODE = "(outputs)"
+
+Stamp = Optional[Tuple[int, int]]
+
+
+def file_stamp(path: Path) -> Stamp:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def snapshot(paths: Iterable[Path]) -> Dict[Path, Stamp]:
+    return {path: file_stamp(path) for path in paths}
+
+
+def module_name(name: str) -> str:
+    return name if __package__ in {None, ""} else f"{__package__}.{name}"
+
+
+def pipeline_modules() -> Dict[str, types.ModuleType]:
+    """Loaded pipeline modules by short name, dependencies first, excluding this one."""
+    prefix = module_name("")
+    loaded = {
+        name[len(prefix) :]: module
+        for name, module in list(sys.modules.items())
+        if module is not None
+        and name.startswith(prefix)
+        and Path(getattr(module, "__file__", "") or "").parent == PIPELINE_DIR
+        and name != module_name("watch")
+    }
+    ordered: Dict[str, types.ModuleType] = {}
+
+    def visit(name: str, trail: Tuple[str, ...] = ()) -> None:
+        if name in ordered or name in trail:
+            return
+        # A module depends on every pipeline module it took a function or class from.
+        for value in vars(loaded[name]).values():
+            source = getattr(value, "__module__", None) or ""
+            if source.startswith(prefix) and source[len(prefix) :] in loaded:
+                visit(source[len(prefix) :], trail + (name,))
+        ordered[name] = loaded[name]
+
+    for name in sorted(loaded):
+        visit(name)
+    return ordered
+
+
+def reload_pipeline_modules() -> None:
+    for module in pipeline_modules().values():
+        importlib.reload(module)
+
+
+class CodeFingerprint:
+    """sha256 of the code reachable from a function, ignoring line numbers.
+
+    Global names are followed through each function's ``__globals__``. A string
+    constant naming a loaded pipeline module is treated like
+    ``import_pipeline_module(name)``, so the attributes used on it are followed too.
+    """
+
+    def __init__(self) -> None:
+        self.modules = pipeline_modules()
+        self.module_names = {module.__name__ for module in self.modules.values()}
+        self.visited: Set[int] = set()
+
+    def of(self, *values: Any) -> str:
+        digest = hashlib.sha256()
+        for value in values:
+            self.visit(value, digest)
+        return digest.hexdigest()
+
+    def visit(self, value: Any, digest: Any) -> None:
+        if isinstance(value, (str, int, float, bool, bytes, type(None), Path, date)):
+            digest.update(repr(value).encode("utf-8"))
+        elif isinstance(value, types.FunctionType):
+            digest.update(f"function:{value.__module__}.{value.__qualname__}".encode("utf-8"))
+            # Library functions are identified by name only.
+            if id(value) in self.visited or value.__module__ not in self.module_names:
+                return
+            self.visited.add(id(value))
+            self.visit(value.__defaults__, digest)
+            self.visit(value.__kwdefaults__, digest)
+            self.visit_code(value.__code__, value.__globals__, digest)
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                self.visit(key, digest)
+                self.visit(item, digest)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            for item in sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value:
+                self.visit(item, digest)
+        elif hasattr(value, "pattern") and hasattr(value, "flags"):
+            digest.update(f"pattern:{value.pattern!r}:{value.flags}".encode("utf-8"))
+        else:
+            digest.update(f"{type(value).__module__}.{type(value).__qualname__}".encode("utf-8"))
+
+    def visit_code(self, code: types.CodeType, namespace: Dict[str, Any], digest: Any) -> None:
+        digest.update(code.co_code)
+        digest.update(repr((code.co_names, code.co_varnames, code.co_freevars)).encode("utf-8"))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                self.visit_code(const, namespace, digest)
+            else:
+                self.visit(const, digest)
+        for name in code.co_names:
+            if name in namespace and not isinstance(namespace[name], types.ModuleType):
+                self.visit(namespace[name], digest)
+        for const in code.co_consts:
+            module = self.modules.get(const) if isinstance(const, str) else None
+            if module is not None:
+                for name in code.co_names:
+                    if name in vars(module):
+                        self.visit(vars(module)[name], digest)
+
+
+def code_fingerprints(sqlite: bool) -> Dict[str, str]:
+    """One fingerprint per product, plus one for the output code under ``OUTPUT_CODE``."""
+    fingerprint = CodeFingerprint()
+    fingerprints = {
+        name: fingerprint.of(builder, build_dashboard_data.PRODUCT_DEPENDENCIES[name])
+        for name, builder in build_dashboard_data.PRODUCT_BUILDERS.items()
+    }
+    output_code: List[Any] = [build_dashboard_data.publish_outputs]
+    if sqlite:
+        output_code.append(import_pipeline("sqlite_export").write_dashboard_sqlite)
+    fingerprints[OUTPUT_CODE] = fingerprint.of(*output_code)
+    return fingerprints
+
+
+def import_pipeline(name: str) -> types.ModuleType:
+    return importlib.import_module(module_name(name))
+
+
+def dependent_products(names: Iterable[str]) -> Set[str]:
+    """``names`` and every product computed from them."""
+    stale = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for name, dependencies in build_dashboard_data.PRODUCT_DEPENDENCIES.items():
+            if name not in stale and stale.intersection(dependencies):
+                stale.add(name)
+                changed = True
+    return stale
+
+
+class DashboardWatcher:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.targets = [build_dashboard_data.resolve_target_name(name) for name in args.targets] or list(
+            build_dashboard_data.OUTPUT_TARGETS
+        )
+        self.products: Dict[str, Any] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self.stamps: Dict[Path, Stamp] = {}
+        # Work left over when a step fails, carried into the next one.
+        self.unpublished: Set[str] = set()
+        self.republish = True
+        self.links_changed = False
+
+    def links_db(self) -> Path:
+        return import_pipeline("candidate_links").LINKS_DB_PATH
+
+    def watched_paths(self) -> List[Path]:
+        paths = [*DATABASE_EXPORTS, *INPUT_PRODUCTS, *sorted(PIPELINE_DIR.glob("*.py"))]
+        if self.args.candidate_links:
+            paths.append(self.links_db())
+        return paths
+
+    def needed_products(self) -> List[str]:
+        names = [build_dashboard_data.OUTPUT_TARGETS[target][1] for target in self.targets]
+        if self.args.candidate_links:
+            names.append("candidates")
+        if self.args.sqlite:
+            names.extend(import_pipeline("sqlite_export").SQLITE_PRODUCTS)
+        return build_dashboard_data.required_products(names)
+
+    def export_databases(self, databases: Iterable[Path]) -> None:
+        for database in databases:
+            started = time.perf_counter()
+            getattr(regenerate_static_data, DATABASE_EXPORTS[database][0])()
+            print(f"[watch] exported {database.name} ({time.perf_counter() - started:.2f}s)")
+
+    def reload(self) -> Set[str]:
+        """Reload the pipeline modules; returns the products (and ``OUTPUT_CODE``) whose code changed."""
+        reload_pipeline_modules()
+        import_pipeline("output_writer").set_compression_profile(self.args.compression)
+        fingerprints = code_fingerprints(self.args.sqlite)
+        changed = {name for name, value in fingerprints.items() if self.fingerprints.get(name) != value}
+        self.fingerprints = fingerprints
+        return changed
+
+    def invalidate(self, names: Iterable[str]) -> None:
+        for name in dependent_products(names):
+            self.products.pop(name, None)
+
+    def build(self) -> None:
+        for name in self.needed_products():
+            if name in self.products:
+                continue
+            started = time.perf_counter()
+            self.products[name] = build_dashboard_data.PRODUCT_BUILDERS[name](self.products)
+            self.unpublished.add(name)
+            print(f"[watch] built {name} ({time.perf_counter() - started:.2f}s)")
+
+    def publish(self) -> None:
+        """Write the outputs of the products built since the last publish."""
+        targets = [
+            target
+            for target in self.targets
+            if self.republish or build_dashboard_data.OUTPUT_TARGETS[target][1] in self.unpublished
+        ]
+        candidates = self.republish or "candidates" in self.unpublished
+        links = self.args.candidate_links and (candidates or self.links_changed)
+        sqlite_export = import_pipeline("sqlite_export") if self.args.sqlite else None
+        sqlite = sqlite_export is not None and (
+            self.republish or bool(self.unpublished.intersection(sqlite_export.SQLITE_PRODUCTS))
+        )
+        if not (targets or links or sqlite):
+            print("[watch] no dependent outputs")
+            return
+        results = build_dashboard_data.publish_outputs(
+            self.products,
+            targets,
+            self.args.schema_version,
+            links,
+            self.args.output_workers,
+            self.args.typed_series,
+        )
+        print("[watch] wrote", *([name for name, changed in results if changed] or ["(no changes)"]))
+        if links:
+            # The first links build may add its index to the database; that is not a change to react to.
+            self.stamps[self.links_db()] = file_stamp(self.links_db())
+        if sqlite:
+            sqlite_export.write_dashboard_sqlite(self.products)
+            print(f"[watch] wrote {sqlite_export.SQLITE_OUTPUT_PATH.name}")
+        self.unpublished.clear()
+        self.republish = False
+        self.links_changed = False
+
+    def start(self) -> None:
+        outdated = [
+            database
+            for database, (_, csv_path) in DATABASE_EXPORTS.items()
+            if database.exists() and (file_stamp(csv_path) or (0,))[0] < (file_stamp(database) or (0,))[0]
+        ]
+        self.export_databases(outdated)
+        self.stamps = snapshot(self.watched_paths())
+        started = time.perf_counter()
+        try:
+            self.build()
+            self.publish()
+        finally:
+            # Lazily imported modules are loaded now, so the fingerprints cover them.
+            self.fingerprints = code_fingerprints(self.args.sqlite)
+        print(f"[watch] ready ({time.perf_counter() - started:.2f}s); watching for changes")
+
+    def changed_paths(self) -> List[Path]:
+        current = snapshot(self.watched_paths())
+        if current == self.stamps:
+            return []
+        # Wait until writers are done: the stamps must hold still for one interval.
+        while True:
+            time.sleep(self.args.interval)
+            settled = snapshot(self.watched_paths())
+            if settled == current:
+                break
+            current = settled
+        changed = [path for path, stamp in current.items() if self.stamps.get(path) != stamp]
+        self.stamps = current
+        return changed
+
+    def step(self, changed: List[Path]) -> None:
+        started = time.perf_counter()
+        print("[watch] changed:", *(path.name for path in changed))
+        if self.args.candidate_links and self.links_db() in changed:
+            self.links_changed = True
+        stale: Set[str] = set()
+        if any(path.suffix == ".py" for path in changed):
+            stale = self.reload()
+            if OUTPUT_CODE in stale:
+                self.republish = True
+                stale.discard(OUTPUT_CODE)
+        databases = [path for path in changed if path in DATABASE_EXPORTS and path.exists()]
+        if databases:
+            self.export_databases(databases)
+            exported = snapshot(csv_path for _, csv_path in DATABASE_EXPORTS.values())
+            changed = changed + [path for path, stamp in exported.items() if self.stamps.get(path) != stamp]
+            self.stamps.update(exported)
+        for path in changed:
+            stale.update(INPUT_PRODUCTS.get(path, ()))
+        self.invalidate(stale)
+        self.build()
+        self.publish()
+        print(f"[watch] done ({time.perf_counter() - started:.2f}s)")
+
+    def run(self) -> None:
+        try:
+            self.start()
+        except Exception:
+            traceback.print_exc()
+            print("[watch] initial build failed; waiting for a change")
+        while True:
+            time.sleep(self.args.interval)
+            changed = self.changed_paths()
+            if not changed:
+                continue
+            try:
+                self.step(changed)
+            except Exception:
+                # Keep the last good products; whatever failed is built again on the next change.
+                traceback.print_exc()
+                print("[watch] failed; waiting for the next change")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard datasets as their inputs and builders change.")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        metavar="TARGET",
+        help="outputs to keep up to date, e.g. win_rate.json.gz or win_rate (default: all)",
+    )
+    parser.add_argument(
+        "--schema-version",
+        type=int,
+        choices=(1, COLUMNAR_SCHEMA_VERSION),
+        default=1,
+        help="2 writes candidate and compensation tables in the dictionary-encoded columnar layout",
+    )
+    parser.add_argument(
+        "--candidate-links",
+        action="store_true",
+        help="also keep the candidate link shards up to date and watch data/politician_links.db",
+    )
+    parser.add_argument("--sqlite", action="store_true", help="also keep data/dashboard.sqlite up to date")
+    parser.add_argument(
+        "--typed-series",
+        action="store_true",
+        help="also keep the binary top_dashboard and win_rate series (*_series.bin.gz) up to date",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=tuple(COMPRESSION_PROFILES),
+        default="fast",
+        help="compression profile of the rewritten outputs (default: fast)",
+    )
+    parser.add_argument(
+        "--output-workers",
+        type=int,
+        default=0,
+        help="threads that serialise and compress the outputs (0 = one per output, up to the CPU count)",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=POLL_INTERVAL,
+        help=f"seconds between polls of the watched files (default: {POLL_INTERVAL})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    import_pipeline("output_writer").set_compression_profile(args.compression)
+    try:
+        watcher = DashboardWatcher(args)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("[watch] stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Shared setup for the data pipeline tests.
+
+The pipeline modules are imported the way ``python data_pipeline/<module>.py``
+imports them, with ``data_pipeline`` on ``sys.path``, so the tests run from a
+checkout whatever its directory is called.
+
+``pipeline_inputs`` writes a small synthetic election summary and candidate
+CSV for municipalities of ``data/SeatsAndCompensation.csv`` into a temporary
+directory and points the pipeline (and its caches) at it.
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import random
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+PIPELINE_DIR = ROOT / "data_pipeline"
+
+if str(PIPELINE_DIR) not in sys.path:
+    sys.path.insert(0, str(PIPELINE_DIR))
+
+SUMMARY_COLUMNS = [
+    "election_name",
+    "notice_date",
+    "election_day",
+    "seats",
+    "candidate_count",
+    "registered_voters",
+    "note",
+]
+CANDIDATE_COLUMNS = [
+    "candidate_id",
+    "name",
+    "kana",
+    "age",
+    "gender",
+    "incumbent_status",
+    "profession",
+    "party",
+    "votes",
+    "outcome",
+    "image_file",
+    "source_file",
+]
+PARTIES = ["自由民主党", "公明党", "日本共産党", "立憲民主党", "無所属", "日本維新の会", "民主党", ""]
+
+
+def synthetic_elections(municipalities, seed=26):
+    """Summary and candidate rows: a council election every four years and some mayoral elections."""
+    rng = random.Random(seed)
+    summary, candidates = [], []
+    for prefecture, municipality in municipalities:
+        year = rng.randint(2003, 2008)
+        while year < 2026:
+            day = date(year, rng.randint(1, 12), rng.randint(1, 28))
+            if rng.random() < 0.25:
+                name = f"{prefecture}{municipality}{'市長選挙' if municipality.endswith('市') else '町長選挙'}"
+                seats = 1
+            else:
+                name = f"{prefecture}{municipality}議会議員選挙"
+                seats = rng.randint(6, 14)
+            count = seats + rng.randint(0, 4)
+            summary.append([name, day.isoformat(), day.isoformat(), seats, count, rng.randint(5000, 90000), "任期満了"])
+            votes = sorted((rng.randint(100, 3000) for _ in range(count)), reverse=True)
+            for rank, vote in enumerate(votes):
+                number = len(candidates) + 1
+                candidates.append(
+                    [
+                        number,
+                        f"候補{number % 300}",
+                        f"こうほ{number % 300}",
+                        rng.randint(30, 75),
+                        rng.choice("男女"),
+                        rng.choice(["現", "新", "元"]),
+                        "会社員",
+                        rng.choice(PARTIES),
+                        vote if rng.random() > 0.02 else "",
+                        "当選" if rank < seats else "",
+                        "",
+                        f"{name}_{day:%Y%m%d}.html",
+                    ]
+                )
+            year += 4
+    return summary, candidates
+
+
+@pytest.fixture
+def pipeline_inputs(tmp_path, monkeypatch):
+    import build_dashboard_data
+    import generate_compensation_data
+    import seat_terms
+
+    with generate_compensation_data.COMPENSATION_PATH.open(encoding="utf-8") as handle:
+        rows = list(csv.reader(handle))[1:]
+    municipalities = [(row[1], row[2]) for row in rows[::97]]
+    summary, candidates = synthetic_elections(municipalities)
+
+    summary_path = tmp_path / "election_summary.csv"
+    with summary_path.open("w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(SUMMARY_COLUMNS)
+        writer.writerows(summary)
+    candidate_path = tmp_path / "candidate_details.csv.gz"
+    with gzip.open(candidate_path, "wt", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(CANDIDATE_COLUMNS)
+        writer.writerows(candidates)
+
+    for module in (build_dashboard_data, seat_terms):
+        monkeypatch.setattr(module, "ELECTION_SUMMARY_PATH", summary_path)
+        monkeypatch.setattr(module, "CANDIDATE_DETAILS_PATH", candidate_path)
+    monkeypatch.setattr(seat_terms, "SEAT_TERMS_PATH", tmp_path / ".cache" / "seat_terms.json.gz")
+    monkeypatch.setattr(
+        generate_compensation_data, "COMPENSATION_INDEX_CACHE_PATH", tmp_path / ".cache" / "compensation_index.json"
+    )
+    return tmp_path
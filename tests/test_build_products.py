@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from build_dashboard_data import OUTPUT_TARGETS, RELEASE_DEFAULTS, SHARDED_PRODUCTS, build_products, parse_args
+from common import source_prefecture
+from output_writer import encode_json
+from run_pipeline import ROOT, STAGES
+
+PRODUCTS = sorted({product for _, product, _ in OUTPUT_TARGETS.values()})
+
+
+def encoded_outputs(products):
+    return {
+        target: encode_json(prepare(products[product]) if prepare else products[product])
+        for target, (_, product, prepare) in OUTPUT_TARGETS.items()
+    }
+
+
+def test_fixture_spans_several_shards(pipeline_inputs):
+    candidates = build_products(["candidates"])["candidates"]
+    prefectures = {source_prefecture(candidate["source_key"]) for candidate in candidates}
+    assert len(prefectures) >= 5
+
+
+def test_sharded_build_matches_serial_build(pipeline_inputs):
+    serial = build_products(PRODUCTS)
+    sharded = build_products(PRODUCTS, workers=3)
+    for name in SHARDED_PRODUCTS:
+        assert encode_json(sharded[name]) == encode_json(serial[name]), name
+    assert encoded_outputs(sharded) == encoded_outputs(serial)
+
+
+def test_partial_build_matches_full_build(pipeline_inputs):
+    full = build_products(PRODUCTS)
+    for product in ("win_rate", "vote_optimization", "compensation"):
+        assert encode_json(build_products([product])[product]) == encode_json(full[product]), product
+
+
+def test_release_builds_share_one_set_of_options():
+    release = vars(parse_args(["--release"]))
+    assert {name: release[name] for name in RELEASE_DEFAULTS} == RELEASE_DEFAULTS
+    assert parse_args(["--release", "--schema-version", "1"]).schema_version == 1
+    assert STAGES["build_dashboard_data"][1] == ["--release"]
+    workflow = (ROOT / ".github" / "workflows" / "build-dashboard-data.yml").read_text(encoding="utf-8")
+    assert "build_dashboard_data --release\n" in workflow
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from candidate_identity import build_candidate_identities
+
+
+def candidacy(candidate_id, source_key, election_date, age, name="山田太郎", kana="やまだたろう", **fields):
+    row = {
+        "candidate_id": candidate_id,
+        "source_key": source_key,
+        "source_file": f"{source_key}_{election_date}.csv",
+        "election_date": election_date,
+        "name": name,
+        "kana": kana,
+        "age": age,
+        "gender": "男",
+        "party": "無所属",
+        "outcome": "当選",
+    }
+    return dict(row, **fields)
+
+
+CAREER = [
+    candidacy("a1", "北海道A市議会議員選挙", "2015-04-26", 40),
+    candidacy("a2", "北海道A市議会議員選挙", "2019-04-21", 44, kana="ヤマダ タロウ"),
+    candidacy("a3", "北海道B市長選挙", "2023-04-23", 48, name="山田 太郎", party="自由民主党", outcome="落選"),
+]
+
+
+def persons_by_candidate(identities):
+    return {career["candidate_id"]: career["person_id"] for career in identities["careers"]}
+
+
+def test_one_person_across_elections():
+    identities = build_candidate_identities(CAREER)
+    assert len(identities["persons"]) == 1
+    person = identities["persons"][0]
+    assert (person["elections"], person["wins"], person["birth_year"]) == (3, 2, 1975)
+    assert (person["first_date"], person["last_date"], person["municipalities"]) == ("2015-04-26", "2023-04-23", 2)
+    assert person["parties"] == ["無所属", "自由民主党"]
+    assert identities["party_switches"] == [
+        {"person_id": person["person_id"], "election_date": "2023-04-23", "from_party": "無所属", "to_party": "自由民主党"}
+    ]
+    summary = identities["summary"]
+    assert (summary["repeat_candidates"], summary["reelection_attempts"], summary["reelection_wins"]) == (1, 2, 1)
+
+
+def test_namesakes_that_cannot_be_one_person_stay_apart():
+    candidates = CAREER[:2] + [
+        candidacy("f1", "北海道A市議会議員選挙", "2023-04-23", 48, gender="女"),
+        candidacy("y1", "北海道A市議会議員選挙", "2023-04-23", 30),
+        candidacy("o1", "青森県C町議会議員選挙", "2019-04-21", 44),
+        # Same day as a2, which is the better match for a1.
+        candidacy("s1", "北海道D町議会議員選挙", "2019-04-21", 44),
+    ]
+    persons = persons_by_candidate(build_candidate_identities(candidates))
+    assert persons["a1"] == persons["a2"]
+    assert len({persons[candidate_id] for candidate_id in ("a1", "f1", "y1", "o1", "s1")}) == 5
+
+
+def test_person_ids_survive_later_elections():
+    before = persons_by_candidate(build_candidate_identities(CAREER[:2]))
+    stranger = candidacy("z1", "東京都八王子市議会議員選挙", "2019-04-21", 61)
+    after = persons_by_candidate(build_candidate_identities(CAREER + [stranger]))
+    assert before["a1"] == after["a1"] == after["a3"]
+    assert after["z1"] != after["a1"]
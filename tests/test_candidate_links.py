@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import gzip
+import json
+import sqlite3
+
+import pytest
+
+import candidate_links
+from candidate_links import PID_INDEX_NAME, iter_candidate_links, write_candidate_links
+
+
+@pytest.fixture
+def links_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(candidate_links, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(candidate_links, "LINK_SHARD_DIR", tmp_path / "links")
+    monkeypatch.setattr(candidate_links, "LINK_SHARD_SIZE", 10)
+    path = tmp_path / "politician_links.db"
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("CREATE TABLE links_table (pid INTEGER, links TEXT)")
+        connection.executemany(
+            "INSERT INTO links_table (pid, links) VALUES (?, ?)",
+            [
+                (3, '["https://a.example/", " https://b.example/ "]'),
+                (3, '["https://b.example/", "https://c.example/"]'),
+                (5, "[]"),
+                (7, "not json"),
+                (12, '["https://d.example/"]'),
+                (15, '["https://e.example/"]'),
+                (40, '["https://unlisted.example/"]'),
+            ],
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    return path
+
+
+def test_links_are_merged_per_candidate_in_id_order(links_db):
+    rows = list(iter_candidate_links([15, 3, 5, 7, 12, 99], links_db))
+    assert rows == [
+        (3, ["https://a.example/", "https://b.example/", "https://c.example/"]),
+        (12, ["https://d.example/"]),
+        (15, ["https://e.example/"]),
+    ]
+    connection = sqlite3.connect(links_db)
+    try:
+        indexes = [row[1] for row in connection.execute("PRAGMA index_list(links_table)")]
+    finally:
+        connection.close()
+    assert indexes == [PID_INDEX_NAME]
+
+
+def test_shards_follow_candidate_id_ranges(links_db, tmp_path):
+    candidates = [{"candidate_id": value} for value in ("3", "12", "15", "5", "", "x", "12")]
+    index = write_candidate_links(candidates, links_db)
+    assert index["candidates"] == 3
+    assert [(entry["key"], entry["candidates"], entry["id_from"], entry["id_to"]) for entry in index["shards"]] == [
+        ("0000", 1, 3, 3),
+        ("0001", 2, 12, 15),
+    ]
+    with gzip.open(tmp_path / index["shards"][1]["file"], "rt", encoding="utf-8") as stream:
+        assert json.load(stream)["links"] == {"12": ["https://d.example/"], "15": ["https://e.example/"]}
+
+    # Dropping every candidate of a shard removes its file.
+    index = write_candidate_links(candidates[:1], links_db)
+    assert [path.name for path in (tmp_path / "links").iterdir()] == [index["shards"][0]["file"].split("/")[-1]]
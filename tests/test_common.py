@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import pytest
+
+from common import MERGED_MUNICIPALITIES, normalise_municipality_name, normalise_prefecture_name
+from generate_compensation_data import COMPENSATION_INDEX_VALUE_COLUMNS, build_compensation_index
+
+
+@pytest.mark.parametrize(
+    "prefecture, variants",
+    [
+        ("茨城県", ["龍ケ崎市", "龍ヶ崎市", "竜ヶ崎市", "竜ケ崎市", "茨城県龍ケ崎市"]),
+        ("東京都", ["檜原村", "桧原村", "西多摩郡檜原村", "東京都西多摩郡桧原村"]),
+        ("北海道", ["余市町", "余市郡余市町", "北海道余市郡余市町", "余市郡 余市町"]),
+        ("宮崎県", ["髙千穂町", "高千穂町", "西臼杵郡高千穂町"]),
+        ("北海道", ["ニセコ町", "ﾆｾｺ町", "虻田郡ニセコ町"]),
+        ("兵庫県", ["宝塚市", "寶塚市", "兵庫県寶塚市"]),
+    ],
+)
+def test_spelling_variants_share_a_key(prefecture, variants):
+    keys = {normalise_municipality_name(prefecture, variant) for variant in variants}
+    assert len(keys) == 1
+
+
+@pytest.mark.parametrize(
+    "prefecture, municipality, expected",
+    [
+        # 郡 is only a district prefix before a town or village name.
+        ("福島県", "郡山市", "郡山市"),
+        ("岐阜県", "郡上市", "郡上市"),
+        ("鹿児島県", "薩摩郡さつま町", "さつま町"),
+        # The prefecture prefix is dropped only when something follows it.
+        ("京都府", "京都府京都市", "京都市"),
+        ("京都府", "京都市", "京都市"),
+        ("北海道", "北海道", "北海道"),
+        ("東京都", "ｓａｍｐｌｅ　市", "sample市"),
+        ("東京都", None, ""),
+    ],
+)
+def test_normalised_keys(prefecture, municipality, expected):
+    assert normalise_municipality_name(prefecture, municipality) == expected
+
+
+def test_merged_municipalities_use_the_successor_rates():
+    index = build_compensation_index().set_index(["prefecture_key", "municipality_key"])
+    for (prefecture, former), successor in MERGED_MUNICIPALITIES.items():
+        prefecture_key = normalise_prefecture_name(prefecture)
+        former_rates = index.loc[(prefecture_key, normalise_municipality_name(prefecture, former))]
+        successor_rates = index.loc[(prefecture_key, normalise_municipality_name(prefecture, successor))]
+        assert list(former_rates[COMPENSATION_INDEX_VALUE_COLUMNS]) == list(
+            successor_rates[COMPENSATION_INDEX_VALUE_COLUMNS]
+        ), former
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import pytest
+
+import compensation_scenarios
+from compensation_scenarios import load_exposure, run_scenarios
+from generate_compensation_data import build_party_compensation
+
+
+@pytest.fixture
+def exposure(pipeline_inputs, monkeypatch):
+    monkeypatch.setattr(compensation_scenarios, "EXPOSURE_CACHE_PATH", pipeline_inputs / ".cache" / "exposure.pkl")
+    monkeypatch.setattr(compensation_scenarios, "_exposure_cache", {})
+    return load_exposure()
+
+
+def totals(frame, by=("party", "year")):
+    return {
+        tuple(row[name] for name in by): row["total_compensation"] for row in frame.to_dict(orient="records")
+    }
+
+
+def test_the_default_scenario_reproduces_the_estimate(exposure):
+    compensation = build_party_compensation()
+    expected = {(row["party"], row["year"]): row["total_compensation"] for row in compensation["party_years"]}
+    result = totals(run_scenarios([{}], exposure))
+    assert result.keys() == expected.keys()
+    for key, total in expected.items():
+        assert result[key] == pytest.approx(total, rel=1e-12), key
+
+    (overall,) = run_scenarios([{"name": "baseline"}], exposure, by=())["total_compensation"]
+    assert overall == pytest.approx(sum(row["total_compensation"] for row in compensation["year_totals"]))
+
+
+def test_scenarios_scale_the_baseline(exposure):
+    frame = run_scenarios(
+        [
+            {"name": "baseline"},
+            {"name": "raise", "monthly_multiplier": 1.05},
+            {"name": "no bonus", "bonus_rates": {}},
+            {"name": "short terms", "term_years": 2},
+            {"name": "indexed", "inflation_rate": 0.01, "base_year": 2020},
+        ],
+        exposure,
+        by=("year",),
+    )
+    by_scenario = {name: totals(group, ("year",)) for name, group in frame.groupby("scenario")}
+    baseline = by_scenario["baseline"]
+    for key, total in baseline.items():
+        assert by_scenario["raise"][key] == pytest.approx(total * 1.05)
+        assert by_scenario["no bonus"][key] <= total
+        assert by_scenario["short terms"][key] <= total
+        assert by_scenario["indexed"][key] == pytest.approx(total * 1.01 ** (key[0] - 2020))
+    assert sum(by_scenario["no bonus"].values()) < sum(baseline.values())
+    assert sum(by_scenario["short terms"].values()) < sum(baseline.values())
+
+
+def test_the_exposure_is_reused_while_the_inputs_are_unchanged(exposure, monkeypatch):
+    assert compensation_scenarios.EXPOSURE_CACHE_PATH.exists()
+    monkeypatch.setattr(compensation_scenarios, "_exposure_cache", {})
+    monkeypatch.setattr(compensation_scenarios, "join_compensation_reference", None)
+    assert load_exposure().equals(exposure)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+
+import compensation_shards
+from compensation_shards import partition_municipality_rows, prefecture_code, write_compensation_shards
+
+
+def row(prefecture, municipality, party="無所属", year=2020, total=100.0):
+    return {
+        "prefecture": prefecture,
+        "municipality": municipality,
+        "party": party,
+        "year": year,
+        "term_start": f"{year}-04-01",
+        "total_compensation": total,
+    }
+
+
+@pytest.fixture
+def shard_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(compensation_shards, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(compensation_shards, "COMPENSATION_SHARD_DIR", tmp_path / "compensation")
+    return tmp_path / "compensation"
+
+
+def test_rows_are_partitioned_by_prefecture_code():
+    assert (prefecture_code("北海道"), prefecture_code("沖縄県"), prefecture_code("不明")) == ("01", "47", "00")
+    shards = partition_municipality_rows(
+        [row("東京都", "八王子市", year=2021), row("北海道", "札幌市"), row("東京都", "八王子市"), row(None, "不明")]
+    )
+    assert list(shards) == ["00", "01", "13"]
+    assert [record["year"] for record in shards["13"]] == [2020, 2021]
+
+
+def test_index_lists_each_shard_and_drops_superseded_files(shard_dir):
+    rows = [row("北海道", "札幌市"), row("北海道", "旭川市", year=2022, total=50.0), row("東京都", "八王子市")]
+    index = write_compensation_shards(rows)
+    assert index["records"] == 3
+    hokkaido, tokyo = index["shards"]
+    assert (hokkaido["key"], hokkaido["municipalities"], hokkaido["records"]) == ("01", 2, 2)
+    assert (hokkaido["year_from"], hokkaido["year_to"], hokkaido["total_compensation"]) == (2020, 2022, 150.0)
+    with gzip.open(shard_dir.parent / hokkaido["file"], "rt", encoding="utf-8") as stream:
+        assert [record["municipality"] for record in json.load(stream)["records"]] == ["旭川市", "札幌市"]
+
+    # Unchanged shards keep their file; a changed one replaces it.
+    changed = write_compensation_shards(rows[:2] + [row("東京都", "八王子市", total=120.0)])
+    assert changed["shards"][0]["file"] == hokkaido["file"]
+    assert changed["shards"][1]["file"] != tokyo["file"]
+    assert sorted(path.name for path in shard_dir.iterdir()) == sorted(
+        entry["file"].split("/")[-1] for entry in changed["shards"]
+    )
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+
+import delta_patches
+from delta_patches import apply_patch, build_patch, record_release
+from output_writer import encode_columnar_table, encode_json
+
+
+def election(name, day, **fields):
+    return dict({"election_name": name, "election_day": day, "notice_date": day, "seats": 10}, **fields)
+
+
+@pytest.fixture
+def releases():
+    old = {
+        "generated_at": "1970-01-01T00:00:00+00:00",
+        "source": "old",
+        "records": [
+            election("A市議会議員選挙", "2019-04-21"),
+            election("B町長選挙", "2020-01-12", seats=1),
+            election("C村議会議員選挙", "2021-03-07"),
+            election("C村議会議員選挙", "2021-03-07", note="duplicate key"),
+            election("D市長選挙", "2022-11-20", seats=1),
+        ],
+    }
+    new = {
+        "generated_at": "1970-01-01T00:00:00+00:00",
+        "records": [
+            election("E市議会議員選挙", "2018-09-09"),
+            election("A市議会議員選挙", "2019-04-21", registered_voters=41883),
+            election("C村議会議員選挙", "2021-03-07"),
+            election("D市長選挙", "2022-11-20", seats=1),
+            election("C村議会議員選挙", "2021-03-07", note="duplicate key"),
+        ],
+        "note": "new",
+    }
+    return old, new
+
+
+def test_patch_rebuilds_the_new_release(releases):
+    old, new = releases
+    patch = build_patch("election_summary", encode_json(old), encode_json(new))
+    assert patch is not None
+    assert patch["unset"] == ["source"] and patch["set"] == {"note": "new"}
+    diff = patch["collections"]["records"]
+    assert diff["remove"] == ["B町長選挙\u001f2020-01-12\u001f2020-01-12"]
+    assert [index for index, _, _ in diff["upsert"]] == [0, 1]
+    assert "order" in diff
+    assert encode_json(apply_patch(old, patch)) == encode_json(new)
+    assert "source" in old
+
+
+def test_columnar_tables_are_diffed_by_row(releases):
+    old, new = releases
+    old = dict(old, records=encode_columnar_table(old["records"]))
+    new = dict(new, records=encode_columnar_table(new["records"]))
+    patch = build_patch("election_summary", encode_json(old), encode_json(new))
+    assert patch is not None
+    assert "records" not in patch["set"]
+    assert patch["collections"]["records"]["columnar"] is True
+    assert encode_json(apply_patch(old, patch)) == encode_json(new)
+
+
+def test_record_release_keeps_a_chain_of_patches(tmp_path, monkeypatch, releases):
+    monkeypatch.setattr(delta_patches, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(delta_patches, "PATCHES_DIR", tmp_path / "patches")
+    old, new = releases
+    newer = dict(new, records=new["records"][1:])
+    data = [encode_json(release) for release in (old, new, newer)]
+
+    assert record_release("election_summary", None, data[0], {}, 1) == []
+    chain = record_release("election_summary", data[0], data[1], {"version": 1, "patches": []}, 2)
+    chain = record_release("election_summary", data[1], data[2], {"version": 2, "patches": chain}, 3)
+    assert [(item["from"], item["to"]) for item in chain] == [(1, 2), (2, 3)]
+
+    payload = old
+    for item in chain:
+        with gzip.open(tmp_path / item["file"], "rb") as handle:
+            payload = apply_patch(payload, json.loads(handle.read()))
+    assert encode_json(payload) == data[2]
+
+    # A skipped version restarts the chain and removes the patches it no longer lists.
+    assert record_release("election_summary", data[2], data[0], {"version": 2, "patches": chain}, 5) == []
+    assert list((tmp_path / "patches").iterdir()) == []
+
+
+def test_datasets_without_a_spec_are_not_patched(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta_patches, "PATCHES_DIR", tmp_path / "patches")
+    assert record_release("win_rate", b"{}", b'{"events":[]}', {"version": 1}, 2) is None
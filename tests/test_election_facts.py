@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from election_facts import INTERNAL_FIELDS, build_election_facts, build_election_facts_payload
+
+
+def results(election_key, election_date, **fields):
+    group = {
+        "election_key": election_key,
+        "election_date": pd.Timestamp(election_date),
+        "winner_count": 2,
+        "total_candidates": 3,
+        "voted_candidates": 3,
+        "total_votes": 6000,
+        "min_win_vote": 2100,
+        "max_lose_vote": 1500,
+        "parties": {"無所属": {"winners": 2}},
+        "first_seen": 0,
+    }
+    return dict(group, **fields)
+
+
+def test_summary_and_candidate_groups_join_on_name_and_day():
+    elections = [
+        {"election_name": " A市議会議員選挙 ", "election_day": "2019-04-21", "seats": 3, "registered_voters": 12000},
+        {"election_name": "B町長選挙", "election_day": "2020-01-12", "seats": 1, "candidate_count": 2},
+        {"election_name": "C村議会議員選挙", "election_day": "2021-03-07", "seats": 8},
+        {"election_name": "", "election_day": "2021-03-07"},
+    ]
+    groups = {
+        "a": results("A市議会議員選挙", "2019-04-21"),
+        "b": results("B町長選挙", "2020-01-12", winner_count=1, total_candidates=2, total_votes=9000),
+        # A candidate file whose day the summary does not list.
+        "d": results("A市議会議員選挙", "2023-04-23", voted_candidates=0),
+    }
+    facts = build_election_facts(elections, groups)
+    assert list(facts) == [
+        ("A市議会議員選挙", "2019-04-21"),
+        ("B町長選挙", "2020-01-12"),
+        ("A市議会議員選挙", "2023-04-23"),
+        ("C村議会議員選挙", "2021-03-07"),
+    ]
+
+    council = facts[("A市議会議員選挙", "2019-04-21")]
+    assert (council["seats"], council["candidate_count"], council["in_summary"]) == (3, 3, True)
+    assert (council["turnout"], council["competition_ratio"], council["legal_threshold"]) == (0.5, 1.0, 500.0)
+
+    mayor = facts[("B町長選挙", "2020-01-12")]
+    assert mayor["legal_threshold"] == 2250.0
+    assert mayor["turnout"] is None
+
+    unlisted = facts[("A市議会議員選挙", "2023-04-23")]
+    assert (unlisted["seats"], unlisted["in_summary"], unlisted["total_votes"]) == (2, False, None)
+
+    summary_only = facts[("C村議会議員選挙", "2021-03-07")]
+    assert (summary_only["winner_count"], summary_only["candidates_listed"], summary_only["seats"]) == (0, 0, 8)
+    assert summary_only["min_winning_vote"] is None and summary_only["parties"] == {}
+
+
+def test_published_records_are_sorted_by_date_without_internal_fields():
+    facts = build_election_facts(
+        [{"election_name": "C村議会議員選挙", "election_day": "2021-03-07"}],
+        {"a": results("A市議会議員選挙", "2023-04-23"), "b": results("B町長選挙", "2020-01-12")},
+    )
+    records = build_election_facts_payload(facts)["records"]
+    assert [record["election_key"] for record in records] == ["B町長選挙", "C村議会議員選挙", "A市議会議員選挙"]
+    assert not set(INTERNAL_FIELDS) & {field for record in records for field in record}
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from map_geometry import decode_arcs, encode_level, group_municipal_geometries, merge_polygons, simplify_arc
+
+# Two unit squares side by side sharing the arc x = 1, and an islet far to the east.
+TOPOLOGY = {
+    "type": "Topology",
+    "arcs": [
+        [[1.0, 0.0], [1.0, 0.5], [1.0, 1.0]],
+        [[1.0, 1.0], [0.0, 1.0], [0.0, 0.0], [1.0, 0.0]],
+        [[1.0, 0.0], [2.0, 0.0], [2.0, 1.0], [1.0, 1.0]],
+        [[5.0, 5.0], [5.001, 5.0], [5.001, 5.001], [5.0, 5.0]],
+    ],
+}
+WEST = {"type": "Polygon", "arcs": [[0, 1]], "properties": {"N03_001": "北海道", "N03_007": "01101", "extra": 1}}
+EAST = {"type": "Polygon", "arcs": [[2, -1]], "properties": {"N03_001": "北海道", "N03_007": "01102"}}
+ISLET = {"type": "Polygon", "arcs": [[3]], "properties": {"N03_001": "北海道", "N03_007": "01101"}}
+
+
+def test_simplification_keeps_end_points_and_closed_rings():
+    line = [(0.0, 0.0), (1.0, 0.001), (2.0, 0.0), (3.0, 2.0)]
+    assert simplify_arc(line, 0.01) == [(0.0, 0.0), (2.0, 0.0), (3.0, 2.0)]
+    ring = [(0.0, 0.0), (0.0001, 0.0), (0.0001, 0.0001), (0.0, 0.0001), (0.0, 0.0)]
+    simplified = simplify_arc(ring, 1.0)
+    assert len(simplified) == 4 and len(set(simplified)) == 3
+
+
+def test_polygons_of_a_feature_are_grouped_and_pruned():
+    grouped = group_municipal_geometries([WEST, EAST, ISLET])
+    assert [geometry["arcs"] for geometry in grouped] == [[[[0, 1]], [[3]]], [[[2, -1]]]]
+    assert "extra" not in grouped[0]["properties"]
+
+
+def test_prefecture_outline_drops_the_shared_border():
+    quantized, positions = decode_arcs(TOPOLOGY)
+    assert merge_polygons([[[0, 1]], [[2, -1]]], quantized, positions) == [[[1, 2]]]
+
+
+def test_encoded_levels_keep_shared_arcs_on_the_grid():
+    _, positions = decode_arcs(TOPOLOGY)
+    geometries = group_municipal_geometries([WEST, EAST, ISLET])
+    objects = {"municipalities": {"type": "GeometryCollection", "geometries": geometries}}
+    topology = encode_level(positions, objects, tolerance=0.01, grid=0.5, min_extent=0.1)
+    # The islet is smaller than the minimum extent, so its arc is dropped and the others renumbered densely.
+    assert [geometry["arcs"] for geometry in topology["objects"]["municipalities"]["geometries"]] == [
+        [[[0, 1]]],
+        [[[2, -1]]],
+    ]
+    _, decoded = decode_arcs(topology)
+    assert decoded[0] == [(1.0, 0.0), (1.0, 1.0)]
+    assert decoded[1][0] == decoded[2][-1] == decoded[0][-1]
+    assert decoded[1][-1] == decoded[2][0] == decoded[0][0]
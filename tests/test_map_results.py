@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+import pytest
+
+from map_results import build_geometry_index, build_map_municipalities, municipality_key
+
+
+def feature(region_id, prefecture, city, ward=None):
+    properties = {"N03_001": prefecture, "N03_004": city, "N03_005": ward, "N03_007": region_id}
+    return {"type": "Polygon", "arcs": [], "properties": properties}
+
+
+@pytest.fixture
+def geometry_index(tmp_path):
+    topology = {
+        "type": "Topology",
+        "arcs": [],
+        "objects": {
+            "municipalities": {
+                "type": "GeometryCollection",
+                "geometries": [
+                    feature("01101", "北海道", "札幌市", "中央区"),
+                    feature("01102", "北海道", "札幌市", "北区"),
+                    feature("08208", "茨城県", "龍ケ崎市"),
+                    feature("11101", "埼玉県", "さいたま市", "西区"),
+                    feature("11102", "埼玉県", "さいたま市", "北区"),
+                    feature("", "東京都", "所属未定地"),
+                ],
+            },
+            # Older Shizuoka features spell the ward into the city name.
+            "municipalities_legacy": {
+                "type": "GeometryCollection",
+                "geometries": [feature("22101", "静岡県", "静岡市葵区"), feature("22103", "静岡県", "静岡市清水区")],
+            },
+        },
+    }
+    path = tmp_path / "map.coarse.topojson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as stream:
+        json.dump(topology, stream, ensure_ascii=False)
+    return build_geometry_index(path)
+
+
+@pytest.mark.parametrize(
+    "prefecture, municipality, region_ids",
+    [
+        ("北海道", "札幌市", ["01101", "01102"]),
+        ("北海道", "札幌市中央区", ["01101"]),
+        ("静岡県", "静岡市", ["22101", "22103"]),
+        ("静岡県", "静岡市清水区", ["22103"]),
+        ("茨城県", "竜ヶ崎市", ["08208"]),
+        # Merged municipalities draw their successor.
+        ("埼玉県", "浦和市", ["11101", "11102"]),
+        ("静岡県", "清水市", ["22101", "22103"]),
+    ],
+)
+def test_geometry_index_keys(geometry_index, prefecture, municipality, region_ids):
+    assert geometry_index[municipality_key(prefecture, municipality)] == region_ids
+
+
+def test_features_without_an_id_are_skipped(geometry_index):
+    assert municipality_key("東京都", "所属未定地") not in geometry_index
+
+
+def fact(parties, winner_count=None):
+    winners = sum(parties.values())
+    return {
+        "winner_count": winners if winner_count is None else winner_count,
+        "parties": {party: {"winners": seats} for party, seats in parties.items()},
+        "seats": winners,
+        "candidate_count": winners + 2,
+        "competition_ratio": round((winners + 2) / winners, 2) if winners else None,
+        "registered_voters": 10000,
+        "total_votes": 5000,
+        "turnout": 0.5,
+    }
+
+
+def test_elections_map_to_every_region_they_cover(geometry_index):
+    facts = {
+        ("北海道札幌市議会議員選挙", "2023-04-09"): fact({"無所属": 2, "自由民主党": 3, "公明党": 0}),
+        ("茨城県龍ヶ崎市議会議員選挙", "2019-11-10"): fact({"無所属": 4}),
+        ("茨城県龍ヶ崎市議会議員補欠選挙", "2021-06-13"): fact({"無所属": 1}),
+        ("北海道札幌市長選挙", "2023-04-09"): fact({"無所属": 1}),
+        ("北海道未知町議会議員選挙", "2022-04-17"): fact({"無所属": 8}),
+        ("北海道札幌市議会議員選挙", "2019-04-07"): fact({}, winner_count=0),
+    }
+    payload = build_map_municipalities(facts, geometry_index)
+    results = payload["results"]
+
+    assert [(row["region_id"], row["source_key"]) for row in results] == [
+        ("01101", "北海道札幌市議会議員選挙"),
+        ("01102", "北海道札幌市議会議員選挙"),
+        ("08208", "茨城県龍ヶ崎市議会議員選挙"),
+    ]
+    assert payload["regions"] == 3
+    assert payload["unmatched_elections"] == ["北海道未知町議会議員選挙"]
+    assert results[0]["pref_code"] == "01"
+    assert (results[0]["top_party"], results[0]["top_party_seats"], results[0]["top_party_share"]) == ("自由民主党", 3, 0.6)
+
+    composition = [(row["result"], row["party"], row["seats"]) for row in payload["composition"]]
+    assert composition == [(0, "自由民主党", 3), (0, "無所属", 2), (1, "自由民主党", 3), (1, "無所属", 2), (2, "無所属", 4)]
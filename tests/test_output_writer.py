@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import math
+import random
+import struct
+from datetime import date
+
+import pytest
+
+import output_writer
+from output_writer import encode_json
+
+STDLIB = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+
+
+def edge_case_floats():
+    values = [m * 10.0**e for e in range(-320, 309) for m in (1.0, 1.5, 2.5, -7.0, 9.999999)]
+    values += [5e-324, 2.2250738585072014e-308, 1.7976931348623157e308, 0.1, 1 / 3, 2.0**53, 2.0**63, -0.0, 0.0]
+    rng = random.Random(20)
+    values += [struct.unpack("<d", struct.pack("<Q", rng.getrandbits(64)))[0] for _ in range(20000)]
+    return [value for value in values if math.isfinite(value)]
+
+
+def test_orjson_and_stdlib_give_the_same_bytes(monkeypatch):
+    pytest.importorskip("orjson")
+    payloads = [[value, {"v": value}] for value in edge_case_floats()]
+    payloads += [
+        {1: "int", 2.5: "float", 1e16: "large float", True: "bool", None: "none"},
+        {"text": "".join(chr(code) for code in range(0x20)) + " 　😀﻿", "big": 2**70},
+        [float("nan"), float("inf"), {"n": -float("inf")}],
+    ]
+    with_orjson = [encode_json(payload) for payload in payloads]
+    monkeypatch.setattr(output_writer, "orjson", None)
+    without_orjson = [encode_json(payload) for payload in payloads]
+    mismatches = [(a, b) for a, b in zip(with_orjson, without_orjson) if a != b]
+    assert mismatches == []
+    assert without_orjson[0] == STDLIB.encode(payloads[0]).encode("utf-8")
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_keys_the_standard_library_rejects_fail_on_both_paths(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(output_writer, "orjson", None)
+    with pytest.raises(TypeError):
+        encode_json({date(2020, 1, 1): "date key"})
+    with pytest.raises(TypeError):
+        encode_json({(1, 2): "tuple key"})
+    with pytest.raises(TypeError):
+        encode_json({object(): "object key"})
+
+
+def sample_records(count=40):
+    rng = random.Random(31)
+    return [
+        {
+            "party": rng.choice(["自由民主党", "公明党", "無所属", None]),
+            "year": 2000 + index % 25,
+            "rate": None if index % 7 == 0 else rng.choice([0.5, 0.25, 1.75]),
+            "note": f"note {index}",
+            "parties": ["公明党", "無所属"][: index % 3],
+        }
+        for index in range(count)
+    ]
+
+
+def test_columnar_tables_round_trip():
+    records = sample_records()
+    records[3] = {key: value for key, value in records[3].items() if key != "note"}
+    table = output_writer.encode_columnar_table(records)
+    assert table["length"] == len(records)
+    assert "party" in table["dictionaries"]
+    assert "note" not in table["dictionaries"] and "parties" not in table["dictionaries"]
+    expected = [dict(record, note=record.get("note")) for record in records]
+    assert output_writer.decode_columnar_table(table) == expected
+    assert output_writer.decode_columnar_table(output_writer.encode_columnar_table([])) == []
+
+
+def test_typed_series_round_trip_keeps_nulls_and_alignment():
+    payload = {
+        "labels": ["a", "b"],
+        "series": [
+            {"name": "x", "values": [None if value % 5 == 1 else value for value in range(20)]},
+            {"name": "y", "values": [0.5, -1.25, None, 3.0] * 5},
+            # Ratios such as 0.4 change in Float32, so this list needs Float64.
+            {"name": "z", "values": [index / 7 for index in range(20)]},
+        ],
+        "totals": {"big": [2**40] * 20, "flags": [True, False] * 10, "short": [1, 2, 3]},
+        "events": sample_records(),
+    }
+    data = output_writer.encode_typed_series(payload, ["events"])
+    assert data[:4] == output_writer.TYPED_SERIES_MAGIC
+    (header_length,) = struct.unpack_from("<I", data, 4)
+    header = json.loads(data[8 : 8 + header_length])
+    assert [buffer["type"] for buffer in header["buffers"]][:3] == ["int32", "float32", "float64"]
+    assert any(buffer["nulls"] is not None for buffer in header["buffers"])
+    for buffer in header["buffers"]:
+        for offset in (buffer["offset"], buffer["nulls"]):
+            assert offset is None or (8 + header_length + offset) % output_writer.TYPED_SERIES_ALIGNMENT == 0
+
+    decoded = output_writer.decode_typed_series(data)
+    decoded["events"] = output_writer.decode_columnar_table(decoded["events"])
+    assert decoded == payload
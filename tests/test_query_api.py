@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from build_dashboard_data import build_products
+from output_writer import encode_json
+from query_api import QueryEngine, QueryError, load_pipeline_tables, parse_filters
+
+
+@pytest.fixture
+def engine_and_products(pipeline_inputs):
+    products = build_products(["top_dashboard", "win_rate", "vote_optimization", "compensation"])
+    return QueryEngine(*load_pipeline_tables()), products
+
+
+@pytest.mark.parametrize(
+    "endpoint, product",
+    [("win_rate", "win_rate"), ("timeline", "top_dashboard"), ("vote_optimization", "vote_optimization")],
+)
+def test_unfiltered_queries_equal_the_published_files(engine_and_products, endpoint, product):
+    engine, products = engine_and_products
+    data, _ = engine.query(endpoint, {})
+    assert data == encode_json(products[product])
+
+
+def test_unfiltered_compensation_totals_equal_the_party_years(engine_and_products):
+    engine, products = engine_and_products
+    rows = json.loads(engine.query("compensation", {})[0])["rows"]
+    expected = sorted(products["compensation"]["party_years"], key=lambda row: (row["party"], row["year"]))
+    assert [(row["party"], row["year"]) for row in rows] == [(row["party"], row["year"]) for row in expected]
+    assert [row["total_compensation"] for row in rows] == pytest.approx(
+        [row["total_compensation"] for row in expected]
+    )
+
+
+def test_filtered_win_rate_is_cached_per_query(engine_and_products):
+    engine, _ = engine_and_products
+    first = engine.query("win_rate", {"party": ["公明党"], "from": ["2010"]})
+    assert engine.query("win_rate", {"party": ["公明党"], "from": ["2010"]}) is first
+    assert first[0] != engine.query("win_rate", {})[0]
+
+
+@pytest.mark.parametrize("value", ["2021-02-30", "2021-13", "2023-02-29", "2021-00-10", "20210101"])
+def test_impossible_dates_are_rejected(value):
+    with pytest.raises(QueryError):
+        parse_filters({"from": [value]})
+
+
+def test_partial_dates_are_accepted():
+    filters = parse_filters({"from": ["2024-02-29"], "to": ["2024-02"]})
+    assert (filters["date_from"], filters["date_to"]) == ("2024-02-29", "2024-02")
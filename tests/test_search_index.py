@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from build_dashboard_data import build_products
+from common import normalise_search_text
+from output_writer import decode_columnar_table
+from search_index import DISPLAY_FIELDS, NGRAM_SIZE, SEARCH_FIELDS, build_search_index, utf16_sort_key
+
+
+def lookup(index, query):
+    """The bigram intersection search/search-index.js runs for a multi-character query."""
+    text = normalise_search_text(query)
+    result = None
+    for start in range(len(text) - NGRAM_SIZE + 1):
+        gram = text[start : start + NGRAM_SIZE]
+        if gram not in index["terms"]:
+            return set()
+        position = index["terms"].index(gram)
+        ids, previous = set(), 0
+        for delta in index["postings"][index["offsets"][position] : index["offsets"][position + 1]]:
+            previous += delta
+            ids.add(previous)
+        result = ids if result is None else result & ids
+    return result
+
+
+def test_lookups_resolve_against_the_index_alone(pipeline_inputs):
+    candidates = build_products(["candidates"])["candidates"]
+    index = build_search_index(candidates)
+    assert index["terms"] == sorted(index["terms"], key=utf16_sort_key)
+
+    rows = decode_columnar_table(index["candidates"])
+    assert index["rows"] == len(rows) == len(candidates)
+    assert rows == [{field: candidate[field] for field in DISPLAY_FIELDS} for candidate in candidates]
+
+    for query in ["候補12", "こうほ", "自由民主", "議会議員選挙", "コウホ"]:
+        text = normalise_search_text(query)
+        expected = {
+            row_id
+            for row_id, row in enumerate(rows)
+            if any(text in normalise_search_text(row[field]) for field in SEARCH_FIELDS)
+        }
+        assert expected and expected <= lookup(index, query), query
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import seat_terms
+from seat_terms import END_NEXT_ELECTION, END_TERM_YEARS, build_seat_terms, load_seat_terms
+
+
+def event(key, day, first_seen, **winners):
+    return {"key": key, "date": datetime.fromisoformat(day), "winners": winners, "first_seen": first_seen}
+
+
+def test_terms_end_at_the_next_election_of_the_same_key():
+    council = "東京都檜原村議会議員選挙"
+    mayor = "東京都檜原村長選挙"
+    events = [
+        event(council, "2019-04-21", 10, 自由民主党=3, 無所属=2),
+        event(mayor, "2020-02-29", 0, 無所属=1),
+        event(council, "2023-04-23", 30, 自由民主党=4),
+    ]
+    terms = build_seat_terms(events, term_years=3)
+    fields = ["source_key", "party", "term_start", "term_end", "end_reason"]
+    assert [tuple(term[field] for field in fields) for term in terms] == [
+        (council, "自由民主党", "2019-04-21", "2023-04-23", END_NEXT_ELECTION),
+        (council, "無所属", "2019-04-21", "2023-04-23", END_NEXT_ELECTION),
+        # The mayor election does not end the council term; its own term runs term_years (Feb 29 -> Feb 28).
+        (mayor, "無所属", "2020-02-29", "2023-02-28", END_TERM_YEARS),
+        (council, "自由民主党", "2023-04-23", "2026-04-23", END_TERM_YEARS),
+    ]
+    assert (terms[0]["prefecture"], terms[0]["municipality"]) == ("東京都", "檜原村")
+    assert [term["seats"] for term in terms] == [3, 2, 1, 4]
+    assert [term["first_seen"] for term in terms] == [10, 10, 0, 30]
+
+
+def test_the_table_is_cached_until_the_inputs_change(pipeline_inputs, monkeypatch):
+    terms = load_seat_terms()
+    assert seat_terms.SEAT_TERMS_PATH.exists()
+    assert {term["end_reason"] for term in terms} == {END_NEXT_ELECTION, END_TERM_YEARS}
+
+    monkeypatch.setattr(seat_terms, "load_candidate_events", lambda: [])
+    assert load_seat_terms() == terms
+    with seat_terms.ELECTION_SUMMARY_PATH.open("a", encoding="utf-8") as handle:
+        handle.write("\n")
+    assert load_seat_terms() == []
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import gzip
+import http.client
+import threading
+from functools import partial
+
+import pytest
+
+from output_writer import content_digest
+from serve import DashboardRequestHandler, DashboardServer, accepted_codings, parse_range
+
+PAYLOAD = b'{"records":[1,2,3,4,5,6,7,8,9]}'
+
+
+@pytest.mark.parametrize(
+    "header, span",
+    [
+        ("bytes=0-9", (0, 9)),
+        ("bytes=5-", (5, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=90-500", (90, 99)),
+        ("bytes=100-", (-1, -1)),
+        ("bytes=-0", (-1, -1)),
+        ("bytes=9-5", None),
+        ("bytes=0-1,4-5", None),
+        ("items=0-1", None),
+    ],
+)
+def test_parse_range(header, span):
+    assert parse_range(header, 100) == span
+
+
+def test_accepted_codings():
+    assert accepted_codings("gzip, br;q=0.5, x-gzip;q=0, zstd;q=abc") == {"gzip": 0.0, "br": 0.5, "zstd": 1.0}
+    assert accepted_codings(None) == {"": 1.0}
+
+
+@pytest.fixture
+def server(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "top.json.gz").write_bytes(gzip.compress(PAYLOAD))
+    (data / "top.json.br").write_bytes(b"brotli stand-in")
+    (data / "links").mkdir()
+    (data / "links" / "0001.0123456789ab.json.gz").write_bytes(gzip.compress(PAYLOAD))
+    handler = partial(DashboardRequestHandler, directory=str(tmp_path))
+    instance = DashboardServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=instance.serve_forever, daemon=True)
+    thread.start()
+    yield instance
+    instance.shutdown()
+    instance.server_close()
+
+
+def fetch(server, path, **headers):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=5)
+    try:
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_compressed_outputs_are_sent_with_a_content_encoding(server):
+    status, headers, body = fetch(server, "/data/top.json.gz", **{"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert (headers["Content-Encoding"], headers["Content-Type"]) == ("gzip", "application/json; charset=utf-8")
+    assert gzip.decompress(body) == PAYLOAD
+    assert headers["ETag"] == f'"{content_digest(PAYLOAD)}-gzip"'
+    assert headers["Cache-Control"] == "no-cache"
+
+    status, headers, body = fetch(server, "/data/top.json.gz", **{"Accept-Encoding": "gzip, br"})
+    assert (headers["Content-Encoding"], body) == ("br", b"brotli stand-in")
+
+    # Without gzip support the server inflates; a bare .json request finds the .gz file.
+    status, headers, body = fetch(server, "/data/top.json", **{"Accept-Encoding": "identity"})
+    assert (status, body, headers["ETag"]) == (200, PAYLOAD, f'"{content_digest(PAYLOAD)}"')
+    assert "Content-Encoding" not in headers
+
+
+def test_conditional_and_range_requests(server):
+    _, headers, _ = fetch(server, "/data/links/0001.0123456789ab.json.gz", **{"Accept-Encoding": "identity"})
+    assert headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    etag = headers["ETag"]
+
+    status, _, body = fetch(server, "/data/links/0001.0123456789ab.json.gz", **{"If-None-Match": f"W/{etag}"})
+    assert (status, body) == (304, b"")
+
+    status, headers, body = fetch(server, "/data/top.json", Range="bytes=-5")
+    length = len(PAYLOAD)
+    assert (status, body, headers["Content-Range"]) == (206, PAYLOAD[-5:], f"bytes {length - 5}-{length - 1}/{length}")
+
+    status, headers, _ = fetch(server, "/data/top.json", Range="bytes=500-")
+    assert (status, headers["Content-Range"]) == (416, f"bytes */{len(PAYLOAD)}")
+
+    # A stale If-Range validator gets the whole file.
+    status, _, body = fetch(server, "/data/top.json", Range="bytes=0-1", **{"If-Range": '"stale"'})
+    assert (status, body) == (200, PAYLOAD)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import sqlite_aggregates
+from build_dashboard_data import OUTPUT_TARGETS, SQLITE_BACKEND_PRODUCTS, build_products
+from output_writer import encode_json
+
+# Published products only: the intermediate states order by first_seen, a rowid on the sqlite side.
+PRODUCTS = ["top_dashboard", "win_rate", "vote_optimization", "election_facts"]
+
+
+@pytest.fixture(params=["text votes", "numeric votes"])
+def details_db(request, pipeline_inputs, monkeypatch):
+    """``links_table`` as the scraper leaves it: the candidate CSV columns in the same order."""
+    frame = pd.read_csv(pipeline_inputs / "candidate_details.csv.gz", dtype=object)
+    if request.param == "numeric votes":
+        frame["votes"] = pd.to_numeric(frame["votes"])
+    else:
+        thousands = frame["votes"].map(lambda value: f"{int(value):,}", na_action="ignore")
+        frame.loc[frame.index % 5 == 0, "votes"] = thousands
+    path = pipeline_inputs / "election_details.db"
+    connection = sqlite3.connect(path)
+    try:
+        frame.to_sql("links_table", connection, index=False)
+    finally:
+        connection.close()
+    monkeypatch.setattr(sqlite_aggregates, "DETAILS_DB", path)
+    return path
+
+
+def published(products):
+    return {
+        target: encode_json(prepare(products[product]) if prepare else products[product])
+        for target, (_, product, prepare) in OUTPUT_TARGETS.items()
+        if product in PRODUCTS
+    }
+
+
+def test_sqlite_backend_matches_the_python_backend(details_db):
+    assert set(SQLITE_BACKEND_PRODUCTS) - {"election_results"} <= set(PRODUCTS)
+    assert published(build_products(PRODUCTS, backend="sqlite")) == published(build_products(PRODUCTS))
+
+
+def test_the_details_database_is_left_unchanged(details_db):
+    before = details_db.read_bytes()
+    sqlite_aggregates.query_candidate_groups()
+    assert details_db.read_bytes() == before
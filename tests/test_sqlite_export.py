@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from build_dashboard_data import build_products
+from query_api import QueryEngine, load_pipeline_tables, load_sqlite_tables
+from sqlite_export import SQLITE_PRODUCTS, TABLE_COLUMNS, build_tables, write_dashboard_sqlite
+
+
+@pytest.fixture
+def products(pipeline_inputs):
+    return build_products(SQLITE_PRODUCTS)
+
+
+def table_columns(connection, name):
+    return [row[1] for row in connection.execute(f'PRAGMA table_info("{name}")')]
+
+
+def test_every_product_field_has_a_declared_column(products):
+    for name, records in build_tables(products).items():
+        declared = [definition.split()[0] for definition in TABLE_COLUMNS[name].split(", ")]
+        fields = {field for record in records for field in record}
+        assert fields <= set(declared), (name, fields - set(declared))
+
+
+def test_empty_tables_are_created_with_their_columns(products, tmp_path):
+    compensation = dict(products["compensation"], unmatched_terms=[])
+    identities = dict(products["candidate_identities"], party_switches=[])
+    path = tmp_path / "dashboard.sqlite"
+    counts = write_dashboard_sqlite(
+        dict(products, compensation=compensation, candidate_identities=identities), path
+    )
+    assert counts["compensation_unmatched_terms"] == counts["party_switches"] == 0
+
+    connection = sqlite3.connect(path)
+    try:
+        assert connection.execute("SELECT COUNT(*) FROM compensation_unmatched_terms").fetchone() == (0,)
+        assert table_columns(connection, "party_switches") == ["person_id", "election_date", "from_party", "to_party"]
+        for name, count in counts.items():
+            assert connection.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone() == (count,)
+    finally:
+        connection.close()
+
+
+def test_query_api_answers_the_same_from_the_sqlite_copy(products, tmp_path):
+    path = tmp_path / "dashboard.sqlite"
+    write_dashboard_sqlite(products, path)
+    from_sqlite = QueryEngine(*load_sqlite_tables(path))
+    from_pipeline = QueryEngine(*load_pipeline_tables())
+    for endpoint, params in [
+        ("win_rate", {}),
+        ("timeline", {"prefecture": ["13", "北海道"]}),
+        ("vote_optimization", {"from": ["2012"]}),
+        ("compensation", {"by": ["prefecture,year"]}),
+    ]:
+        assert from_sqlite.query(endpoint, params)[0] == from_pipeline.query(endpoint, params)[0], endpoint
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from stage_graph import StageError, run_stages, stage_dependencies, stage_order
+
+
+def recording_stages(calls, failing=(), gate=None):
+    """a -> b, a -> c, (b, c) -> d, and e on its own; every stage appends its name to ``calls``."""
+
+    def stage(name):
+        def run():
+            if gate is not None and name == "b":
+                gate.wait(5)
+            calls.append(name)
+            if name in failing:
+                raise RuntimeError(f"{name} failed")
+
+        return run
+
+    return {
+        "a": (("source.csv",), ("a.out",), stage("a")),
+        "b": (("a.out",), ("b.out",), stage("b")),
+        "c": (("a.out",), ("c.out",), stage("c")),
+        "d": (("b.out", "c.out"), ("d.out",), stage("d")),
+        "e": ((), ("e.out",), stage("e")),
+    }
+
+
+def test_order_follows_dependencies_then_declaration():
+    dependencies = stage_dependencies(recording_stages([]))
+    assert dependencies == {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}, "e": set()}
+    assert stage_order(dependencies) == ["a", "b", "c", "d", "e"]
+    assert stage_order({"late": {"early"}, "early": set()}) == ["early", "late"]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_stages_run_after_their_inputs(workers):
+    calls = []
+    finished = run_stages(recording_stages(calls), workers)
+    assert sorted(finished) == sorted(calls) == ["a", "b", "c", "d", "e"]
+    for before, after in [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")]:
+        assert calls.index(before) < calls.index(after)
+
+
+def test_serial_run_uses_the_stage_order():
+    calls = []
+    assert run_stages(recording_stages(calls), 1) == ["a", "b", "c", "d", "e"]
+
+
+def test_first_failure_stops_the_run():
+    calls, cancelled = [], []
+    with pytest.raises(StageError) as raised:
+        run_stages(recording_stages(calls, failing={"b"}), 1, cancel=lambda: cancelled.append(True))
+    assert raised.value.stage == "b"
+    assert isinstance(raised.value.error, RuntimeError)
+    assert raised.value.completed == ["a"]
+    assert calls == ["a", "b"]
+    assert cancelled == [True]
+
+
+def test_running_stages_finish_before_the_failure_is_raised():
+    # b waits until c has started, so both are running when c fails.
+    calls, gate = [], threading.Event()
+    stages = recording_stages(calls, failing={"c"}, gate=gate)
+    fail_c = stages["c"][2]
+    stages["c"] = (stages["c"][0], stages["c"][1], lambda: (gate.set(), fail_c()))
+    with pytest.raises(StageError) as raised:
+        run_stages(stages, 2)
+    assert raised.value.stage == "c"
+    assert "b" in raised.value.completed
+    assert "d" not in calls
+
+
+def test_completed_stages_are_skipped_on_resume():
+    calls = []
+    finished = run_stages(recording_stages(calls), 1, completed=["a", "b", "unknown"])
+    assert finished == calls == ["c", "d", "e"]
+
+
+def test_invalid_graphs_are_rejected():
+    noop = lambda: None  # noqa: E731
+    with pytest.raises(ValueError, match="output of both"):
+        stage_dependencies({"a": ((), ("x",), noop), "b": ((), ("x",), noop)})
+    with pytest.raises(ValueError, match="stage cycle"):
+        stage_dependencies({"a": (("y",), ("x",), noop), "b": (("x",), ("y",), noop)})
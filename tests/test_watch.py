@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import candidate_identity
+import election_facts
+from watch import OUTPUT_CODE, code_fingerprints, dependent_products
+
+
+def test_products_computed_from_a_stale_product_are_dropped_too():
+    assert dependent_products(["seat_terms"]) == {"seat_terms", "compensation", "top_dashboard", "win_rate"}
+    assert dependent_products(["election_results"]) == {
+        "election_results",
+        "election_facts",
+        "vote_optimization",
+        "map_municipalities",
+    }
+    assert dependent_products(["candidate_identities"]) == {"candidate_identities"}
+
+
+def test_code_changes_only_touch_the_products_that_reach_them(monkeypatch):
+    before = code_fingerprints(sqlite=False)
+    assert OUTPUT_CODE in before
+
+    # Reached through import_pipeline_module("candidate_identity") from the builder.
+    monkeypatch.setattr(candidate_identity, "MATCH_THRESHOLD", candidate_identity.MATCH_THRESHOLD + 1)
+    after = code_fingerprints(sqlite=False)
+    assert {name for name in before if before[name] != after[name]} == {"candidate_identities"}
+
+    # Payload code republishes the warm products without recomputing them.
+    monkeypatch.setattr(election_facts, "ELECTION_FACTS_VERSION", election_facts.ELECTION_FACTS_VERSION + 1)
+    republished = code_fingerprints(sqlite=False)
+    assert {name for name in after if after[name] != republished[name]} == {OUTPUT_CODE}